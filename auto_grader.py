@@ -0,0 +1,359 @@
+"""模拟考试批量自动批改
+
+用法：
+    python auto_grader.py submissions.jsonl -o results.jsonl --workers 4 --bank questions.jsonl
+    python auto_grader.py --synthetic 5000 -o results.jsonl        # 生成整年级的模拟答卷测吞吐量
+
+答卷为 JSONL，每行 {"student": ..., "answers": {"题目编号": "作答", ...}, "questions": [题目编号, ...]?}；
+给出 questions 时未作答的题按错题计。选择题可以答选项字母（A-D）或选项内容。
+结果按输入顺序每行一名学生：得分、满分、错题，以及按知识点ID汇总的 [答对数, 题数]；
+无法批改的答卷（题目编号不在题库中、不是整数等）写出 {"student", "error"}，其余答卷照常批改。
+--bank 指定题目记录文件（JSONL，格式见 QuestionBank.from_records），题目编号为其中的行序号；
+不指定时使用与应用内相同的合成题库。
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import re
+import sys
+import time
+import unicodedata
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from fractions import Fraction
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+import numpy as np
+
+from knowledge_graph import GradeSixReviewGraph
+from question_bank import CHOICE, QuestionBank, generate_question_bank, read_question_records
+
+_UNITS = re.compile(r"(平方厘米|立方厘米|平方米|立方米|厘米|毫米|千米|千克|公斤|克|米|元|个|人|天|小时|分钟|秒|度|cm|mm|km|kg|m|g)$")
+_CHINESE_FRACTION = re.compile(r"^(\d+)分之(\d+)$")
+_DIGIT_GROUP = re.compile(r"(?<=\d),(?=\d{3}(?!\d))")
+
+
+def normalize_answer(text) -> str:
+    """规范化作答：全角转半角、去空白、千分位逗号和末尾单位；能解析为数值的统一成最简分数（0.5、1/2、50% 相同）"""
+    if text is None:
+        return ""
+    return _normalize(str(text))
+
+
+@lru_cache(maxsize=1 << 16)
+def _normalize(text: str) -> str:
+    # 同一次考试里大量作答完全相同，按原文缓存
+    if text.isascii() and text.isdigit():
+        return text.lstrip("0") or "0"
+    s = unicodedata.normalize("NFKC", text).strip().lower()
+    s = _DIGIT_GROUP.sub("", re.sub(r"\s+", "", s).replace("，", ","))
+    s = _UNITS.sub("", s)
+    value = _parse_number(s)
+    return s if value is None else str(value)
+
+
+def _parse_number(s: str) -> Optional[Fraction]:
+    match = _CHINESE_FRACTION.match(s)
+    if match:
+        return Fraction(int(match.group(2)), int(match.group(1)))
+    try:
+        if s.endswith("%"):
+            return Fraction(s[:-1]) / 100
+        return Fraction(s)
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+class AutoGrader:
+    """按块批改答卷
+
+    一块答卷先展平成 (学生, 题目, 作答) 三列：选择题把作答换成选项下标后与答案列整体比较，
+    其余题型比较规范化后的作答与标准答案（标准答案的规范化结果按题缓存）；
+    得分与按知识点的答对数 / 题数都用 bincount 汇总。
+    """
+    def __init__(self, bank: QuestionBank):
+        self.bank = bank
+        self._keys: Dict[int, str] = {}
+
+    def _key(self, item: int) -> str:
+        key = self._keys.get(item)
+        if key is None:
+            key = self._keys[item] = normalize_answer(self.bank.answers[item])
+        return key
+
+    def _choice_index(self, item: int, answer) -> int:
+        if answer is None:
+            return -1
+        text = unicodedata.normalize("NFKC", str(answer)).strip()
+        if len(text) == 1 and "A" <= text.upper() <= "Z":
+            return ord(text.upper()) - ord("A")
+        options = self.bank.options[item] or []
+        normalized = normalize_answer(text)
+        for i, option in enumerate(options):
+            if normalize_answer(option) == normalized:
+                return i
+        return -1
+
+    def _paper(self, submission: Dict) -> List[Tuple[int, object]]:
+        """一份答卷的 [(题目, 作答)]，按 questions（没有时按 answers）的题目顺序"""
+        given = {int(item): answer for item, answer in (submission.get("answers") or {}).items()}
+        paper = []
+        for item in submission.get("questions") or given:
+            item = int(item)
+            if not 0 <= item < len(self.bank):
+                raise ValueError(f"题目 {item} 不在题库中")
+            paper.append((item, given.get(item)))
+        return paper
+
+    def _flatten(self, submissions: List[Dict]) -> Tuple[np.ndarray, np.ndarray, List, Dict[int, str]]:
+        """展平一块答卷，返回 (行号, 题目, 作答, {出错的行号: 错误信息})；出错的答卷不参与批改"""
+        rows, items, answers, errors = [], [], [], {}
+        for row, submission in enumerate(submissions):
+            if isinstance(submission, dict) and submission.get("error"):  # read_submissions 读不出的行
+                errors[row] = submission["error"]
+                continue
+            try:
+                paper = self._paper(submission)
+            except (ValueError, TypeError, AttributeError) as e:
+                errors[row] = f"{type(e).__name__}: {e}"
+                continue
+            rows.extend([row] * len(paper))
+            items.extend(item for item, _ in paper)
+            answers.extend(answer for _, answer in paper)
+        return np.array(rows, dtype=np.int64), np.array(items, dtype=np.int64), answers, errors
+
+    def grade(self, submissions: List[Dict]) -> List[Dict]:
+        """批改一块答卷，返回与输入顺序一致的结果；无法批改的答卷返回 {"student", "error"}"""
+        bank = self.bank
+        rows, items, answers, errors = self._flatten(submissions)
+        correct = np.zeros(len(items), dtype=bool)
+
+        choice = np.flatnonzero(bank.qtype[items] == CHOICE)
+        chosen = np.fromiter((self._choice_index(int(items[i]), answers[i]) for i in choice),
+                             dtype=np.int64, count=len(choice))
+        correct[choice] = chosen == bank.choice_key[items[choice]]
+        for i in np.flatnonzero(bank.qtype[items] != CHOICE):
+            answer = answers[i]
+            correct[i] = answer is not None and normalize_answer(answer) == self._key(int(items[i]))
+
+        scores = bank.score[items].astype(np.int64)
+        count = len(submissions)
+        earned = np.bincount(rows, weights=np.where(correct, scores, 0), minlength=count)
+        total = np.bincount(rows, weights=scores, minlength=count)
+
+        # 按 (学生, 知识点) 汇总答对数与题数
+        topics = bank.topic[items].astype(np.int64)
+        cells = rows * len(bank.topics) + topics
+        unique_cells, slot = np.unique(cells, return_inverse=True)
+        right = np.bincount(slot, weights=correct, minlength=len(unique_cells)).astype(int)
+        asked = np.bincount(slot, minlength=len(unique_cells))
+        by_topic: List[Dict] = [{} for _ in range(count)]
+        for cell, r, a in zip(unique_cells.tolist(), right.tolist(), asked.tolist()):
+            by_topic[cell // len(bank.topics)][bank.topics[cell % len(bank.topics)]] = [r, a]
+
+        wrong: List[List[int]] = [[] for _ in range(count)]
+        for row, item in zip(rows[~correct].tolist(), items[~correct].tolist()):
+            wrong[row].append(item)
+        results = []
+        for row, submission in enumerate(submissions):
+            student = submission.get("student") if isinstance(submission, dict) else None
+            if row in errors:
+                results.append({"student": student, "error": errors[row]})
+                continue
+            results.append({
+                "student": student,
+                "score": int(earned[row]),
+                "total": int(total[row]),
+                "wrong": wrong[row],
+                "by_topic": by_topic[row],
+            })
+        return results
+
+    def answer_events(self, submissions: Iterable[Dict], results: Iterable[Dict]) -> Iterator[Tuple]:
+        """把批改结果展开为知识追踪用的 (学生, 知识点, 是否答对) 事件
+
+        事件按答卷中的题目顺序排列（知识追踪会把它当作作答的先后顺序）；出错的答卷不产生事件。
+        """
+        for submission, result in zip(submissions, results):
+            if "error" in result:
+                continue
+            wrong = set(result["wrong"])
+            for item, _ in self._paper(submission):
+                yield result["student"], self.bank.topics[self.bank.topic[item]], item not in wrong
+
+
+# ---------- 工作进程 ----------
+_worker_grader: Optional[AutoGrader] = None
+
+
+def load_bank(backend: str, bank_path: Optional[str], bank_size: int, seed: int) -> QuestionBank:
+    """从题目记录文件构建题库；未指定文件时生成合成题库"""
+    with contextlib.redirect_stdout(sys.stderr):
+        kg = GradeSixReviewGraph(backend=backend).freeze()
+    if bank_path:
+        return QuestionBank.from_records(kg.graph, read_question_records(bank_path))
+    return generate_question_bank(kg.graph, size=bank_size, seed=seed)
+
+
+def _init_worker(backend: str, bank_path: Optional[str], bank_size: int, seed: int):
+    """每个工作进程只构建一次图谱和题库"""
+    global _worker_grader
+    _worker_grader = AutoGrader(load_bank(backend, bank_path, bank_size, seed))
+
+
+def _grade_chunk(chunk: List[Dict], grader: Optional[AutoGrader] = None) -> Tuple[str, int, int, float]:
+    """批改一块并序列化结果，返回 (JSONL 文本, 题目数, 出错份数, 耗时秒)；grader 默认为本工作进程的批改器"""
+    started = time.perf_counter()
+    results = (grader or _worker_grader).grade(chunk)
+    lines = "".join(json.dumps(result, ensure_ascii=False) + "\n" for result in results)
+    questions = sum(asked for result in results for _, asked in result.get("by_topic", {}).values())
+    failed = sum(1 for result in results if "error" in result)
+    return lines, questions, failed, time.perf_counter() - started
+
+
+class GradingPipeline:
+    """整年级答卷批改流水线
+
+    答卷按块分发到进程池，每块在工作进程中批改并序列化成 JSONL 文本，主进程按输入顺序整块写出；
+    同时在途的块数有上限。结束后报告吞吐量（份/秒、题/秒）和每块批改延迟的分位数；
+    无法批改的答卷写出错误记录并计入报告的 failed，其余答卷照常批改。
+    主进程只在单进程模式或需要访问 grader 时才构建题库。
+    """
+    def __init__(self, workers: int = None, chunk_size: int = 500, max_pending: int = None,
+                 backend: str = "networkx", bank_path: Optional[str] = None, bank_size: int = 100_000,
+                 seed: int = 0):
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.chunk_size = chunk_size
+        self.max_pending = max_pending or 2 * self.workers
+        self.worker_args = (backend, bank_path, bank_size, seed)
+        self._grader: Optional[AutoGrader] = None
+
+    @property
+    def grader(self) -> AutoGrader:
+        """主进程中的批改器，第一次访问时才构建题库"""
+        if self._grader is None:
+            self._grader = AutoGrader(load_bank(*self.worker_args))
+        return self._grader
+
+    def _chunks(self, submissions: Iterable[Dict]) -> Iterator[List[Dict]]:
+        chunk = []
+        for submission in submissions:
+            chunk.append(submission)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def run(self, submissions: Iterable[Dict], out: TextIO) -> Dict:
+        started = time.perf_counter()
+        papers, questions, failed, latencies = 0, 0, 0, []
+
+        def collect(result, size):
+            nonlocal papers, questions, failed
+            lines, count, errors, seconds = result
+            out.write(lines)
+            papers += size
+            questions += count
+            failed += errors
+            latencies.append(seconds)
+
+        if self.workers > 1:
+            with ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=self.worker_args) as pool:
+                pending = deque()
+                for chunk in self._chunks(submissions):
+                    pending.append((pool.submit(_grade_chunk, chunk), len(chunk)))
+                    if len(pending) >= self.max_pending:
+                        job, size = pending.popleft()
+                        collect(job.result(), size)
+                for job, size in pending:
+                    collect(job.result(), size)
+        else:
+            for chunk in self._chunks(submissions):
+                collect(_grade_chunk(chunk, self.grader), len(chunk))
+
+        elapsed = time.perf_counter() - started
+        latency_ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+        return {
+            "papers": papers,
+            "questions": questions,
+            "failed": failed,
+            "seconds": round(elapsed, 3),
+            "papers_per_second": round(papers / elapsed, 1) if elapsed > 0 else None,
+            "questions_per_second": round(questions / elapsed, 1) if elapsed > 0 else None,
+            "chunk_latency_ms": {
+                "p50": round(float(np.percentile(latency_ms, 50)), 2),
+                "p95": round(float(np.percentile(latency_ms, 95)), 2),
+                "max": round(float(latency_ms.max()), 2),
+            },
+            "workers": self.workers,
+        }
+
+
+def read_submissions(path: str) -> Iterator[Dict]:
+    """逐行读取答卷；无法解析的行变成错误记录，批改时原样写出"""
+    with open(path, "r", encoding="utf-8-sig") as f:
+        for number, line in enumerate(f, 1):
+            if line.strip():
+                try:
+                    submission = json.loads(line)
+                except json.JSONDecodeError as e:
+                    submission = {"error": f"第 {number} 行不是合法的 JSON: {e}"}
+                yield submission if isinstance(submission, dict) else {"error": f"第 {number} 行不是答卷对象"}
+
+
+def synthetic_submissions(bank: QuestionBank, students: int, questions: int = 20, accuracy: float = 0.7,
+                          seed: int = 0) -> Iterator[Dict]:
+    """模拟一次整年级考试：每名学生一份随机试卷，按 accuracy 的概率答对"""
+    rng = random.Random(seed)
+    for i in range(students):
+        items = rng.sample(range(len(bank)), questions)
+        answers = {}
+        for item in items:
+            if rng.random() < accuracy:
+                answers[str(item)] = "ABCD"[bank.choice_key[item]] if bank.qtype[item] == CHOICE else bank.answers[item]
+            else:
+                answers[str(item)] = rng.choice(["A", "B", "0", "不会"])
+        yield {"student": f"学生{i}", "questions": items, "answers": answers}
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="批量自动批改模拟考试答卷")
+    parser.add_argument("submissions", nargs="?", help="答卷文件（JSONL）")
+    parser.add_argument("-o", "--output", help="结果 JSONL 文件，默认写到标准输出")
+    parser.add_argument("--synthetic", type=int, default=0, help="不读文件，生成这么多份模拟答卷")
+    parser.add_argument("--workers", type=int, default=None, help="工作进程数，默认等于 CPU 核数；1 表示单进程")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--bank", help="题目记录文件（JSONL）；不指定时使用合成题库")
+    parser.add_argument("--bank-size", type=int, default=100_000, help="合成题库的题目数")
+    parser.add_argument("--backend", default="networkx", choices=GradeSixReviewGraph.BACKENDS)
+    args = parser.parse_args(argv)
+    if not args.submissions and not args.synthetic:
+        parser.error("需要答卷文件或 --synthetic")
+
+    pipeline = GradingPipeline(workers=args.workers, chunk_size=args.chunk_size, backend=args.backend,
+                               bank_path=args.bank, bank_size=args.bank_size)
+    # 模拟答卷需要题库来出题，只有这时主进程才会构建题库
+    submissions = synthetic_submissions(pipeline.grader.bank, args.synthetic) if args.synthetic \
+        else read_submissions(args.submissions)
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        report = pipeline.run(submissions, out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    latency = report["chunk_latency_ms"]
+    print(
+        f"共批改 {report['papers']} 份答卷（失败 {report['failed']} 份）、{report['questions']} 道题，耗时 {report['seconds']} 秒，"
+        f"{report['papers_per_second']} 份/秒；每块延迟 p50 {latency['p50']} 毫秒、p95 {latency['p95']} 毫秒，"
+        f"{report['workers']} 个进程",
+        file=sys.stderr,
+    )
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""整班 / 整年级批量生成复习计划
+
+用法：
+    python batch_review_planner.py roster.csv -o plans.jsonl --strategy weakness_focused --workers 4
+
+输入为 CSV 或 JSONL 的学生档案，CSV 中 weaknesses / mastered 列用分号分隔多个知识点ID；
+可选的 strategy 列可覆盖命令行指定的默认策略。输出为每行一个学生计划的 JSONL，顺序与输入一致；
+无法解析或无法生成计划的档案写出 {"name", "strategy", "error"} 记录，不影响其他学生；
+--format compact / compact-csv 输出紧凑格式（见 plan_export），--gzip 压缩输出。
+"""
+import argparse
+import contextlib
+import csv
+import json
+import os
+import sys
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
+
+from knowledge_graph import GradeSixReviewGraph
+from plan_export import CompactPlanWriter, JsonPlanWriter, open_plan_writer
+from review_path_recommender import GradeSixReviewRecommender
+
+LIST_FIELDS = ("weaknesses", "mastered")
+INT_FIELDS = ("target_days", "days_until_exam", "available_days", "daily_minutes")
+
+
+def read_profiles(path: str) -> Iterator[Dict]:
+    """逐条读取学生档案（CSV 或 JSONL），不会一次性读入整个名单"""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if path.lower().endswith((".jsonl", ".json")):
+            for number, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        profile = json.loads(line)
+                    except json.JSONDecodeError as e:
+                        profile = {"error": f"第 {number} 行不是合法的 JSON: {e}"}
+                    yield profile if isinstance(profile, dict) else {"error": f"第 {number} 行不是学生档案对象"}
+        else:
+            for row in csv.DictReader(f):
+                try:
+                    yield _parse_csv_row(row)
+                except ValueError as e:
+                    yield {"name": row.get("name") or None, "error": str(e)}
+
+
+def _parse_csv_row(row: Dict[str, str]) -> Dict:
+    profile = {}
+    for field, value in row.items():
+        if value is None or value == "":
+            continue
+        if field in LIST_FIELDS:
+            profile[field] = [item.strip() for item in value.split(";") if item.strip()]
+        elif field in INT_FIELDS:
+            try:
+                profile[field] = int(value)
+            except ValueError:
+                raise ValueError(f"{field} 不是整数: {value}") from None
+        else:
+            profile[field] = value
+    return profile
+
+
+# ---------- 工作进程 ----------
+_worker_recommender: Optional[GradeSixReviewRecommender] = None
+
+
+def _init_worker(backend: str):
+    """每个工作进程只构建一次图谱与可达性索引，之后所有学生的先修查询都复用它"""
+    global _worker_recommender
+    with contextlib.redirect_stdout(sys.stderr):  # 构建日志不能混进写到标准输出的 JSONL
+        kg = GradeSixReviewGraph(backend=backend).freeze()
+    _worker_recommender = GradeSixReviewRecommender(kg)
+
+
+def _plan_one(profile: Dict, strategy: str) -> Tuple[Optional[Dict], Optional[str]]:
+    """返回 (计划, 错误信息)；单个档案出错不中断整批"""
+    try:
+        return _worker_recommender.generate_review_plan(profile, strategy), None
+    except (ValueError, KeyError, TypeError) as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def _plan_batch(batch: List[Tuple[tuple, Dict, str]]) -> List[Tuple[tuple, Tuple[Optional[Dict], Optional[str]]]]:
+    return [(key, _plan_one(profile, strategy)) for key, profile, strategy in batch]
+
+
+class BatchReviewPlanner:
+    """批量复习计划生成器
+
+    - 相同（按策略规范化后）的档案只计算一次：在途的计算被后续块共享，
+      已完成的结果保留在有界的 LRU 表中跨块复用；
+    - 名单按块读取，每块去重后拆成小批分发到进程池，同时在途的块数有上限，内存占用有界；
+    - 结果按输入顺序流式写出（JSONL 或 plan_export 的紧凑格式），结束后给出吞吐量报告；
+    - 出错的档案写出错误记录并计入报告的 failed，其余学生照常生成。
+    """
+    def __init__(self, strategy: str = "weakness_focused", workers: int = None, chunk_size: int = 1000,
+                 batch_size: int = 50, max_pending_chunks: int = 4, memo_size: int = 10000,
+                 backend: str = "networkx"):
+        self.strategy = strategy
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.max_pending_chunks = max_pending_chunks
+        self.memo_size = memo_size
+        self.backend = backend
+        _init_worker(backend)  # 主进程也需要推荐器来计算去重键（并在单进程模式下直接计算）
+        self.recommender = _worker_recommender
+
+    def run(self, profiles: Iterable[Dict], out: Union[TextIO, JsonPlanWriter, CompactPlanWriter]) -> Dict:
+        """生成并写出全部计划，返回吞吐量报告；out 为文本流（写 JSONL）或 plan_export 的写出器"""
+        started = time.perf_counter()
+        if not isinstance(out, (JsonPlanWriter, CompactPlanWriter)):
+            out = JsonPlanWriter(out)
+        stats = {"profiles": 0, "unique_plans": 0, "reused_plans": 0, "failed": 0}
+        memo: "OrderedDict[tuple, Dict]" = OrderedDict()
+        self._inflight: Dict[tuple, list] = {}
+
+        pool = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.backend,)) \
+            if self.workers > 1 else None
+        pending = deque()
+        try:
+            for chunk in self._chunks(profiles):
+                pending.append(self._submit_chunk(chunk, memo, pool, stats))
+                while len(pending) >= self.max_pending_chunks:
+                    self._write_chunk(pending.popleft(), memo, out, stats)
+            while pending:
+                self._write_chunk(pending.popleft(), memo, out, stats)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        elapsed = time.perf_counter() - started
+        stats["seconds"] = round(elapsed, 3)
+        stats["profiles_per_second"] = round(stats["profiles"] / elapsed, 1) if elapsed > 0 else None
+        stats["workers"] = self.workers
+        return stats
+
+    def _chunks(self, profiles: Iterable[Dict]) -> Iterator[List[Dict]]:
+        chunk = []
+        for profile in profiles:
+            chunk.append(profile)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _submit_chunk(self, chunk: List[Dict], memo, pool, stats) -> Tuple[List, List]:
+        """块内去重并提交计算，返回 (档案及其结果槽列表, 计算任务列表)
+
+        结果槽是单元素列表，内容为 (计划, 错误信息)：命中 LRU 表或档案本身有误时立即填入；
+        与在途计算重复时共享同一个槽，由先提交的块在写出时填入（块按顺序写出，因此后续块写出时槽一定已填好）。
+        """
+        slotted = []
+        todo = []
+        valid = 0
+        for profile in chunk:
+            strategy = profile.get("strategy", self.strategy)
+            if "error" in profile:
+                slotted.append((profile, strategy, [(None, profile["error"])]))
+                continue
+            try:
+                key = self.recommender.profile_key(profile, strategy)
+            except (ValueError, TypeError) as e:
+                slotted.append((profile, strategy, [(None, str(e))]))
+                continue
+            valid += 1
+            if key in memo:
+                memo.move_to_end(key)
+                slot = [(memo[key], None)]
+            elif key in self._inflight:
+                slot = self._inflight[key]
+            else:
+                slot = self._inflight[key] = []
+                todo.append((key, profile, strategy))
+            slotted.append((profile, strategy, slot))
+        stats["profiles"] += len(chunk)
+        stats["unique_plans"] += len(todo)
+        stats["reused_plans"] += valid - len(todo)
+
+        batches = [todo[i:i + self.batch_size] for i in range(0, len(todo), self.batch_size)]
+        if pool is None:
+            jobs = [_plan_batch(batch) for batch in batches]
+        else:
+            jobs = [pool.submit(_plan_batch, batch) for batch in batches]
+        return slotted, jobs
+
+    def _write_chunk(self, submitted: Tuple[List, List], memo, writer, stats):
+        slotted, jobs = submitted
+        for job in jobs:
+            for key, (plan, error) in (job if isinstance(job, list) else job.result()):
+                self._inflight.pop(key).append((plan, error))
+                if error is None:
+                    memo[key] = plan
+        for profile, strategy, slot in slotted:
+            plan, error = slot[0]
+            if error is None:
+                writer.write({"name": profile.get("name"), "strategy": strategy, "plan": plan})
+            else:
+                writer.write({"name": profile.get("name"), "strategy": strategy, "error": error})
+                stats["failed"] += 1
+        while len(memo) > self.memo_size:
+            memo.popitem(last=False)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="批量生成六年级数学复习计划")
+    parser.add_argument("roster", help="学生档案文件（.csv 或 .jsonl）")
+    parser.add_argument("-o", "--output", help="输出文件（compact-csv 时为目录），JSONL 默认写到标准输出")
+    parser.add_argument("--format", default="jsonl", choices=["jsonl", "compact", "compact-csv"])
+    parser.add_argument("--gzip", action="store_true", help="用 gzip 压缩输出")
+    parser.add_argument("--strategy", default="weakness_focused",
+                        choices=list(GradeSixReviewRecommender.STRATEGY_PROFILE_FIELDS))
+    parser.add_argument("--workers", type=int, default=None, help="工作进程数，默认等于 CPU 核数；1 表示单进程")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--backend", default="networkx", choices=GradeSixReviewGraph.BACKENDS)
+    args = parser.parse_args(argv)
+
+    planner = BatchReviewPlanner(strategy=args.strategy, workers=args.workers,
+                                 chunk_size=args.chunk_size, backend=args.backend)
+    if args.output:
+        out = open_plan_writer(args.output, args.format, args.gzip)
+    elif args.format == "jsonl" and not args.gzip:
+        out = JsonPlanWriter(sys.stdout)
+    else:
+        parser.error("紧凑格式或压缩输出需要用 -o 指定输出位置")
+    try:
+        report = planner.run(read_profiles(args.roster), out)
+    finally:
+        out.close()
+    print(
+        f"共 {report['profiles']} 份档案，实际计算 {report['unique_plans']} 份计划"
+        f"（复用 {report['reused_plans']} 份，失败 {report['failed']} 份），耗时 {report['seconds']} 秒，"
+        f"{report['profiles_per_second']} 份/秒，{report['workers']} 个进程",
+        file=sys.stderr,
+    )
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""性能基准测试：合成课程数据生成 + 各模块耗时 / 内存峰值测量 + 与基线比较
+
+用法：
+    python benchmark_suite.py --sizes 200 1000 5000 --save-baseline bench_baseline.json
+    python benchmark_suite.py --sizes 200 1000 5000 --baseline bench_baseline.json --tolerance 0.3
+
+与基线相比耗时超过 (1 + tolerance) 倍的项目会被标记为退化，此时进程以状态码 1 退出。
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+from auto_grader import AutoGrader, synthetic_submissions
+from concept_clusters import detect_concept_clusters
+from curriculum_loader import CurriculumLoader, write_curriculum
+from graph_layout import layered_layout
+from knowledge_tracing import KnowledgeTracer
+from render_table import RenderTable
+from knowledge_graph import GradeSixReviewGraph
+from review_path_recommender import GradeSixReviewRecommender
+from question_bank import PaperAssembler, generate_question_bank
+from review_scheduler import ReviewScheduler
+from spaced_repetition import SpacedRepetitionEngine
+
+REVIEW_GRADE = GradeSixReviewGraph.REVIEW_GRADE
+
+
+def generate_synthetic_curriculum(root: str, nodes: int = 1000, depth: int = 12, fan_in: int = 3,
+                                  domains: int = 4, seed: int = 0) -> Dict:
+    """生成合成的多年级课程 DAG，并以课程数据目录格式写到 root
+
+    节点均匀分布在 depth 层上，层号映射为 1-6 年级（最后几层为六年级复习内容）；
+    每个节点从前面的层（偏向上一层）随机选至多 fan_in 个先修，跨领域先修占少数。
+    """
+    rng = random.Random(seed)
+    domain_names = [f"领域{k + 1}" for k in range(domains)]
+    layers: List[List[Dict]] = [[] for _ in range(depth)]
+    for i in range(nodes):
+        layer = i * depth // nodes
+        domain = rng.randrange(domains)
+        layers[layer].append({
+            "id": f"T{i}",
+            "name": f"知识点{i}",
+            "domain": domain,
+            "level": 1 + layer * 6 // depth,
+            "prerequisites": [],
+        })
+
+    for layer in range(1, depth):
+        for topic in layers[layer]:
+            candidates = [t for t in layers[layer - 1] if t["domain"] == topic["domain"]] or layers[layer - 1]
+            count = rng.randint(1, fan_in)
+            prereqs = rng.sample(candidates, min(count, len(candidates)))
+            if layer >= 2 and rng.random() < 0.2:
+                prereqs.append(rng.choice(layers[rng.randrange(layer - 1)]))
+            topic["prerequisites"] = sorted({t["id"] for t in prereqs})
+
+    shards: Dict[tuple, Dict] = {}
+    for layer_topics in layers:
+        for topic in layer_topics:
+            grade = topic["level"]
+            domain = domain_names[topic.pop("domain")]
+            if grade == REVIEW_GRADE:
+                topic["keywords"] = [f"关键词{rng.randrange(50)}" for _ in range(3)]
+                topic["common_errors"] = [f"易错点{rng.randrange(30)}"]
+            shard = shards.setdefault((grade, domain), {
+                "grade": grade, "domain": domain,
+                "file": f"grade{grade}/domain{domain_names.index(domain) + 1}.json", "topics": [],
+            })
+            shard["topics"].append(topic)
+    return write_curriculum(root, sorted(shards.values(), key=lambda s: (s["grade"], s["file"])))
+
+
+def measure(fn: Callable[[], object], repeat: int = 3) -> Dict:
+    """多次运行取耗时中位数与最小值；内存峰值用 tracemalloc 单独测一次"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "seconds": round(statistics.median(timings), 6),
+        "min_seconds": round(min(timings), 6),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def run_size(nodes: int, repeat: int = 3, depth: int = 12, fan_in: int = 3, domains: int = 4,
+             seed: int = 0) -> Dict[str, Dict]:
+    """对一个规模的合成课程跑全部基准，返回 {基准名: 结果}"""
+    from grade_six_visualizer import GradeSixVisualizer
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, "curriculum")
+        generate_synthetic_curriculum(root, nodes=nodes, depth=depth, fan_in=fan_in, domains=domains, seed=seed)
+
+        def build(backend):
+            with contextlib.redirect_stdout(io.StringIO()):
+                return GradeSixReviewGraph(loader=CurriculumLoader(root), backend=backend)
+
+        for backend in GradeSixReviewGraph.BACKENDS:
+            results[f"build_graph[{backend}]"] = measure(lambda: build(backend), repeat)
+
+        kg = build("networkx").freeze()
+        review_nodes = kg.review_nodes()
+        rng = random.Random(seed)
+        results["find_prerequisites"] = measure(
+            lambda: [kg.find_prerequisites(node) for node in review_nodes], repeat)
+
+        profiles = [{"weaknesses": rng.sample(review_nodes, min(3, len(review_nodes))), "target_days": 30}
+                    for _ in range(20)]
+        # 概念簇等按图谱版本预计算的数据单独计时，策略基准共用同一个推荐器
+        results["concept_clusters"] = measure(
+            lambda: detect_concept_clusters(kg.graph, kg.reachability.count_ancestors), repeat)
+        recommender = GradeSixReviewRecommender(kg)
+        recommender.concept_cluster_paths()
+        for strategy in GradeSixReviewRecommender.STRATEGY_PROFILE_FIELDS:
+            results[f"strategy[{strategy}]"] = measure(
+                lambda: [recommender.generate_review_plan(p, strategy) for p in profiles], repeat)
+
+        # 增量调整：在一份 365 天的弱项计划上换掉一个弱项
+        base_weak = review_nodes[:len(review_nodes) // 2]
+        base_plan = recommender.generate_review_plan(
+            {"weaknesses": base_weak, "target_days": 365}, "weakness_focused")
+        swap = review_nodes[-1]
+        results["replan_weakness_plan"] = measure(
+            lambda: recommender.replan_weakness_plan(base_plan, 7, added_weaknesses=[swap],
+                                                     removed_weaknesses=base_weak[:1]), repeat)
+
+        all_topics = list(kg.reachability.ancestors_of_all(review_nodes)) + review_nodes
+        results["review_scheduler[365d]"] = measure(
+            lambda: ReviewScheduler(kg.graph).schedule(all_topics, 365, review_nodes), repeat)
+        results["layered_layout"] = measure(lambda: layered_layout(kg.graph), repeat)
+
+        # 间隔重复：约 100 万个 (学生, 知识点) 复习项，先模拟 30 天复习，再测一次“今天到期”查询
+        engine = SpacedRepetitionEngine(kg.graph)
+        rng = random.Random(0)
+        for student in range(max(1, 1_000_000 // len(kg.node_ids))):
+            engine.enroll(student, kg.node_ids, 0)
+        for day in range(30):
+            rows, cols = engine.due_items(day)
+            engine.review_indices(rows, cols, [rng.randint(2, 5) for _ in range(len(rows))], day)
+        results["spaced_repetition.due_items"] = measure(lambda: engine.due_items(30), repeat)
+
+        # 知识追踪：10000 名学生的一批答题记录（每名学生 20 条）
+        tracer = KnowledgeTracer(kg.graph, capacity=10_000)
+        tracer.add_students(range(10_000))
+        events = 200_000
+        answer_rows = [rng.randrange(10_000) for _ in range(events)]
+        answer_cols = [rng.randrange(len(kg.node_ids)) for _ in range(events)]
+        answers = [rng.random() < 0.6 for _ in range(events)]
+        results["knowledge_tracing.update[10k students]"] = measure(
+            lambda: tracer.update_indices(answer_rows, answer_cols, answers), repeat)
+
+        # 组卷：10 万题的合成题库，覆盖 3 个弱项及其先修
+        assembler = PaperAssembler(generate_question_bank(kg.graph, size=100_000, seed=seed))
+        results["paper_assembly"] = measure(
+            lambda: assembler.assemble("综合模拟", review_nodes[:3], seed=seed), repeat)
+        # 批改：1000 份各 20 题的模拟答卷（单进程）
+        submissions = list(synthetic_submissions(assembler.bank, 1000, seed=seed))
+        results["auto_grader.grade[1k papers]"] = measure(
+            lambda: AutoGrader(assembler.bank).grade(submissions), repeat)
+
+        results["get_prerequisite_tree"] = measure(
+            lambda: _prerequisite_trees(GradeSixReviewRecommender(kg), review_nodes), repeat)
+
+        visualizer = GradeSixVisualizer(kg)
+        central = review_nodes[len(review_nodes) // 2]
+
+        results["render_table"] = measure(lambda: RenderTable(kg.graph, visualizer.review_colors), repeat)
+
+        def render_uncached(render):
+            visualizer.render_cache.clear()
+            return render()
+
+        results["render_roadmap"] = measure(
+            lambda: render_uncached(visualizer.render_review_roadmap), repeat)
+        results["render_mindmap"] = measure(
+            lambda: render_uncached(lambda: visualizer.render_concept_mindmap(central)), repeat)
+        results["render_overview"] = measure(
+            lambda: render_uncached(visualizer.render_curriculum_overview), repeat)
+        visualizer.render_review_roadmap()
+        results["render_roadmap[cached]"] = measure(visualizer.render_review_roadmap, repeat)
+    return results
+
+
+def _prerequisite_trees(recommender: GradeSixReviewRecommender, nodes: List[str]):
+    return [recommender.get_prerequisite_tree(node) for node in nodes]
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """与基线比较，返回退化项说明列表"""
+    regressions = []
+    for size, benches in results.items():
+        for name, result in benches.items():
+            base = baseline.get(size, {}).get(name)
+            if base is None or base["seconds"] <= 0:
+                continue
+            ratio = result["seconds"] / base["seconds"]
+            if ratio > 1 + tolerance:
+                regressions.append(
+                    f"[{size}] {name}: {result['seconds']:.4f}s vs 基线 {base['seconds']:.4f}s（{ratio:.2f}x）")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="知识图谱 / 复习推荐 / 可视化性能基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 1000, 5000], help="合成课程的节点数")
+    parser.add_argument("--depth", type=int, default=12)
+    parser.add_argument("--fan-in", type=int, default=3)
+    parser.add_argument("--domains", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="把本次结果写入 JSON 文件")
+    parser.add_argument("--save-baseline", help="把本次结果保存为基线")
+    parser.add_argument("--baseline", help="与已保存的基线比较")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="允许的相对耗时增长")
+    args = parser.parse_args(argv)
+
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    results = {}
+    for size in args.sizes:
+        results[str(size)] = run_size(size, repeat=args.repeat, depth=args.depth, fan_in=args.fan_in,
+                                      domains=args.domains, seed=args.seed)
+        print(f"== {size} 个知识点 ==")
+        for name, result in results[str(size)].items():
+            print(f"  {name:<40} {result['seconds'] * 1000:>10.2f} ms   峰值 {result['peak_kb']:>10.1f} KB")
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("发现性能退化：")
+            for line in regressions:
+                print("  " + line)
+            return 1
+        print("未发现性能退化")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""有界缓存：LRU 容量上限 + TTL 过期 + 命中统计 + 按版本整体失效"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class BoundedCache:
+    """线程安全的 LRU + TTL 缓存
+
+    - maxsize：最多保留的条目数，超出时淘汰最久未使用的条目；
+    - ttl：条目存活秒数，None 表示不过期；
+    - version：数据来源（如知识图谱）的版本戳，版本变化时旧条目全部失效。
+    计算在锁外进行，同一个键可能被并发重复计算，但结果总是一致的。
+    """
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.version = None
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def _check_version(self, version):
+        if version is not None and version != self.version:
+            if self._entries:
+                self._stats["invalidations"] += 1
+            self._entries.clear()
+            self.version = version
+
+    def get(self, key: Hashable, version=None, default=None):
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= self.clock():
+                del self._entries[key]
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return default
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, version=None):
+        with self._lock:
+            self._check_version(version)
+            expires_at = self.clock() + self.ttl if self.ttl is not None else None
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any], version=None):
+        """命中则返回缓存值，否则调用 compute() 计算并写入缓存"""
+        missing = _Missing
+        value = self.get(key, version=version, default=missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value, version=version)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats, size=len(self._entries), maxsize=self.maxsize)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
+
+
+_Missing = object()
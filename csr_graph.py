@@ -0,0 +1,260 @@
+"""数组存储（CSR）的只读知识图谱后端"""
+import sys
+from typing import Dict, Hashable, Iterator, List
+import networkx as nx
+import numpy as np
+
+_MISSING_INT = np.iinfo(np.int64).min
+
+
+class CSRGraph:
+    """用 NumPy CSR 邻接数组和列式属性存储的只读有向图
+
+    - 节点用整数编号，前驱/后继各一组 CSR（indptr + indices）数组；
+    - 节点属性按列存储：字符串列存为驻留字符串表的编号，数值/布尔列存为数组，
+      字符串列表列（keywords、common_errors 等）存为另一组 CSR；缺失值用掩码表示；
+    - 对外提供本项目用到的 networkx 查询接口（in、nodes、edges、predecessors、successors 等），
+      可用 to_networkx() 导出为 nx.DiGraph。
+
+    图构建完成后不可修改，与冻结的 networkx 图行为一致。
+    """
+    frozen = True
+
+    def __init__(self, node_ids: List[Hashable], edges: List[tuple], node_data: List[Dict]):
+        self._strings: List[str] = []
+        self._string_codes: Dict[str, int] = {}
+        self._node_ids = [self._intern_key(node_id) for node_id in node_ids]
+        self._index = {node_id: i for i, node_id in enumerate(self._node_ids)}
+
+        n = len(self._node_ids)
+        src = np.fromiter((self._index[u] for u, _, _ in edges), dtype=np.int32, count=len(edges))
+        dst = np.fromiter((self._index[v] for _, v, _ in edges), dtype=np.int32, count=len(edges))
+        # 后继 CSR 按源节点稳定排序，保持每个节点原有的边顺序；边属性与后继 CSR 对齐
+        succ_order = np.argsort(src, kind="stable")
+        self._succ_indptr = np.zeros(n + 1, dtype=np.int32)
+        np.cumsum(np.bincount(src, minlength=n), out=self._succ_indptr[1:])
+        self._succ_indices = dst[succ_order]
+        pred_order = np.argsort(dst, kind="stable")
+        self._pred_indptr = np.zeros(n + 1, dtype=np.int32)
+        np.cumsum(np.bincount(dst, minlength=n), out=self._pred_indptr[1:])
+        self._pred_indices = src[pred_order]
+
+        self._node_columns = self._build_columns(node_data)
+        self._edge_columns = self._build_columns([edges[i][2] for i in succ_order])
+
+    @classmethod
+    def from_networkx(cls, graph: nx.DiGraph) -> "CSRGraph":
+        return cls(list(graph.nodes()), list(graph.edges(data=True)), [data for _, data in graph.nodes(data=True)])
+
+    def to_networkx(self) -> nx.DiGraph:
+        """导出为（可修改的）networkx 有向图，便于兼容 networkx 算法"""
+        graph = nx.DiGraph()
+        graph.add_nodes_from(self.nodes(data=True))
+        graph.add_edges_from(self.edges(data=True))
+        return graph
+
+    # ---------- 字符串驻留与列式存储 ----------
+    def _intern_key(self, value):
+        return sys.intern(value) if isinstance(value, str) else value
+
+    def _string_code(self, value: str) -> int:
+        code = self._string_codes.get(value)
+        if code is None:
+            code = len(self._strings)
+            self._string_codes[value] = code
+            self._strings.append(sys.intern(value))
+        return code
+
+    def _build_columns(self, records: List[Dict]) -> Dict[str, tuple]:
+        """把属性字典列表转换为列：{属性名: (类型, 数据...)}"""
+        keys = []
+        for record in records:
+            for key in record:
+                if key not in keys:
+                    keys.append(key)
+
+        columns = {}
+        for key in keys:
+            values = [record.get(key, _Missing) for record in records]
+            present = [v for v in values if v is not _Missing]
+            mask = np.fromiter((v is not _Missing for v in values), dtype=bool, count=len(values))
+            if all(isinstance(v, bool) for v in present):
+                data = np.fromiter((bool(v) if v is not _Missing else False for v in values), dtype=bool)
+                columns[key] = ("bool", mask, data)
+            elif all(isinstance(v, int) and not isinstance(v, bool) for v in present):
+                data = np.fromiter((v if v is not _Missing else _MISSING_INT for v in values), dtype=np.int64)
+                columns[key] = ("int", mask, data)
+            elif all(isinstance(v, float) for v in present):
+                data = np.fromiter((v if v is not _Missing else np.nan for v in values), dtype=np.float64)
+                columns[key] = ("float", mask, data)
+            elif all(isinstance(v, str) for v in present):
+                data = np.fromiter((self._string_code(v) if v is not _Missing else -1 for v in values), dtype=np.int32)
+                columns[key] = ("str", mask, data)
+            elif all(isinstance(v, list) and all(isinstance(item, str) for item in v) for v in present):
+                lengths = [len(v) if v is not _Missing else 0 for v in values]
+                indptr = np.zeros(len(values) + 1, dtype=np.int32)
+                np.cumsum(lengths, out=indptr[1:])
+                codes = [self._string_code(item) for v in values if v is not _Missing for item in v]
+                columns[key] = ("str_list", mask, indptr, np.asarray(codes, dtype=np.int32))
+            else:
+                columns[key] = ("object", mask, list(values))
+        return columns
+
+    def _record(self, columns: Dict[str, tuple], i: int) -> Dict:
+        record = {}
+        for key, column in columns.items():
+            kind, mask = column[0], column[1]
+            if not mask[i]:
+                continue
+            if kind == "bool":
+                record[key] = bool(column[2][i])
+            elif kind == "int":
+                record[key] = int(column[2][i])
+            elif kind == "float":
+                record[key] = float(column[2][i])
+            elif kind == "str":
+                record[key] = self._strings[column[2][i]]
+            elif kind == "str_list":
+                indptr, codes = column[2], column[3]
+                record[key] = [self._strings[c] for c in codes[indptr[i]:indptr[i + 1]]]
+            else:
+                record[key] = column[2][i]
+        return record
+
+    def node_attribute_array(self, key: str):
+        """直接取某个节点属性的整列（按节点编号对齐），用于向量化计算"""
+        column = self._node_columns[key]
+        if column[0] == "str":
+            return np.array([self._strings[c] if c >= 0 else None for c in column[2]], dtype=object)
+        return column[2]
+
+    # ---------- networkx 兼容的查询接口 ----------
+    @property
+    def nodes(self) -> "_CSRNodeView":
+        return _CSRNodeView(self)
+
+    @property
+    def edges(self) -> "_CSREdgeView":
+        return _CSREdgeView(self)
+
+    def __contains__(self, node_id) -> bool:
+        try:
+            return node_id in self._index
+        except TypeError:
+            return False
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self._node_ids)
+
+    def __len__(self) -> int:
+        return len(self._node_ids)
+
+    def has_node(self, node_id) -> bool:
+        return node_id in self
+
+    def has_edge(self, u, v) -> bool:
+        if u not in self._index or v not in self._index:
+            return False
+        i = self._index[u]
+        return bool(np.any(self._succ_indices[self._succ_indptr[i]:self._succ_indptr[i + 1]] == self._index[v]))
+
+    def index_of(self, node_id) -> int:
+        """节点ID对应的整数编号"""
+        return self._index[node_id]
+
+    def _position(self, node_id) -> int:
+        try:
+            return self._index[node_id]
+        except KeyError:
+            raise nx.NetworkXError(f"The node {node_id} is not in the digraph.") from None
+
+    def successors(self, node_id) -> Iterator[Hashable]:
+        i = self._position(node_id)
+        return (self._node_ids[j] for j in self._succ_indices[self._succ_indptr[i]:self._succ_indptr[i + 1]])
+
+    def predecessors(self, node_id) -> Iterator[Hashable]:
+        i = self._position(node_id)
+        return (self._node_ids[j] for j in self._pred_indices[self._pred_indptr[i]:self._pred_indptr[i + 1]])
+
+    neighbors = successors
+
+    def in_degree_array(self) -> np.ndarray:
+        return np.diff(self._pred_indptr)
+
+    def out_degree_array(self) -> np.ndarray:
+        return np.diff(self._succ_indptr)
+
+    def number_of_nodes(self) -> int:
+        return len(self._node_ids)
+
+    def number_of_edges(self) -> int:
+        return len(self._succ_indices)
+
+    def is_directed(self) -> bool:
+        return True
+
+    def _frozen(self, *args, **kwargs):
+        raise nx.NetworkXError("Frozen graph can't be modified")
+
+    add_node = add_nodes_from = add_edge = add_edges_from = _frozen
+    remove_node = remove_nodes_from = remove_edge = remove_edges_from = _frozen
+
+
+class _MissingType:
+    __slots__ = ()
+
+
+_Missing = _MissingType()
+
+
+class _CSRNodeView:
+    """仿 networkx NodeView：G.nodes[n]、G.nodes()、G.nodes(data=True)、len(G.nodes)"""
+    def __init__(self, graph: CSRGraph):
+        self._graph = graph
+
+    def __call__(self, data: bool = False):
+        if not data:
+            return iter(self._graph._node_ids)
+        columns = self._graph._node_columns
+        return ((node_id, self._graph._record(columns, i)) for i, node_id in enumerate(self._graph._node_ids))
+
+    def __getitem__(self, node_id) -> Dict:
+        return self._graph._record(self._graph._node_columns, self._graph._position(node_id))
+
+    def __iter__(self):
+        return iter(self._graph._node_ids)
+
+    def __len__(self) -> int:
+        return len(self._graph._node_ids)
+
+    def __contains__(self, node_id) -> bool:
+        return node_id in self._graph
+
+
+class _CSREdgeView:
+    """仿 networkx EdgeView：G.edges()、G.edges(data=True)、G.edges[u, v]"""
+    def __init__(self, graph: CSRGraph):
+        self._graph = graph
+
+    def __call__(self, data: bool = False):
+        graph = self._graph
+        for i, u in enumerate(graph._node_ids):
+            for k in range(graph._succ_indptr[i], graph._succ_indptr[i + 1]):
+                v = graph._node_ids[graph._succ_indices[k]]
+                yield (u, v, graph._record(graph._edge_columns, k)) if data else (u, v)
+
+    def __getitem__(self, edge) -> Dict:
+        graph = self._graph
+        u, v = edge
+        i, j = graph._position(u), graph._position(v)
+        start, stop = graph._succ_indptr[i], graph._succ_indptr[i + 1]
+        hits = np.nonzero(graph._succ_indices[start:stop] == j)[0]
+        if len(hits) == 0:
+            raise KeyError(f"The edge {u}-{v} is not in the graph.")
+        return graph._record(graph._edge_columns, start + int(hits[0]))
+
+    def __iter__(self):
+        return self()
+
+    def __len__(self) -> int:
+        return self._graph.number_of_edges()
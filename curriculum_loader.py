@@ -0,0 +1,186 @@
+"""课程数据加载器：按年级、领域分片的 JSON 课程数据，按需解析"""
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Optional
+
+DEFAULT_CURRICULUM_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "curriculum")
+MANIFEST_NAME = "manifest.json"
+
+
+class CurriculumLoader:
+    """课程数据加载器
+
+    数据目录结构：
+        manifest.json            分片清单：每个分片的年级、领域、文件名及其依赖的分片
+        grade<N>/<domain>.json   单个分片：{"grade": N, "domain": 领域, "topics": [...]}
+
+    启动时只读取很小的清单；分片文件在第一次被请求时才解析并缓存，
+    因此只需要六年级复习的会话只会解析六年级分片及其先修所在的分片。
+    """
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, root: str = DEFAULT_CURRICULUM_DIR):
+        self.root = root
+        self._manifest = None
+        self._shards: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def default(cls) -> "CurriculumLoader":
+        """进程内共享的默认加载器（分片只解析一次）"""
+        if cls._default is None:
+            with cls._default_lock:
+                if cls._default is None:
+                    cls._default = cls()
+        return cls._default
+
+    @property
+    def manifest(self) -> Dict:
+        if self._manifest is None:
+            with open(os.path.join(self.root, MANIFEST_NAME), "r", encoding="utf-8") as f:
+                self._manifest = json.load(f)
+        return self._manifest
+
+    def grades(self) -> List[int]:
+        return sorted({shard["grade"] for shard in self.manifest["shards"]})
+
+    def domains(self, grade: Optional[int] = None) -> List[str]:
+        domains = []
+        for shard in self.manifest["shards"]:
+            if (grade is None or shard["grade"] == grade) and shard["domain"] not in domains:
+                domains.append(shard["domain"])
+        return domains
+
+    def _select_shards(self, grades: Optional[Iterable[int]], domains: Optional[Iterable[str]]) -> List[Dict]:
+        grades = set(grades) if grades is not None else None
+        domains = set(domains) if domains is not None else None
+        return [
+            shard for shard in self.manifest["shards"]
+            if (grades is None or shard["grade"] in grades)
+            and (domains is None or shard["domain"] in domains)
+        ]
+
+    def _read_shard(self, shard: Dict) -> Dict:
+        """解析单个分片文件（带缓存，线程安全）"""
+        file_name = shard["file"]
+        if file_name not in self._shards:
+            with self._lock:
+                if file_name not in self._shards:
+                    with open(os.path.join(self.root, file_name), "r", encoding="utf-8") as f:
+                        self._shards[file_name] = json.load(f)
+        return self._shards[file_name]
+
+    @property
+    def loaded_shards(self) -> List[str]:
+        """已解析的分片文件名（用于观察懒加载效果）"""
+        return list(self._shards)
+
+    def load(self, grades: Optional[Iterable[int]] = None, domains: Optional[Iterable[str]] = None,
+             with_prerequisites: bool = True) -> Dict[str, List[Dict]]:
+        """加载指定年级、领域的课程切片，返回 {领域: [知识点, ...]}
+
+        with_prerequisites 为 True 时同时包含切片之外的传递先修知识点（排在切片之前）。
+        """
+        curriculum: Dict[str, List[Dict]] = {}
+        for shard in self._select_shards(grades, domains):
+            curriculum.setdefault(shard["domain"], []).extend(self._read_shard(shard)["topics"])
+        if not with_prerequisites:
+            return curriculum
+
+        merged = self.load_prerequisites(curriculum)
+        for domain, topics in curriculum.items():
+            merged.setdefault(domain, []).extend(topics)
+        return merged
+
+    def load_prerequisites(self, curriculum: Dict[str, List[Dict]]) -> Dict[str, List[Dict]]:
+        """加载课程切片在切片之外的全部传递先修知识点，返回 {领域: [知识点, ...]}
+
+        只解析切片分片依赖闭包内的分片，再在其中按知识点精确裁剪出传递先修。
+        """
+        slice_ids = {topic["id"] for topics in curriculum.values() for topic in topics}
+        slice_domains = set(curriculum)
+        shards_by_file = {shard["file"]: shard for shard in self.manifest["shards"]}
+
+        # 1. 分片级依赖闭包
+        frontier = [
+            shard["file"] for shard in self.manifest["shards"]
+            if shard["domain"] in slice_domains
+            and any(topic["id"] in slice_ids for topic in self._read_shard(shard)["topics"])
+        ]
+        needed_files = []
+        seen_files = set(frontier)
+        while frontier:
+            file_name = frontier.pop()
+            for dep in shards_by_file[file_name].get("requires", []):
+                if dep not in seen_files:
+                    seen_files.add(dep)
+                    needed_files.append(dep)
+                    frontier.append(dep)
+
+        topic_index = {}
+        for file_name in needed_files:
+            shard = shards_by_file[file_name]
+            for topic in self._read_shard(shard)["topics"]:
+                topic_index[topic["id"]] = (shard, topic)
+
+        # 2. 知识点级传递先修
+        pending = [ref for topics in curriculum.values() for topic in topics for ref in _topic_refs(topic)]
+        required = set()
+        while pending:
+            node_id = pending.pop()
+            if node_id in slice_ids or node_id in required or node_id not in topic_index:
+                continue
+            required.add(node_id)
+            pending.extend(_topic_refs(topic_index[node_id][1]))
+
+        shard_order = {file_name: i for i, file_name in enumerate(shards_by_file)}
+        prerequisites: Dict[str, List[Dict]] = {}
+        for file_name in sorted(needed_files, key=shard_order.get):
+            shard = shards_by_file[file_name]
+            for topic in self._read_shard(shard)["topics"]:
+                if topic["id"] in required:
+                    prerequisites.setdefault(shard["domain"], []).append(topic)
+        return prerequisites
+
+
+def _topic_refs(topic: Dict) -> List[str]:
+    """知识点依赖的其他知识点：先修及关联关系的来源"""
+    return list(topic.get("prerequisites", [])) + [rel["source"] for rel in topic.get("relations", [])]
+
+
+def write_curriculum(root: str, shards: Iterable[Dict]):
+    """把课程写成分片数据目录
+
+    shards 中每项为 {"grade": N, "domain": 领域, "file": 相对路径, "topics": [...]}，
+    分片间的依赖（requires）根据知识点的先修关系自动计算。
+    """
+    shards = list(shards)
+    owner = {topic["id"]: shard["file"] for shard in shards for topic in shard["topics"]}
+    manifest = {"format": 1, "shards": []}
+    for shard in shards:
+        requires = []
+        for topic in shard["topics"]:
+            for ref in _topic_refs(topic):
+                dep = owner.get(ref)
+                if dep is not None and dep != shard["file"] and dep not in requires:
+                    requires.append(dep)
+        manifest["shards"].append({
+            "grade": shard["grade"],
+            "domain": shard["domain"],
+            "file": shard["file"],
+            "topics": len(shard["topics"]),
+            "requires": requires,
+        })
+        path = os.path.join(root, shard["file"])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"grade": shard["grade"], "domain": shard["domain"], "topics": shard["topics"]},
+                      f, ensure_ascii=False, indent=1)
+            f.write("\n")
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+        f.write("\n")
+    return manifest
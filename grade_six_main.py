@@ -1,41 +1,54 @@
 """六年级主界面"""
 import streamlit as st
-import json
+import io
 import pandas as pd
 import plotly.graph_objects as go
 
 # 导入其他模块
-from knowledge_graph import GradeSixReviewGraph
+from knowledge_graph import get_shared_review_graph
+from mastery_overlay import MasteryOverlay
+from bounded_cache import BoundedCache
+from auto_grader import AutoGrader
 from grade_six_visualizer import GradeSixVisualizer
+from graph_lod import cluster_id
+from graph_view import graph_view
+from knowledge_tracing import KnowledgeTracer, parse_correct
+from lazy_plan import write_json
+from question_bank import PaperAssembler, generate_question_bank
 from review_path_recommender import GradeSixReviewRecommender
 
-def generate_test_paper(test_type, weak_nodes):
-    """生成测试试卷（简化版）"""
-    questions = []
-    
-    if test_type == "单元测试":
-        questions = [
-            {
-                "type": "选择题",
-                "content": "下列哪个数是质数？",
-                "options": ["4", "6", "7", "9"],
-                "score": 5
-            }
-        ]
-    else:
-        questions = [
-            {
-                "type": "应用题",
-                "content": "小明有若干苹果，分给同学们后还剩3个，请问原来有多少苹果？",
-                "score": 10
-            }
-        ]
-    
-    return {
-        "test_type": test_type,
-        "total_score": sum(q["score"] for q in questions),
-        "questions": questions
-    }
+DAYS_PER_PAGE = 7  # 复习计划每页显示的天数
+
+@st.cache_resource(show_spinner=False)
+def load_review_system():
+    """进程级共享资源：图谱、可视化器、推荐器每个进程只构建一次，所有会话只读复用"""
+    kg = get_shared_review_graph()
+    visualizer = GradeSixVisualizer(kg, render_cache=BoundedCache(maxsize=256))
+    recommender = GradeSixReviewRecommender(kg, plan_cache=BoundedCache(maxsize=2048, ttl=3600))
+    return kg, visualizer, recommender
+
+@st.cache_resource(show_spinner=False)
+def load_paper_assembler(graph_version: str) -> PaperAssembler:
+    """进程级共享的题库与组卷器；graph_version 只用作缓存键"""
+    kg = load_review_system()[0]
+    return PaperAssembler(generate_question_bank(kg.graph))
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def trace_answer_log(graph_version: str, content: bytes) -> dict:
+    """按答题记录做知识追踪，返回 {学生: {"weaknesses", "mastered"}}；graph_version 只用作缓存键"""
+    kg = load_review_system()[0]
+    log = pd.read_csv(io.BytesIO(content), dtype={"student": str, "topic": str, "correct": str})
+    tracer = KnowledgeTracer(kg.graph)
+    tracer.update(log["student"], log["topic"], parse_correct(log["correct"]))
+    return {student: tracer.student_profile(student) for student in tracer.students}
+
+def get_session_state(kg):
+    """获取当前会话的私有状态；掌握情况等可变数据只保存在会话内，不写入共享图谱"""
+    if st.session_state.get("graph_version") != kg.version:
+        st.session_state["graph_version"] = kg.version
+        st.session_state["mastery"] = MasteryOverlay(kg)
+        st.session_state["mastered_selection"] = []
+    return st.session_state
 
 def main():
     st.title("🎓 小学六年级数学总复习智能系统")
@@ -43,9 +56,8 @@ def main():
     # 初始化六年级专项图谱
     with st.spinner("加载六年级复习知识体系..."):
         try:
-            kg = GradeSixReviewGraph()
-            visualizer = GradeSixVisualizer(kg.graph)
-            recommender = GradeSixReviewRecommender(kg.graph)
+            kg, visualizer, recommender = load_review_system()
+            session = get_session_state(kg)
             st.success("✅ 系统初始化成功！")
         except Exception as e:
             st.error(f"❌ 系统初始化失败: {e}")
@@ -64,6 +76,18 @@ def main():
         default=["分数运算", "简易方程"]
     )
     
+    # 已掌握知识点：写入本会话的掌握情况覆盖层，只同步发生变化的知识点
+    mastery = session["mastery"]
+    review_nodes = kg.review_nodes()
+    mastered_selection = st.sidebar.multiselect(
+        "已掌握知识点",
+        options=review_nodes,
+        format_func=lambda node: f"{node} {kg.graph.nodes[node]['name']}",
+        key="mastered_selection"
+    )
+    for node in set(mastered_selection).symmetric_difference(mastery.mastered_nodes()):
+        mastery.set_mastered(node, node in mastered_selection)
+    
     # 映射薄弱模块到知识点ID
     weak_mapping = {
         "分数运算": ["NA1"],
@@ -80,6 +104,22 @@ def main():
     for area in weak_areas:
         weak_nodes.extend(weak_mapping.get(area, []))
     
+    # 答题记录（可选）：用知识追踪估计掌握概率，估计出的弱项并入薄弱模块
+    answer_log = st.sidebar.file_uploader("答题记录（CSV：student, topic, correct）", type="csv")
+    if answer_log is not None:
+        try:
+            traced = trace_answer_log(kg.version, answer_log.getvalue())
+        except (KeyError, ValueError) as e:
+            st.sidebar.error(f"答题记录解析失败: {e}")
+        else:
+            students = sorted(traced)
+            traced_student = st.sidebar.selectbox(
+                "对应学生", students, index=students.index(student_name) if student_name in students else 0)
+            traced_weak = traced[traced_student]["weaknesses"]
+            weak_nodes.extend(node for node in traced_weak if node not in weak_nodes)
+            st.sidebar.caption(f"根据答题记录估计：{len(traced_weak)} 个弱项，"
+                               f"{len(traced[traced_student]['mastered'])} 个已掌握")
+    
     # 复习目标选择
     st.sidebar.subheader("复习目标")
     review_target = st.sidebar.selectbox(
@@ -88,7 +128,8 @@ def main():
         index=0
     )
     
-    available_days = st.sidebar.slider("可用复习天数", 7, 90, 30)
+    available_days = st.sidebar.slider("可用复习天数", 7, 365, 30)
+    daily_minutes = st.sidebar.slider("每日复习时长（分钟）", 30, 180, 90, step=10)
     
     # 主界面标签页
     tab1, tab2, tab3, tab4, tab5 = st.tabs([
@@ -100,28 +141,37 @@ def main():
         
         col1, col2 = st.columns([3, 1])
         with col1:
-            if st.button("生成复习路线图", key="roadmap"):
-                roadmap_file = visualizer.create_review_roadmap()
-                if roadmap_file:
-                    with open(roadmap_file, 'r', encoding='utf-8') as f:
-                        html_content = f.read()
-                    st.components.v1.html(html_content, height=950, scrolling=True)
+            view = st.radio("视图", ["复习路线图", "全课程聚类概览"], horizontal=True)
+            budget = st.slider("最多显示节点数", 30, 500, GradeSixVisualizer.DEFAULT_BUDGET, step=10)
+            # 图谱视图首次加载完整数据，之后掌握情况等变化只把差异发给浏览器
+            if view == "复习路线图":
+                graph_view(visualizer.review_roadmap_data(mastery=mastery, budget=budget),
+                           key="roadmap_view", data_id=f"roadmap:{kg.version}:{budget}", height=950)
+                if st.button("导出路线图 HTML", key="roadmap"):
+                    st.download_button("下载路线图 HTML", data=visualizer.render_review_roadmap(mastery, budget),
+                                       file_name="review_roadmap.html", mime="text/html")
+            else:
+                groups = visualizer.cluster_groups()
+                expanded = st.session_state.get("overview_expanded", [])
+                clicked = graph_view(visualizer.curriculum_overview_data(expanded, mastery=mastery, budget=budget),
+                                     key="overview_view", data_id=f"overview:{kg.version}:{budget}", height=950)
+                # 点击聚类节点即展开该模块
+                clusters = {cluster_id(group): group for group in groups}
+                if clicked in clusters and clusters[clicked] not in expanded:
+                    st.session_state["overview_expanded"] = expanded + [clusters[clicked]]
+                    st.rerun()
+                st.multiselect(
+                    "展开的知识模块",
+                    options=list(groups),
+                    format_func=lambda key: f"{key[0]} · {key[1]}年级（{len(groups[key])}个）",
+                    key="overview_expanded"
+                )
         
         with col2:
             st.subheader("知识模块分布")
             
-            # 统计各模块掌握情况
-            domains = {}
-            for node in kg.graph.nodes():
-                if kg.graph.nodes[node].get('is_review', False):
-                    domain = kg.graph.nodes[node].get('domain', '未知')
-                    if domain not in domains:
-                        domains[domain] = {"total": 0, "mastered": 0}
-                    domains[domain]["total"] += 1
-                    if kg.graph.nodes[node].get('mastered', False):
-                        domains[domain]["mastered"] += 1
-            
-            for domain, stats in domains.items():
+            # 各模块掌握情况（会话内增量维护的计数器，无需扫描全图）
+            for domain, stats in mastery.progress.items():
                 progress = stats["mastered"] / stats["total"] if stats["total"] > 0 else 0
                 st.write(f"**{domain}**")
                 st.progress(progress)
@@ -136,6 +186,8 @@ def main():
             "weaknesses": weak_nodes,
             "target": review_target,
             "available_days": available_days,
+            "target_days": available_days,
+            "daily_minutes": daily_minutes,
             "days_until_exam": available_days
         }
         
@@ -154,41 +206,99 @@ def main():
         if st.button("生成个性化复习计划", type="primary"):
             with st.spinner("正在为您制定最优复习方案..."):
                 try:
-                    plan = recommender.generate_review_plan(student_profile, strategy)
-                    
-                    st.success(f"✅ 已为{student_name}生成{available_days}天复习计划")
-                    
-                    # 显示计划概览
-                    st.subheader("📅 复习计划概览")
-                    
-                    if strategy == "exam_preparation":
-                        for phase, details in plan["schedule"].items():
-                            with st.expander(f"**{phase}**"):
-                                st.write(f"**重点内容:** {', '.join(details['focus'])}")
-                                st.write(f"**练习类型:** {details['practice_type']}")
-                                
-                                # 显示每日计划
-                                st.write("**每日安排:**")
-                                for day, daily_plan in details["daily_plan"].items():
-                                    st.write(f"- {day}: {', '.join(daily_plan['知识点名称'])}")
-                    
-                    elif strategy == "weakness_focused":
-                        for week, details in plan["schedule"].items():
-                            with st.expander(f"**{week}**"):
-                                st.write(f"**目标:** {details['目标']}")
-                                st.write(f"**知识点:** {', '.join(details['知识点'])}")
-                    
-                    # 下载计划
-                    plan_json = json.dumps(plan, ensure_ascii=False, indent=2)
-                    st.download_button(
-                        label="下载复习计划",
-                        data=plan_json,
-                        file_name=f"{student_name}_数学复习计划.json",
-                        mime="application/json"
-                    )
-                    
+                    # 计划保存在会话中，翻页等交互引起的重跑不必重新生成
+                    st.session_state["review_plan"] = {
+                        "plan": recommender.generate_review_plan(student_profile, strategy, mastery=mastery),
+                        "strategy": strategy,
+                        "student_name": student_name,
+                        "days": available_days,
+                        "daily_minutes": daily_minutes,
+                        "weak_nodes": list(weak_nodes),
+                        "mastered": mastery.mastered_nodes(),
+                    }
                 except Exception as e:
+                    st.session_state.pop("review_plan", None)
                     st.error(f"生成计划失败: {e}")
+        
+        generated = st.session_state.get("review_plan")
+        if generated:
+            plan, plan_strategy = generated["plan"], generated["strategy"]
+            st.success(f"✅ 已为{generated['student_name']}生成{generated['days']}天复习计划")
+            
+            # 显示计划概览
+            st.subheader("📅 复习计划概览")
+            
+            if plan_strategy == "exam_preparation":
+                if plan.get("merged_phases"):
+                    st.info(f"距离考试不足{len(plan['merged_phases']) + len(plan['schedule'])}天，"
+                            f"{'、'.join(plan['merged_phases'])}阶段已并入第一阶段")
+                for i, (phase, details) in enumerate(plan["schedule"].items()):
+                    with st.expander(f"**{phase}**"):
+                        st.write(f"**重点内容:** {', '.join(details['focus'])}")
+                        st.write(f"**练习类型:** {details['practice_type']}")
+                        
+                        # 每日安排按需生成，每次只显示一页
+                        daily_plan = details["daily_plan"]
+                        st.write("**每日安排:**")
+                        page = 0
+                        if daily_plan.page_count(DAYS_PER_PAGE) > 1:
+                            page = st.number_input(
+                                f"页码（共 {daily_plan.page_count(DAYS_PER_PAGE)} 页，每页 {DAYS_PER_PAGE} 天）",
+                                min_value=1, max_value=daily_plan.page_count(DAYS_PER_PAGE),
+                                value=1, key=f"plan_page_{i}") - 1
+                        for day, day_plan in daily_plan.page(page, DAYS_PER_PAGE):
+                            st.write(f"- {day}: {', '.join(day_plan['知识点名称']) or '机动复习'}")
+            
+            elif plan_strategy == "weakness_focused":
+                # 薄弱模块或已掌握知识点变化后，在当前计划上增量调整，已完成的天保持不变
+                previous_weak, previous_mastered = set(generated["weak_nodes"]), set(generated["mastered"])
+                current_mastered = set(mastery.mastered_nodes())
+                if set(weak_nodes) != previous_weak or current_mastered != previous_mastered:
+                    st.info("薄弱模块或已掌握知识点有变化，可以在当前计划上增量调整")
+                    completed_days = st.number_input("已完成天数（这些天保持不变）", 0, generated["days"], 0)
+                    if st.button("增量调整计划"):
+                        plan = recommender.replan_weakness_plan(
+                            plan, completed_days,
+                            added_weaknesses=set(weak_nodes) - previous_weak,
+                            removed_weaknesses=previous_weak - set(weak_nodes),
+                            added_mastered=current_mastered - previous_mastered,
+                            removed_mastered=previous_mastered - current_mastered,
+                            mastery=mastery,
+                        )
+                        generated.update(plan=plan, weak_nodes=list(weak_nodes), mastered=sorted(current_mastered))
+                        diff = plan["diff"]
+                        st.success(f"已调整：新增 {len(diff['added'])} 个、移除 {len(diff['removed'])} 个、"
+                                   f"改期 {len(diff['moved'])} 个知识点"
+                                   + ("（未完成的天数已整体重排）" if diff["full_replan"] else ""))
+                if plan.get("unknown_topics"):
+                    st.warning(f"以下弱项不在知识图谱中，未排入计划：{', '.join(plan['unknown_topics'])}")
+                if plan["unscheduled"]:
+                    st.warning(f"在{generated['days']}天、每天{generated['daily_minutes']}分钟内还有"
+                               f"{len(plan['unscheduled'])}个知识点排不下：{', '.join(plan['unscheduled'])}")
+                for week, details in plan["schedule"].items():
+                    with st.expander(f"**{week}**"):
+                        st.write(f"**目标:** {details['目标']}")
+                        st.write(f"**知识点:** {', '.join(details['知识点'])}")
+                        for (day, topics), minutes in zip(details["每日安排"].items(), details["每日时长"]):
+                            st.write(f"- {day}（约{minutes}分钟）: {', '.join(topics)}")
+            
+            elif plan_strategy == "concept_integration":
+                for cluster in plan["concept_clusters"]:
+                    with st.expander(f"**{cluster['cluster']}**"):
+                        st.caption(cluster["description"])
+                        for step in cluster["learning_path"]:
+                            mark = "✅" if step["mastered"] else "⬜"
+                            st.write(f"{mark} {step['concept']} {step['name']}（先修 {step['prerequisite_count']} 个）")
+            
+            # 下载计划：逐天流式序列化，不先展开整份计划
+            plan_json = io.StringIO()
+            write_json(plan, plan_json)
+            st.download_button(
+                label="下载复习计划",
+                data=plan_json.getvalue(),
+                file_name=f"{generated['student_name']}_数学复习计划.json",
+                mime="application/json"
+            )
     
     with tab3:
         st.header("🎯 专题突破训练")
@@ -212,12 +322,13 @@ def main():
         # 显示专题知识结构
         st.subheader("专题知识结构")
         
+        hops = st.slider("关联层数", 1, 4, 1, help="显示几层以内的先修知识与后续应用")
         if st.button("生成思维导图"):
-            mindmap_file = visualizer.create_concept_mindmap(selected_topic)
-            if mindmap_file:
-                with open(mindmap_file, 'r', encoding='utf-8') as f:
-                    html_content = f.read()
+            html_content = visualizer.render_concept_mindmap(selected_topic, hops=hops)
+            if html_content:
                 st.components.v1.html(html_content, height=850, scrolling=True)
+                st.download_button("导出思维导图 HTML", data=html_content,
+                                   file_name=f"{selected_topic}_concept_mindmap.html", mime="text/html")
         
         # 专题练习
         st.subheader("专题练习建议")
@@ -255,29 +366,62 @@ def main():
             ["单元测试", "专题测试", "综合模拟", "小升初真题"]
         )
         
-        # 生成测试卷
+        # 生成测试卷：避开本会话做过的题，试卷保存在会话中，作答与提交引起的重跑不会丢失
+        seen_questions = st.session_state.setdefault("seen_questions", set())
         if st.button("生成模拟试卷"):
             with st.spinner("正在组卷中..."):
-                test_paper = generate_test_paper(test_type, weak_nodes)
-                
-                st.subheader(f"{test_type}试卷")
-                
-                for i, question in enumerate(test_paper["questions"], 1):
-                    with st.expander(f"第{i}题: {question['type']} ({question['score']}分)"):
-                        st.write(f"**题目:** {question['content']}")
-                        
-                        if question['type'] == '选择题':
-                            for option in question['options']:
-                                st.write(f"- {option}")
-                        
-                        # 答题区
-                        if question['type'] == '选择题':
-                            answer = st.radio("请选择:", question['options'], key=f"q{i}")
-                        else:
-                            answer = st.text_area("请作答:", key=f"q{i}")
-                
-                if st.button("提交试卷"):
-                    st.success("试卷提交成功！系统将自动批改并生成分析报告")
+                try:
+                    paper = load_paper_assembler(kg.version).assemble(test_type, weak_nodes, seen=seen_questions)
+                except ValueError as e:
+                    st.error(f"组卷失败: {e}")
+                else:
+                    st.session_state["test_paper"] = paper
+                    st.session_state.pop("paper_result", None)
+                    seen_questions.update(q["id"] for q in paper["questions"])
+        
+        test_paper = st.session_state.get("test_paper")
+        if test_paper:
+            st.subheader(f"{test_paper['test_type']}试卷（共{test_paper['total_score']}分）")
+            coverage = test_paper["coverage"]
+            if coverage["weaknesses"] or coverage["prerequisites"]:
+                st.caption(f"覆盖弱项 {', '.join(coverage['weaknesses']) or '无'}；"
+                           f"覆盖先修 {', '.join(coverage['prerequisites']) or '无'}")
+            
+            for i, question in enumerate(test_paper["questions"], 1):
+                with st.expander(f"第{i}题: {question['type']} ({question['score']}分)"):
+                    st.write(f"**题目:** {question['content']}")
+                    
+                    # 答题区
+                    if question['type'] == '选择题':
+                        st.radio("请选择:", question['options'], index=None, key=f"answer_{question['id']}")
+                    else:
+                        st.text_area("请作答:", key=f"answer_{question['id']}")
+            
+            if st.button("提交试卷"):
+                questions = [q["id"] for q in test_paper["questions"]]
+                submission = {
+                    "student": student_name,
+                    "questions": questions,
+                    "answers": {item: st.session_state.get(f"answer_{item}") for item in questions},
+                }
+                grader = AutoGrader(load_paper_assembler(kg.version).bank)
+                st.session_state["paper_result"] = grader.grade([submission])[0]
+            
+            result = st.session_state.get("paper_result")
+            if result and "error" in result:
+                st.error(f"无法批改这份试卷：{result['error']}")
+            elif result:
+                st.success(f"批改完成：得分 {result['score']} / {result['total']}，"
+                           f"答错 {len(result['wrong'])} 题")
+                rows = [
+                    {"知识点": kg.graph.nodes[topic].get("name", topic), "答对": right, "题数": asked,
+                     "正确率": right / asked}
+                    for topic, (right, asked) in result["by_topic"].items()
+                ]
+                st.dataframe(pd.DataFrame(rows).sort_values("正确率"), hide_index=True)
+                weak = [row["知识点"] for row in rows if row["正确率"] < 0.6]
+                if weak:
+                    st.warning(f"建议加强：{', '.join(weak)}")
     
     with tab5:
         st.header("📊 学习报告与分析")
@@ -1,12 +1,30 @@
 """六年级知识图谱可视化器"""
 import streamlit as st
+import json
 import math
+from typing import Optional
 from pyvis.network import Network
 from knowledge_visualizer_base import KnowledgeVisualizer
+from bounded_cache import BoundedCache
+from graph_layout import layered_layout
+from graph_lod import clustered_view, ego_nodes, group_nodes, review_phases
+from render_table import DEFAULT_COLOR, RenderTable
 
 class GradeSixVisualizer(KnowledgeVisualizer):
-    def __init__(self, graph):
+    """六年级知识图谱可视化器
+
+    render_* 方法在内存中生成 HTML，并按（视图, 中心概念, 图谱版本, 掌握情况指纹）缓存；
+    create_* 方法仅在明确需要导出文件时把渲染结果写到磁盘。
+    节点坐标在服务端预先算好（分层布局按图谱版本缓存），浏览器端不运行物理模拟；
+    节点标签、颜色、大小、提示信息来自按图谱版本缓存的渲染属性表，渲染时只计算与掌握情况有关的属性。
+    每种视图都有节点预算，超出部分折叠为聚类节点，单次渲染的输出规模与图谱大小无关。
+    """
+    DEFAULT_BUDGET = 150
+    
+    def __init__(self, graph, render_cache: Optional[BoundedCache] = None):
         super().__init__(graph)
+        self.render_cache = render_cache if render_cache is not None else BoundedCache(maxsize=64)
+        self.graph_cache = BoundedCache(maxsize=32)  # 布局、分组、渲染属性表等只随图谱版本变化的数据
         self.review_colors = {
             "数与代数进阶": "#E74C3C",
             "图形与几何深化": "#3498DB", 
@@ -14,129 +32,259 @@ class GradeSixVisualizer(KnowledgeVisualizer):
             "综合应用": "#2ECC71"
         }
     
-    def create_review_roadmap(self, output_path="review_roadmap.html"):
-        """创建六年级复习路线图"""
-        try:
-            net = Network(height="900px", width="100%", directed=True, layout=True)
-            
-            # 按复习阶段分组
-            phases = {
-                "第一阶段：数与代数系统复习": ["NA1", "NA2", "NA3", "NA4"],
-                "第二阶段：图形几何深化": ["GG1", "GG2", "GG3"],
-                "第三阶段：综合能力提升": ["CA1", "CA2", "CA3", "SP1", "SP2"]
-            }
-            
-            y_offset = 0
-            for phase_name, nodes in phases.items():
-                # 添加阶段标题节点
-                net.add_node(
-                    f"phase_{phase_name}",
-                    label=phase_name,
-                    color="#F39C12",
-                    shape="box",
-                    size=30,
-                    x=0,
-                    y=y_offset,
-                    physics=False
-                )
-                
-                # 添加该阶段知识点
-                x_offset = -200
-                for i, node_id in enumerate(nodes):
-                    if node_id not in self.graph:
-                        st.warning(f"节点 {node_id} 在图中不存在")
-                        continue
-                        
-                    node_data = self.graph.nodes[node_id]
-                    net.add_node(
-                        node_id,
-                        label=f"{node_id}\n{node_data['name']}",
-                        color=self.review_colors.get(node_data.get('domain', ''), "#95A5A6"),
-                        shape="dot" if not node_data.get('mastered', False) else "star",
-                        size=15 + node_data.get('level', 1) * 3,
-                        x=x_offset + (i % 3) * 200,
-                        y=y_offset - 100 - (i // 3) * 150,
-                        physics=True,
-                        title=self._create_node_tooltip(node_data)
-                    )
-                    
-                    # 连接到阶段标题
-                    net.add_edge(f"phase_{phase_name}", node_id, dashes=True, width=1)
-                
-                y_offset -= 400
-            
-            # 添加阶段间的连接
-            net.add_edge("phase_第一阶段：数与代数系统复习", "phase_第二阶段：图形几何深化", 
-                        label="为图形计算提供基础", width=2)
-            net.add_edge("phase_第二阶段：图形几何深化", "phase_第三阶段：综合能力提升",
-                        label="综合运用", width=2)
-            
-            net.save_graph(output_path)
-            st.success(f"路线图已保存到 {output_path}")
-            return output_path
-            
-        except Exception as e:
-            st.error(f"创建路线图失败: {e}")
+    def _cached_render(self, view: str, params, mastery, build, error_message: str, output: str = "html"):
+        """构建视图并缓存输出；output 为 "html"（完整页面）或 "data"（供 graph_view 组件使用的节点/边数据）"""
+        key = (view, output, params, self.graph_version, mastery.fingerprint() if mastery is not None else None)
+        result = self.render_cache.get(key, version=self.graph_version)
+        if result is None:
+            try:
+                net = build()
+                if net is not None:
+                    result = net.generate_html() if output == "html" else self._network_data(net)
+            except Exception as e:
+                st.error(f"{error_message}: {e}")
+                return None
+            if result is not None:
+                self.render_cache.put(key, result, version=self.graph_version)
+        return result
+    
+    @staticmethod
+    def _network_data(net: Network) -> dict:
+        nodes, edges, _, _, _, options = net.get_network_data()
+        return {
+            "nodes": nodes,
+            "edges": [dict(edge, id=f"{edge['from']}->{edge['to']}") for edge in edges],
+            "options": json.loads(options),
+        }
+    
+    def _layout(self, nodes) -> dict:
+        """nodes 诱导子图的分层布局坐标，同一图谱版本内只计算一次"""
+        key = frozenset(nodes)
+        return self.graph_cache.get_or_compute(key, lambda: layered_layout(self.graph, nodes),
+                                                version=self.graph_version)
+    
+    def _export(self, html: Optional[str], output_path: str) -> Optional[str]:
+        if html is None:
             return None
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(html)
+        return output_path
     
-    def create_concept_mindmap(self, central_concept, output_path="concept_mindmap.html"):
-        """创建概念思维导图"""
-        try:
-            if central_concept not in self.graph:
-                st.error(f"中心概念 {central_concept} 不存在")
-                return None
-                
-            net = Network(height="800px", width="100%", layout=True)
-            
-            # 中心概念
+    def _review_nodes(self, domain: Optional[str] = None) -> list:
+        if self.knowledge_graph is not None:
+            return self.knowledge_graph.review_nodes(domain)
+        return [node for node, data in self.graph.nodes(data=True)
+                if data.get("is_review") and (domain is None or data.get("domain") == domain)]
+    
+    def cluster_groups(self):
+        """按（领域, 年级）对全部知识点分组，同一图谱版本内只计算一次"""
+        return self.graph_cache.get_or_compute(("groups",), lambda: group_nodes(self.graph),
+                                                version=self.graph_version)
+    
+    def render_table(self) -> RenderTable:
+        """全部节点的渲染属性表，同一图谱版本内只构建一次"""
+        return self.graph_cache.get_or_compute(("render_table",), lambda: RenderTable(self.graph, self.review_colors),
+                                               version=self.graph_version)
+    
+    def _topic_node(self, net, table: RenderTable, node_id, x, y, mastery=None, **overrides):
+        attrs = table.row(node_id)
+        attrs.update(overrides)
+        net.add_node(
+            node_id,
+            shape="star" if mastery is not None and mastery.is_mastered(node_id) else "dot",
+            x=x,
+            y=y,
+            physics=False,
+            **attrs
+        )
+    
+    def render_review_roadmap(self, mastery=None, budget: int = DEFAULT_BUDGET,
+                              domain: Optional[str] = None) -> Optional[str]:
+        """生成六年级复习路线图 HTML（mastery 为学生掌握情况覆盖层，已掌握的知识点显示为星形；domain 只显示单个领域）"""
+        return self._cached_render("roadmap", (budget, domain), mastery,
+                                   lambda: self._build_review_roadmap(mastery, budget, domain), "创建路线图失败")
+    
+    def review_roadmap_data(self, mastery=None, budget: int = DEFAULT_BUDGET) -> Optional[dict]:
+        """复习路线图的节点/边数据，供 graph_view 组件增量更新"""
+        return self._cached_render("roadmap", (budget, None), mastery,
+                                   lambda: self._build_review_roadmap(mastery, budget), "创建路线图失败", output="data")
+    
+    def create_review_roadmap(self, output_path="review_roadmap.html", mastery=None):
+        """导出六年级复习路线图到文件"""
+        path = self._export(self.render_review_roadmap(mastery), output_path)
+        if path:
+            st.success(f"路线图已保存到 {path}")
+        return path
+    
+    def _build_review_roadmap(self, mastery=None, budget: int = DEFAULT_BUDGET,
+                              domain: Optional[str] = None) -> Optional[Network]:
+        net = Network(height="900px", width="100%", directed=True, cdn_resources="remote")
+        net.toggle_physics(False)
+        
+        # 复习阶段由图谱推导：按领域分组，组间按跨领域先修关系排序
+        table = self.render_table()
+        phases = review_phases(self.graph, self._review_nodes(domain))
+        if not phases:
+            st.warning("图谱中没有复习知识点")
+            return None
+        
+        # 每个阶段占一个标题节点和至多一个“其余”节点，剩余预算平均分给各阶段
+        share = max((budget - 2 * len(phases)) // len(phases), 1)
+        shown = {phase: nodes[:share] for phase, nodes in phases}
+        positions = self._layout([n for nodes in shown.values() for n in nodes])
+        left = min((x for x, _ in positions.values()), default=0) - 300
+        
+        phase_ids = []
+        for number, (phase, nodes) in enumerate(phases, 1):
+            phase_id = f"phase_{number}"
+            phase_ids.append(phase_id)
+            # 阶段标题放在左侧一列，纵坐标取该阶段知识点的平均值
+            ys = [positions[n][1] for n in shown[phase]]
+            phase_y = sum(ys) / len(ys) if ys else 0
             net.add_node(
-                central_concept,
-                label=f"{central_concept}\n{self.graph.nodes[central_concept]['name']}",
-                color="#E74C3C",
-                size=50,
-                shape="circle"
+                phase_id,
+                label=f"第{number}阶段：{phase}",
+                color="#F39C12",
+                shape="box",
+                size=30,
+                x=left,
+                y=phase_y,
+                physics=False
             )
             
-            # 相关概念（前驱）
-            prerequisites = list(self.graph.predecessors(central_concept))
-            for i, prereq in enumerate(prerequisites):
-                angle = 2 * math.pi * i / len(prerequisites) if prerequisites else 0
-                x = 300 * math.cos(angle)
-                y = 300 * math.sin(angle)
-                
-                net.add_node(
-                    prereq,
-                    label=f"{prereq}\n{self.graph.nodes[prereq]['name']}",
-                    color="#3498DB",
-                    size=35,
-                    x=x,
-                    y=y,
-                    physics=True
-                )
-                net.add_edge(prereq, central_concept, label="先修知识")
+            for node_id in shown[phase]:
+                x, y = positions[node_id]
+                self._topic_node(net, table, node_id, x, y, mastery)
+                net.add_edge(phase_id, node_id, dashes=True, width=1)
             
-            # 应用场景（后继）
-            applications = list(self.graph.successors(central_concept))
-            for i, app in enumerate(applications):
-                angle = math.pi + 2 * math.pi * i / len(applications) if applications else 0
-                x = 200 * math.cos(angle)
-                y = 200 * math.sin(angle)
-                
+            hidden = len(nodes) - len(shown[phase])
+            if hidden:
+                net.add_node(f"{phase_id}_more", label=f"其余 {hidden} 个知识点", shape="ellipse",
+                             color="#D5D8DC", x=left, y=phase_y + 80, physics=False)
+                net.add_edge(phase_id, f"{phase_id}_more", dashes=True, width=1)
+        
+        # 知识点之间的先修关系
+        for u in positions:
+            for v in self.graph.successors(u):
+                if v in positions:
+                    net.add_edge(u, v, width=1, color="#BDC3C7")
+        
+        # 阶段之间的先后顺序
+        for previous, following in zip(phase_ids, phase_ids[1:]):
+            net.add_edge(previous, following, width=2)
+        
+        return net
+    
+    def render_curriculum_overview(self, expanded=(), mastery=None, budget: int = DEFAULT_BUDGET) -> Optional[str]:
+        """生成全课程聚类概览 HTML：每个（领域, 年级）折叠为一个聚类节点，expanded 中的组展开显示"""
+        expanded = tuple(expanded)
+        return self._cached_render("overview", (expanded, budget), mastery,
+                                   lambda: self._build_curriculum_overview(expanded, mastery, budget),
+                                   "创建课程概览失败")
+    
+    def curriculum_overview_data(self, expanded=(), mastery=None, budget: int = DEFAULT_BUDGET) -> Optional[dict]:
+        """全课程聚类概览的节点/边数据，供 graph_view 组件增量更新"""
+        expanded = tuple(expanded)
+        return self._cached_render("overview", (expanded, budget), mastery,
+                                   lambda: self._build_curriculum_overview(expanded, mastery, budget),
+                                   "创建课程概览失败", output="data")
+    
+    def _build_curriculum_overview(self, expanded, mastery=None, budget: int = DEFAULT_BUDGET) -> Optional[Network]:
+        net = Network(height="900px", width="100%", directed=True, cdn_resources="remote")
+        net.toggle_physics(False)
+        
+        table = self.render_table()
+        view = clustered_view(self.graph, self.cluster_groups(), expanded, budget)
+        # 聚类节点放在其成员在全图分层布局中的重心
+        positions = self._layout(list(self.graph.nodes()))
+        
+        for node_id in view.topics:
+            x, y = positions[node_id]
+            self._topic_node(net, table, node_id, x, y, mastery)
+        
+        for cluster, ((domain, level), members) in view.clusters.items():
+            xs, ys = zip(*(positions[n] for n in members))
+            mastered = sum(1 for n in members if mastery.is_mastered(n)) if mastery is not None else 0
+            net.add_node(
+                cluster,
+                label=f"{domain} · {level}年级\n{len(members)} 个知识点",
+                color=self.review_colors.get(domain, DEFAULT_COLOR),
+                shape="box",
+                x=sum(xs) / len(xs),
+                y=sum(ys) / len(ys),
+                physics=False,
+                title=f"领域: {domain}<br>年级: {level}<br>知识点: {len(members)}<br>已掌握: {mastered}"
+            )
+        
+        for (u, v), count in view.edges.items():
+            net.add_edge(u, v, width=1 + math.log2(count), title=f"{count} 条先修关系", color="#BDC3C7")
+        
+        return net
+    
+    def render_concept_mindmap(self, central_concept, hops: int = 1, budget: int = DEFAULT_BUDGET) -> Optional[str]:
+        """生成以 central_concept 为中心、k 跳邻域内的概念思维导图 HTML"""
+        return self._cached_render("mindmap", (central_concept, hops, budget), None,
+                                   lambda: self._build_concept_mindmap(central_concept, hops, budget),
+                                   "创建思维导图失败")
+    
+    def create_concept_mindmap(self, central_concept, output_path="concept_mindmap.html", hops: int = 1):
+        """导出概念思维导图到文件"""
+        path = self._export(self.render_concept_mindmap(central_concept, hops), output_path)
+        if path:
+            st.success(f"思维导图已保存到 {path}")
+        return path
+    
+    def _build_concept_mindmap(self, central_concept, hops: int = 1, budget: int = DEFAULT_BUDGET) -> Optional[Network]:
+        if central_concept not in self.graph:
+            st.error(f"中心概念 {central_concept} 不存在")
+            return None
+            
+        net = Network(height="800px", width="100%", directed=True, cdn_resources="remote")
+        net.toggle_physics(False)
+        
+        table = self.render_table()
+        
+        # 中心概念
+        net.add_node(
+            central_concept,
+            label=table.labels[table.position(central_concept)],
+            color="#E74C3C",
+            size=50,
+            shape="circle",
+            x=0,
+            y=0,
+            physics=False
+        )
+        
+        # 先修知识排在上半圆、后续应用排在下半圆，距离中心越远的跳数越大
+        neighbourhood = ego_nodes(self.graph, central_concept, hops, budget)
+        rings = {}
+        for node, distance in neighbourhood.items():
+            if distance:
+                rings.setdefault(distance, []).append(node)
+        for distance, nodes in rings.items():
+            radius = 250 * abs(distance)
+            for i, node in enumerate(nodes):
+                angle = math.pi * (i + 1) / (len(nodes) + 1)
+                is_prereq = distance < 0
+                row = table.position(node)
                 net.add_node(
-                    app,
-                    label=f"{app}\n{self.graph.nodes[app]['name']}",
-                    color="#2ECC71",
-                    size=30,
-                    x=x,
-                    y=y,
-                    physics=True
+                    node,
+                    label=table.labels[row],
+                    color="#3498DB" if is_prereq else "#2ECC71",
+                    size=max(35 - 5 * abs(distance), 15),
+                    x=radius * math.cos(angle),
+                    y=-radius * math.sin(angle) if is_prereq else radius * math.sin(angle),
+                    physics=False,
+                    title=table.tooltips[row]
                 )
-                net.add_edge(central_concept, app, label="应用", color="#27AE60")
-            
-            net.save_graph(output_path)
-            st.success(f"思维导图已保存到 {output_path}")
-            return output_path
-            
-        except Exception as e:
-            st.error(f"创建思维导图失败: {e}")
-            return None
\ No newline at end of file
+        
+        for u, v in ((u, v) for u in neighbourhood for v in self.graph.successors(u) if v in neighbourhood):
+            if v == central_concept:
+                net.add_edge(u, v, label="先修知识")
+            elif u == central_concept:
+                net.add_edge(u, v, label="应用", color="#27AE60")
+            elif neighbourhood[u] * neighbourhood[v] > 0:
+                net.add_edge(u, v, color="#BDC3C7")
+        
+        return net
@@ -0,0 +1,137 @@
+"""细节层次（LOD）渲染：k 跳邻域、按领域/年级折叠的聚类视图、节点预算
+
+无论图谱多大，单次渲染输出的节点数都不超过预算。
+"""
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+from graph_layout import topological_depths
+
+CLUSTER_PREFIX = "cluster:"
+
+
+def ego_nodes(graph, center: Hashable, hops: int = 1, budget: int = 200) -> "OrderedDict[Hashable, int]":
+    """center 的 k 跳邻域：沿前驱方向的先修知识与沿后继方向的后续知识
+
+    返回按距离由近到远排列的 {节点: 带符号的距离}，先修知识为负、后续知识为正、中心为 0；
+    节点数达到 budget 时停止扩展（近的节点优先保留）。
+    """
+    result: "OrderedDict[Hashable, int]" = OrderedDict([(center, 0)])
+    frontiers = {-1: [center], 1: [center]}
+    for distance in range(1, hops + 1):
+        for sign, neighbours in ((-1, graph.predecessors), (1, graph.successors)):
+            next_frontier = []
+            for node in frontiers[sign]:
+                for neighbour in neighbours(node):
+                    if neighbour in result:
+                        continue
+                    if len(result) >= budget:
+                        return result
+                    result[neighbour] = sign * distance
+                    next_frontier.append(neighbour)
+            frontiers[sign] = next_frontier
+    return result
+
+
+def cluster_id(key: tuple) -> str:
+    return CLUSTER_PREFIX + "|".join(str(part) for part in key)
+
+
+def group_nodes(graph, group_by: Sequence[str] = ("domain", "level"),
+                nodes: Optional[Iterable[Hashable]] = None) -> "OrderedDict[tuple, List[Hashable]]":
+    """按节点属性分组，返回 {(属性值...): [节点...]}，组按属性值排序、组内保持图中顺序"""
+    groups: Dict[tuple, List[Hashable]] = {}
+    for node in (graph.nodes() if nodes is None else nodes):
+        data = graph.nodes[node]
+        groups.setdefault(tuple(data.get(attr) for attr in group_by), []).append(node)
+    return OrderedDict(sorted(groups.items(), key=lambda item: tuple(str(part) for part in item[0])))
+
+
+class ClusteredView:
+    """折叠后的可渲染视图
+
+    - topics：展开显示的知识点；
+    - clusters：{聚类节点ID: (分组键, 折叠在其中的知识点列表)}，展开的组超出预算的部分也留在聚类节点里；
+    - edges：{(端点, 端点): 聚合的原始边数}，端点为知识点或聚类节点ID。
+    """
+    def __init__(self, topics: List[Hashable], clusters: "OrderedDict[str, Tuple[tuple, List[Hashable]]]",
+                 edges: Dict[Tuple[Hashable, Hashable], int]):
+        self.topics = topics
+        self.clusters = clusters
+        self.edges = edges
+
+    def __len__(self) -> int:
+        return len(self.topics) + len(self.clusters)
+
+    @property
+    def hidden_count(self) -> int:
+        return sum(len(members) for _, members in self.clusters.values())
+
+
+def clustered_view(graph, groups: "OrderedDict[tuple, List[Hashable]]", expanded: Iterable[tuple] = (),
+                   budget: int = 150) -> ClusteredView:
+    """把 groups 中未展开的组折叠为聚类节点；展开的组按给出顺序占用预算，超出部分仍保持折叠
+
+    聚类节点本身也计入预算，因此结果节点数不超过 max(budget, 组数)。
+    """
+    expanded = [key for key in expanded if key in groups]
+    # 先假设每组都保留一个聚类节点；整组展开后聚类节点消失，腾出的名额留给后面的组
+    slots = max(budget - len(groups), 0)
+    shown = set()
+    topics = []
+    for key in expanded:
+        members = groups[key]
+        if len(members) <= slots + 1:
+            slots -= len(members) - 1
+        else:
+            members = members[:slots]
+            slots = 0
+        topics.extend(members)
+        shown.update(members)
+
+    clusters: "OrderedDict[str, Tuple[tuple, List[Hashable]]]" = OrderedDict()
+    representative: Dict[Hashable, Hashable] = {node: node for node in shown}
+    for key, members in groups.items():
+        hidden = [node for node in members if node not in shown]
+        if hidden:
+            clusters[cluster_id(key)] = (key, hidden)
+            for node in hidden:
+                representative[node] = cluster_id(key)
+
+    edges: Dict[Tuple[Hashable, Hashable], int] = {}
+    for u, v in graph.edges():
+        ru, rv = representative.get(u), representative.get(v)
+        if ru is None or rv is None or ru == rv:
+            continue
+        edges[(ru, rv)] = edges.get((ru, rv), 0) + 1
+    return ClusteredView(topics, clusters, edges)
+
+
+def review_phases(graph, nodes: Iterable[Hashable], group_by: str = "domain") -> List[Tuple[Hashable, List[Hashable]]]:
+    """从图谱推导复习阶段：按 group_by 分组，组间按跨组先修关系拓扑排序（平均拓扑深度小的优先）
+
+    组内知识点按拓扑深度排列，先修在前。
+    """
+    nodes = list(nodes)
+    depths = topological_depths(graph, nodes)
+    groups = group_nodes(graph, (group_by,), nodes)
+    phase_of = {node: key[0] for key, members in groups.items() for node in members}
+    mean_depth = {key[0]: sum(depths[n] for n in members) / len(members) for key, members in groups.items()}
+
+    depends: Dict[Hashable, set] = {phase: set() for phase in mean_depth}
+    for node in nodes:
+        for pred in graph.predecessors(node):
+            if pred in phase_of and phase_of[pred] != phase_of[node]:
+                depends[phase_of[node]].add(phase_of[pred])
+
+    ordered = []
+    pending = dict(depends)
+    while pending:
+        ready = [phase for phase, deps in pending.items() if not deps - set(ordered)]
+        # 组间先修关系成环时，退化为按平均深度排序
+        phase = min(ready or pending, key=lambda p: (mean_depth[p], str(p)))
+        ordered.append(phase)
+        del pending[phase]
+
+    members = {key[0]: sorted(group, key=lambda n: (depths[n], str(n))) for key, group in groups.items()}
+    return [(phase, members[phase]) for phase in ordered]
@@ -0,0 +1,75 @@
+"""增量更新的知识图谱视图组件
+
+首次显示（或数据来源变化）时把完整的节点/边数据发给浏览器，之后每次重新运行只发送
+与上一次相比发生变化的属性（按节点/边 ID 的补丁），例如学生标记掌握一个知识点时只有该节点的形状变化。
+浏览器端组件被重新挂载或漏掉补丁时会请求重发完整数据；组件事件带有每次挂载唯一的 nonce，
+服务端据此忽略重新运行时重复收到的同一事件。
+"""
+import os
+from typing import Dict, Hashable, List, Optional
+import streamlit as st
+import streamlit.components.v1 as components
+
+_FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "graph_view_frontend")
+_component = components.declare_component("graph_view", path=_FRONTEND_DIR)
+
+_STATE_PREFIX = "_graph_view_state_"
+
+
+def _index(items: List[dict]) -> Dict[Hashable, dict]:
+    return {item["id"]: item for item in items}
+
+
+def diff_items(old: Dict[Hashable, dict], new: Dict[Hashable, dict]) -> Dict[str, list]:
+    """比较两组按 ID 索引的节点（或边），返回 {"add": [...], "update": [...], "remove": [...]} 中非空的部分
+
+    update 只包含变化的属性；被删除的属性以 None 发送，由 vis.js 清除。
+    """
+    add, update = [], []
+    for item_id, attrs in new.items():
+        before = old.get(item_id)
+        if before is None:
+            add.append(attrs)
+        elif before is not attrs and before != attrs:
+            changed = {key: value for key, value in attrs.items() if key not in before or before[key] != value}
+            changed.update((key, None) for key in before if key not in attrs)
+            changed["id"] = item_id
+            update.append(changed)
+    remove = [item_id for item_id in old if item_id not in new]
+    diff = {"add": add, "update": update, "remove": remove}
+    return {key: value for key, value in diff.items() if value}
+
+
+def graph_view(data: Optional[dict], key: str, data_id: str, height: int = 900) -> Optional[Hashable]:
+    """显示 data（{"nodes", "edges", "options"}，见 GradeSixVisualizer.review_roadmap_data）
+
+    data_id 标识数据来源（视图、图谱版本等），变化时重新发送完整数据；
+    返回本次运行中用户新点击的节点ID，没有点击时返回 None。
+    """
+    if data is None:
+        return None
+    state = st.session_state.setdefault(_STATE_PREFIX + key, {"seq": 0})
+    nodes, edges = _index(data["nodes"]), _index(data["edges"])
+
+    value = st.session_state.get(key) or {}
+    resync = value.get("event") == "resync" and value.get("nonce") != state.get("resync_nonce")
+    if resync:
+        state["resync_nonce"] = value["nonce"]
+
+    if resync or state.get("data_id") != data_id or state.get("options") != data["options"]:
+        state["seq"] += 1
+        view = {"data_id": data_id, "seq": state["seq"], "full": data}
+    else:
+        patch = {"nodes": diff_items(state["nodes"], nodes), "edges": diff_items(state["edges"], edges)}
+        if patch["nodes"] or patch["edges"]:
+            state["seq"] += 1
+            view = {"data_id": data_id, "seq": state["seq"], "patch": patch}
+        else:
+            view = {"data_id": data_id, "seq": state["seq"]}
+    state.update(data_id=data_id, options=data["options"], nodes=nodes, edges=edges)
+
+    value = _component(view=view, height=height, key=key, default=None)
+    if value and value.get("event") == "click" and value.get("nonce") != state.get("click_nonce"):
+        state["click_nonce"] = value["nonce"]
+        return value["node"]
+    return None
@@ -1,128 +1,226 @@
 # knowledge_graph.py
+import hashlib
+import json
+import threading
 import networkx as nx
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
+from reachability_index import ReachabilityIndex
+from curriculum_loader import CurriculumLoader
+from csr_graph import CSRGraph
 
 class MathKnowledgeGraph:
-    """基础数学知识图谱类"""
-    def __init__(self):
+    """基础数学知识图谱类
+
+    backend 选择图的存储方式：
+        "networkx"  可修改的 nx.DiGraph（默认）
+        "csr"       构建完成后转换为只读的数组存储 CSRGraph，内存占用更小、遍历更快
+    """
+    BASE_GRADES = (1, 2, 3, 4, 5)
+    BACKENDS = ("networkx", "csr")
+
+    def __init__(self, grades: Optional[Iterable[int]] = None, domains: Optional[Iterable[str]] = None,
+                 loader: Optional[CurriculumLoader] = None, backend: str = "networkx"):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"不支持的图存储后端: {backend}")
+        self.grades = tuple(grades) if grades is not None else self.BASE_GRADES
+        self.domains = tuple(domains) if domains is not None else None
+        self.loader = loader or CurriculumLoader.default()
+        self.backend = backend
         self.graph = nx.DiGraph()
+        self._version = None
+        self._reachability = None
+        # 节点编号：按加入顺序分配，学生掌握情况等按节点对齐的数组以此为下标
+        self.node_ids: List[str] = []
+        self._node_position: Dict[str, int] = {}
+        # 二级索引：节点ID -> (领域, 难度等级, 是否复习点)，以及按这三个维度分桶的有序节点集
+        self._node_keys: Dict[str, tuple] = {}
+        self._by_domain: Dict[str, Dict[str, None]] = {}
+        self._by_level: Dict[int, Dict[str, None]] = {}
+        self._review_by_domain: Dict[str, Dict[str, None]] = {}
         self._init_base_curriculum()
         self.build_graph()
+        if backend == "csr":
+            self.graph = CSRGraph.from_networkx(self.graph)
     
     def _init_base_curriculum(self):
-        """初始化1-6年级基础知识点（简化版）"""
-        self.curriculum = {
-            "数与代数": [
-                {"id": "N1", "name": "20以内数的认识", "level": 1, "prerequisites": []},
-                {"id": "N2", "name": "100以内数的认识", "level": 1, "prerequisites": ["N1"]},
-                {"id": "N3", "name": "加减法运算", "level": 1, "prerequisites": ["N1", "N2"]},
-                {"id": "N4", "name": "乘除法初步", "level": 2, "prerequisites": ["N3"]},
-                {"id": "N5", "name": "分数初步认识", "level": 3, "prerequisites": ["N4"]},
-                {"id": "N6", "name": "小数初步认识", "level": 3, "prerequisites": ["N4"]},
-            ],
-            "图形与几何": [
-                {"id": "G1", "name": "立体图形直观认识", "level": 1, "prerequisites": []},
-                {"id": "G2", "name": "平面图形认识", "level": 1, "prerequisites": ["G1"]},
-                {"id": "G3", "name": "周长与面积", "level": 3, "prerequisites": ["G2"]},
-            ]
-        }
+        """从课程数据文件加载基础知识点（所选年级、领域的切片及其传递先修）"""
+        self.curriculum = self.loader.load(grades=self.grades, domains=self.domains)
     
     def build_graph(self):
         """构建基础图谱结构"""
         for domain, topics in self.curriculum.items():
             for topic in topics:
-                self.graph.add_node(
+                self.add_topic(
                     topic["id"],
                     name=topic["name"],
                     domain=domain,
-                    level=topic["level"],
-                    mastered=False
+                    level=topic["level"]
                 )
                 for prereq in topic["prerequisites"]:
-                    self.graph.add_edge(prereq, topic["id"], relation="prerequisite")
+                    self.add_relation(prereq, topic["id"], relation="prerequisite")
         return self.graph
 
+    def add_topic(self, node_id: str, **attrs):
+        """添加（或更新）知识点，同步维护版本戳、二级索引与可达性索引"""
+        self.graph.add_node(node_id, **attrs)
+        self._register_node(node_id)
+        self._index_topic(node_id, self.graph.nodes[node_id])
+        if self._reachability is not None:
+            self._reachability.add_node(node_id)
+        self._version = None
+
+    def _register_node(self, node_id: str):
+        if node_id not in self._node_position:
+            self._node_position[node_id] = len(self.node_ids)
+            self.node_ids.append(node_id)
+
+    def node_position(self, node_id: str) -> Optional[int]:
+        """节点在按节点对齐的数组中的下标"""
+        return self._node_position.get(node_id)
+
+    def _index_topic(self, node_id: str, data: Dict):
+        """更新节点在领域 / 等级 / 复习点索引中的位置"""
+        old_keys = self._node_keys.get(node_id)
+        new_keys = (data.get("domain"), data.get("level"), bool(data.get("is_review", False)))
+        if old_keys == new_keys:
+            return
+        if old_keys is not None:
+            domain, level, is_review = old_keys
+            self._by_domain[domain].pop(node_id, None)
+            self._by_level[level].pop(node_id, None)
+            if is_review:
+                self._review_by_domain[domain].pop(node_id, None)
+        domain, level, is_review = new_keys
+        self._by_domain.setdefault(domain, {})[node_id] = None
+        self._by_level.setdefault(level, {})[node_id] = None
+        if is_review:
+            self._review_by_domain.setdefault(domain, {})[node_id] = None
+        self._node_keys[node_id] = new_keys
+
+    def nodes_in_domain(self, domain: str) -> List[str]:
+        return list(self._by_domain.get(domain, ()))
+
+    def nodes_at_level(self, level: int) -> List[str]:
+        return list(self._by_level.get(level, ()))
+
+    def review_nodes(self, domain: Optional[str] = None) -> List[str]:
+        """复习知识点ID列表，可按领域筛选"""
+        if domain is not None:
+            return list(self._review_by_domain.get(domain, ()))
+        return [node_id for nodes in self._review_by_domain.values() for node_id in nodes]
+
+    def domain_of(self, node_id: str) -> Optional[str]:
+        keys = self._node_keys.get(node_id)
+        return keys[0] if keys is not None else None
+
+    def is_review_node(self, node_id: str) -> bool:
+        keys = self._node_keys.get(node_id)
+        return keys is not None and keys[2]
+
+    def domain_totals(self, review_only: bool = True) -> Dict[str, int]:
+        """各领域知识点数量（只与领域数相关，与节点数无关）"""
+        buckets = self._review_by_domain if review_only else self._by_domain
+        return {domain: len(nodes) for domain, nodes in buckets.items() if nodes}
+
+    def add_relation(self, source: str, target: str, **attrs):
+        """添加知识点间的关系边，同步维护版本戳与可达性索引"""
+        self.graph.add_edge(source, target, **attrs)
+        self._register_node(source)
+        self._register_node(target)
+        if self._reachability is not None:
+            self._reachability.add_edge(source, target)
+        self._version = None
+
+    @property
+    def reachability(self) -> ReachabilityIndex:
+        """先修可达性索引（首次访问时构建，之后随 add_topic/add_relation 增量更新）"""
+        if self._reachability is None:
+            self._reachability = ReachabilityIndex(self.graph)
+        return self._reachability
+
+    def is_prerequisite(self, prereq_id: str, node_id: str) -> bool:
+        """判断 prereq_id 是否是 node_id 的（直接或间接）先修知识点"""
+        return self.reachability.is_ancestor(prereq_id, node_id)
+
+    def find_common_prerequisites(self, node_ids: Iterable[str]) -> List[str]:
+        """多个知识点先修知识点的并集"""
+        return list(self.reachability.ancestors_of_all(node_ids))
+
+    @property
+    def version(self) -> str:
+        """图谱版本戳：节点与边内容的摘要，图谱内容变化后随之变化"""
+        if self._version is None:
+            digest = hashlib.sha1()
+            for node_id, data in sorted(self.graph.nodes(data=True), key=lambda item: item[0]):
+                digest.update(json.dumps([node_id, data], ensure_ascii=False, sort_keys=True, default=str).encode("utf-8"))
+            for u, v, data in sorted(self.graph.edges(data=True), key=lambda item: (item[0], item[1])):
+                digest.update(json.dumps([u, v, data], ensure_ascii=False, sort_keys=True, default=str).encode("utf-8"))
+            self._version = digest.hexdigest()[:12]
+        return self._version
+
+    @property
+    def is_frozen(self) -> bool:
+        return nx.is_frozen(self.graph)
+
+    def to_networkx(self) -> nx.DiGraph:
+        """以 networkx 图的形式返回图谱（csr 后端会导出一份副本）"""
+        if isinstance(self.graph, CSRGraph):
+            return self.graph.to_networkx()
+        return self.graph
+
+    def freeze(self):
+        """冻结图谱结构，冻结后可在多个会话、线程间只读共享"""
+        if not self.is_frozen:
+            nx.freeze(self.graph)
+        # 冻结时即算好版本戳和可达性索引，避免并发读取时重复计算
+        _ = self.version
+        _ = self.reachability
+        return self
+
 
 class GradeSixReviewGraph(MathKnowledgeGraph):
     """六年级总复习专项知识图谱（扩展类）"""
-    def __init__(self):
-        super().__init__()  # 继承基础图谱
-        self.extended_curriculum = {
-            "数与代数进阶": [
-                {
-                    "id": "NA1",
-                    "name": "分数四则混合运算",
-                    "level": 4,
-                    "prerequisites": ["N5", "N6"],
-                    "keywords": ["通分", "约分", "运算顺序"],
-                    "common_errors": ["运算顺序错误", "通分不彻底"]
-                },
-                {
-                    "id": "NA2",
-                    "name": "百分数的应用",
-                    "level": 4,
-                    "prerequisites": ["NA1"],
-                    "keywords": ["利率", "折扣", "增长率"],
-                    "cross_refs": ["SP1"]
-                },
-                {
-                    "id": "NA3",
-                    "name": "比例与正反比例",
-                    "level": 5,
-                    "prerequisites": ["NA2"],
-                    "keywords": ["比例关系", "比例尺", "正比例", "反比例"]
-                },
-            ],
-            "图形与几何深化": [
-                {
-                    "id": "GG1",
-                    "name": "圆与扇形",
-                    "level": 5,
-                    "prerequisites": ["G3"],
-                    "keywords": ["圆周率", "圆的周长", "圆的面积"],
-                    "formulas": ["C=πd=2πr", "S=πr²"]
-                },
-                {
-                    "id": "GG2",
-                    "name": "立体图形的表面积与体积",
-                    "level": 6,
-                    "prerequisites": ["G3", "GG1"],
-                    "keywords": ["长方体", "圆柱", "圆锥", "表面积", "体积"]
-                },
-            ],
-            "统计与概率基础": [
-                {
-                    "id": "SP1",
-                    "name": "统计图表综合应用",
-                    "level": 4,
-                    "prerequisites": ["NA2"],
-                    "keywords": ["扇形统计图", "折线统计图", "数据分析"]
-                },
-            ]
-        }
-        self.build_review_graph()
+    REVIEW_GRADE = 6
+
+    def __init__(self, domains: Optional[Iterable[str]] = None, loader: Optional[CurriculumLoader] = None,
+                 backend: str = "networkx"):
+        super().__init__(grades=(self.REVIEW_GRADE,), domains=domains, loader=loader, backend=backend)  # 继承基础图谱
+    
+    def _init_base_curriculum(self):
+        """只加载六年级复习切片，基础图谱只包含其传递先修知识点"""
+        self.extended_curriculum = self.loader.load(grades=self.grades, domains=self.domains,
+                                                    with_prerequisites=False)
+        self.curriculum = self.loader.load_prerequisites(self.extended_curriculum)
+    
+    def build_graph(self):
+        """先构建基础图谱，再叠加六年级复习专项内容"""
+        super().build_graph()
+        return self.build_review_graph()
     
     def build_review_graph(self):
         """构建六年级总复习专项图谱"""
         # 添加扩展节点
         for domain, topics in self.extended_curriculum.items():
             for topic in topics:
-                self.graph.add_node(
+                self.add_topic(
                     topic["id"],
                     name=topic["name"],
                     domain=domain,
                     level=topic["level"],
-                    mastered=False,
                     is_review=True,
                     keywords=topic.get("keywords", []),
                     common_errors=topic.get("common_errors", [])
                 )
                 # 添加先修关系
                 for prereq in topic["prerequisites"]:
-                    self.graph.add_edge(prereq, topic["id"], relation="prerequisite", weight=1.0)
+                    self.add_relation(prereq, topic["id"], relation="prerequisite", weight=1.0)
         
-        # 建立关键跨领域关联
-        self.graph.add_edge("NA2", "SP1", relation="supports", weight=0.8)
+        # 建立关键跨领域关联（如 NA2 -> SP1 的 supports 关系）
+        for domain, topics in self.extended_curriculum.items():
+            for topic in topics:
+                for rel in topic.get("relations", []):
+                    self.add_relation(rel["source"], topic["id"], relation=rel["relation"],
+                                      weight=rel.get("weight", 1.0))
         print("六年级复习知识图谱构建完成，总节点数：", len(self.graph.nodes))
         return self.graph
     
@@ -130,16 +228,58 @@ class GradeSixReviewGraph(MathKnowledgeGraph):
         """查找某个知识点的所有先修知识点"""
         if node_id not in self.graph:
             return []
-        return list(nx.ancestors(self.graph, node_id))
+        return list(self.reachability.ancestors(node_id))
     
     def get_review_topics(self, domain: Optional[str] = None) -> List[Dict]:
-        """获取复习知识点列表，可按领域筛选"""
-        topics = []
-        for node_id, data in self.graph.nodes(data=True):
-            if data.get('is_review'):
-                if domain is None or data['domain'] == domain:
-                    topics.append({"id": node_id, **data})
-        return topics
+        """获取复习知识点列表，可按领域筛选（走复习点索引，无需全图扫描）"""
+        return [{"id": node_id, **self.graph.nodes[node_id]} for node_id in self.review_nodes(domain)]
+
+
+class DomainProgress:
+    """按领域统计知识点掌握进度
+
+    总数来自图谱的领域索引，掌握数由掌握情况覆盖层（MasteryOverlay）在状态变化时增量维护，
+    单次更新 O(1)，读取各领域进度只与领域数有关。
+    """
+    def __init__(self, kg: MathKnowledgeGraph, review_only: bool = True):
+        self.kg = kg
+        self.review_only = review_only
+        self.totals = kg.domain_totals(review_only)
+        self.mastered_counts = {domain: 0 for domain in self.totals}
+
+    def copy(self) -> "DomainProgress":
+        other = DomainProgress.__new__(DomainProgress)
+        other.kg, other.review_only, other.totals = self.kg, self.review_only, self.totals
+        other.mastered_counts = dict(self.mastered_counts)
+        return other
+
+    def update(self, node_id: str, mastered: bool):
+        """某个知识点掌握状态发生变化时调用"""
+        if self.review_only and not self.kg.is_review_node(node_id):
+            return
+        domain = self.kg.domain_of(node_id)
+        if domain in self.mastered_counts:
+            self.mastered_counts[domain] += 1 if mastered else -1
+
+    def items(self):
+        """逐领域返回 (领域, {"total": 总数, "mastered": 已掌握数})"""
+        for domain, total in self.totals.items():
+            yield domain, {"total": total, "mastered": self.mastered_counts[domain]}
+
+
+# 进程级共享图谱：每个进程只构建一次，冻结后供所有会话只读使用
+_shared_review_graph = None
+_shared_graph_lock = threading.Lock()
+
+
+def get_shared_review_graph() -> GradeSixReviewGraph:
+    """获取进程内共享的只读六年级复习图谱（首次调用时构建并冻结，线程安全）"""
+    global _shared_review_graph
+    if _shared_review_graph is None:
+        with _shared_graph_lock:
+            if _shared_review_graph is None:
+                _shared_review_graph = GradeSixReviewGraph().freeze()
+    return _shared_review_graph
 
 
 # 以下代码用于快速测试这个文件是否能正常运行
@@ -148,6 +288,7 @@ if __name__ == "__main__":
     kg = GradeSixReviewGraph()
     print(f"图谱包含 {len(kg.graph.nodes)} 个知识点")
     print(f"其中标记为复习的知识点有 {len(kg.get_review_topics())} 个")
+    print(f"图谱版本: {kg.version}")
     print("\n‘分数四则混合运算(NA1)’的先修知识点有：")
     for prereq in kg.find_prerequisites("NA1"):
         print(f"  - {prereq}: {kg.graph.nodes[prereq]['name']}")
@@ -0,0 +1,203 @@
+"""贝叶斯知识追踪（BKT）：根据答题记录估计每个学生对每个知识点的掌握概率
+
+掌握概率保存在 学生 × 知识点 的 NumPy 矩阵中，一批答题事件整体向量化更新；
+答对高阶知识点会部分提高其先修的掌握概率，答错基础知识点会部分降低后续知识点的掌握概率。
+"""
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+TRUE_VALUES = {"1", "1.0", "true", "t", "yes", "y", "对", "正确", "√"}
+FALSE_VALUES = {"0", "0.0", "false", "f", "no", "n", "错", "错误", "×"}
+
+
+def parse_correct(values: Iterable) -> np.ndarray:
+    """把答题记录中的“是否答对”列解析为布尔数组；无法识别的取值报 ValueError"""
+    parsed, unknown = [], set()
+    for value in values:
+        if isinstance(value, (bool, np.bool_)):
+            parsed.append(bool(value))
+            continue
+        text = str(value).strip().lower()
+        if text in TRUE_VALUES:
+            parsed.append(True)
+        elif text in FALSE_VALUES:
+            parsed.append(False)
+        else:
+            unknown.add(str(value))
+    if unknown:
+        raise ValueError(f"无法识别的答题结果: {', '.join(sorted(unknown)[:5])}")
+    return np.array(parsed, dtype=bool)
+
+
+def _adjacency(count: int, sources: np.ndarray, targets: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """CSR 邻接表：第 i 个节点的邻居为 indices[indptr[i]:indptr[i+1]]"""
+    order = np.argsort(sources, kind="stable")
+    indptr = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=count), out=indptr[1:])
+    return indptr, targets[order]
+
+
+def _expand(indptr: np.ndarray, indices: np.ndarray, nodes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """把每个事件按其节点的邻居展开，返回 (事件下标, 邻居下标)"""
+    degree = indptr[nodes + 1] - indptr[nodes]
+    events = np.repeat(np.arange(len(nodes)), degree)
+    offsets = np.arange(len(events)) - np.repeat(np.cumsum(degree) - degree, degree)
+    return events, indices[indptr[nodes][events] + offsets]
+
+
+class KnowledgeTracer:
+    """向量化的 BKT 估计器
+
+    每个答题事件先按 BKT 后验更新对应格子，再加上学习转移概率 p_learn；
+    同一批次里同一学生的多条作答按出现顺序分轮处理（每轮每个学生一条），结果与逐条更新一致；
+    一批中作答最多的学生决定轮数。
+    先修传播：答对时后验增量的 propagation 倍按“未掌握部分”加到各先修上，
+    答错时后验减量的 propagation 倍按“已掌握部分”加到各后续知识点上（只传播一层）。
+    """
+    def __init__(self, graph, p_init: float = 0.3, p_learn: float = 0.1, p_slip: float = 0.1,
+                 p_guess: float = 0.2, propagation: float = 0.3, capacity: int = 64):
+        self.graph = graph
+        self.p_init = p_init
+        self.p_learn = p_learn
+        self.p_slip = p_slip
+        self.p_guess = p_guess
+        self.propagation = propagation
+        self.topics: List[Hashable] = list(graph.nodes())
+        self.topic_index: Dict[Hashable, int] = {topic: i for i, topic in enumerate(self.topics)}
+        self.students: List[Hashable] = []
+        self.student_index: Dict[Hashable, int] = {}
+
+        pred = np.array([self.topic_index[u] for u, _ in graph.edges()], dtype=np.int64)
+        succ = np.array([self.topic_index[v] for _, v in graph.edges()], dtype=np.int64)
+        self._predecessors = _adjacency(len(self.topics), succ, pred)
+        self._successors = _adjacency(len(self.topics), pred, succ)
+
+        self.mastery = np.full((max(1, capacity), len(self.topics)), p_init, dtype=np.float32)
+        self.observed = np.zeros(self.mastery.shape, dtype=bool)  # 是否直接作答过
+
+    def _student(self, student) -> int:
+        index = self.student_index.get(student)
+        if index is None:
+            index = len(self.students)
+            rows = self.mastery.shape[0]
+            if index >= rows:
+                self.mastery = np.vstack([self.mastery, np.full((rows, len(self.topics)), self.p_init, dtype=np.float32)])
+                self.observed = np.vstack([self.observed, np.zeros((rows, len(self.topics)), dtype=bool)])
+            self.students.append(student)
+            self.student_index[student] = index
+        return index
+
+    def add_students(self, students: Iterable[Hashable]) -> np.ndarray:
+        """登记学生，返回其行下标（供 update_indices 使用）"""
+        return np.fromiter((self._student(s) for s in students), dtype=np.int64)
+
+    def _topic(self, topic) -> int:
+        try:
+            return self.topic_index[topic]
+        except KeyError:
+            raise ValueError(f"知识点 {topic} 不存在") from None
+
+    # ---------- 更新 ----------
+    def update(self, students: Iterable[Hashable], topics: Iterable[Hashable], correct: Iterable) -> int:
+        """按时间顺序录入一批答题事件，返回处理的事件数"""
+        rows = self.add_students(students)
+        cols = np.fromiter((self._topic(t) for t in topics), dtype=np.int64)
+        return self.update_indices(rows, cols, correct)
+
+    def update_indices(self, rows: np.ndarray, cols: np.ndarray, correct) -> int:
+        """update 的下标版本：rows / cols 为已登记的学生下标与知识点下标"""
+        rows, cols = np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)
+        correct = np.asarray(correct, dtype=bool)
+        if not (len(rows) == len(cols) == len(correct)):
+            raise ValueError("答题记录各列长度不一致")
+        if not len(rows):
+            return 0
+
+        # 同一学生的第 k 条作答放在第 k 轮：轮内每个学生只有一条，先修传播只在学生自己的行内，
+        # 因此整体更新与逐条更新结果一致
+        order = np.argsort(rows, kind="stable")
+        sorted_rows = rows[order]
+        starts = np.flatnonzero(np.r_[True, sorted_rows[1:] != sorted_rows[:-1]])
+        rank = np.empty(len(rows), dtype=np.int64)
+        rank[order] = np.arange(len(rows)) - np.repeat(starts, np.diff(np.r_[starts, len(rows)]))
+
+        by_round = np.argsort(rank, kind="stable")
+        bounds = np.r_[0, np.cumsum(np.bincount(rank))]
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            batch = by_round[start:end]
+            self._update_round(rows[batch], cols[batch], correct[batch])
+        return len(rows)
+
+    def _update_round(self, rows: np.ndarray, cols: np.ndarray, correct: np.ndarray):
+        prior = self.mastery[rows, cols]
+        hit = np.where(correct, 1 - self.p_slip, self.p_slip)
+        miss = np.where(correct, self.p_guess, 1 - self.p_guess)
+        posterior = prior * hit / (prior * hit + (1 - prior) * miss)
+        self.mastery[rows, cols] = posterior + (1 - posterior) * self.p_learn
+        self.observed[rows, cols] = True
+        if self.propagation:
+            delta = (posterior - prior) * self.propagation
+            self._propagate(rows, cols, np.maximum(delta, 0), self._predecessors, gain=True)
+            self._propagate(rows, cols, np.minimum(delta, 0), self._successors, gain=False)
+
+    def _propagate(self, rows, cols, delta, adjacency, gain: bool):
+        active = delta != 0
+        rows, cols, delta = rows[active], cols[active], delta[active]
+        events, neighbours = _expand(*adjacency, cols)
+        if not len(events):
+            return
+        flat = self.mastery.reshape(-1)
+        targets = rows[events] * len(self.topics) + neighbours
+        current = flat[targets]
+        # 答对只补足未掌握的部分，答错只扣减已掌握的部分，结果保持在 [0, 1] 内
+        step = delta[events] * ((1 - current) if gain else current)
+        touched, slot = np.unique(targets, return_inverse=True)
+        total = np.bincount(slot, weights=step, minlength=len(touched))
+        flat[touched] = np.clip(flat[touched] + total, 0, 1)
+
+    def ingest(self, records: Iterable[Dict]) -> int:
+        """录入 {"student", "topic", "correct"} 形式的答题记录"""
+        students, topics, correct = [], [], []
+        for record in records:
+            students.append(record["student"])
+            topics.append(record["topic"])
+            correct.append(record["correct"])
+        return self.update(students, topics, parse_correct(correct))
+
+    # ---------- 查询 ----------
+    def probabilities(self, student) -> Dict[Hashable, float]:
+        row = self.student_index.get(student)
+        if row is None:
+            return {}
+        changed = self.observed[row] | (self.mastery[row] != np.float32(self.p_init))
+        return {self.topics[i]: float(self.mastery[row, i]) for i in np.flatnonzero(changed)}
+
+    def weaknesses(self, student, threshold: float = 0.5, limit: Optional[int] = None) -> List[Hashable]:
+        """掌握概率低于 threshold 的知识点，最薄弱的在前
+
+        只包括直接作答过的知识点，以及因先修答错被拉低到初始概率以下的知识点；
+        没有任何证据的知识点停留在初始概率，不算弱项。
+        """
+        row = self.student_index.get(student)
+        if row is None:
+            return []
+        p = self.mastery[row]
+        cols = np.flatnonzero((self.observed[row] | (p < np.float32(self.p_init))) & (p < threshold))
+        cols = cols[np.argsort(self.mastery[row, cols], kind="stable")][:limit]
+        return [self.topics[i] for i in cols]
+
+    def mastered(self, student, threshold: float = 0.85) -> List[Hashable]:
+        row = self.student_index.get(student)
+        if row is None:
+            return []
+        return [self.topics[i] for i in np.flatnonzero(self.mastery[row] >= threshold)]
+
+    def student_profile(self, student, weakness_threshold: float = 0.5,
+                        mastery_threshold: float = 0.85) -> Dict:
+        """可直接合并进 generate_review_plan 学生档案的 weaknesses / mastered 字段"""
+        return {
+            "weaknesses": self.weaknesses(student, weakness_threshold),
+            "mastered": self.mastered(student, mastery_threshold),
+        }
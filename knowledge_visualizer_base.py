@@ -1,22 +1,25 @@
 """知识图谱可视化基类"""
 import streamlit as st
 import math
+from typing import Optional
+from knowledge_graph import MathKnowledgeGraph
+from render_table import node_tooltip
 
 class KnowledgeVisualizer:
     """知识图谱可视化基类"""
     def __init__(self, graph):
-        self.graph = graph
+        # 既可传入 MathKnowledgeGraph（渲染缓存可按图谱版本失效），也可直接传入图
+        if isinstance(graph, MathKnowledgeGraph):
+            self.knowledge_graph = graph
+            self.graph = graph.graph
+        else:
+            self.knowledge_graph = None
+            self.graph = graph
+    
+    @property
+    def graph_version(self) -> Optional[str]:
+        return self.knowledge_graph.version if self.knowledge_graph is not None else None
     
     def _create_node_tooltip(self, node_data):
         """创建节点提示信息"""
-        tooltip = f"名称: {node_data['name']}<br>"
-        tooltip += f"领域: {node_data.get('domain', '未知')}<br>"
-        tooltip += f"难度等级: {node_data.get('level', '未知')}<br>"
-        
-        if 'keywords' in node_data:
-            tooltip += f"关键词: {', '.join(node_data['keywords'])}<br>"
-        
-        if 'common_errors' in node_data:
-            tooltip += f"常见错误: {', '.join(node_data['common_errors'])}<br>"
-        
-        return tooltip
\ No newline at end of file
+        return node_tooltip(node_data)
@@ -0,0 +1,110 @@
+"""惰性的逐日复习安排，以及支持它的流式 JSON 序列化"""
+import json
+from collections.abc import Sequence
+from typing import Dict, Hashable, Iterable, Iterator, List, TextIO, Tuple
+
+
+class LazyDailyPlan(Sequence):
+    """按需生成的逐日复习安排（只读序列）
+
+    只保存知识点列表、天数和这些知识点的名称；第 i 天的安排在访问时才计算，
+    多次访问结果相同。知识点多于天数时平均分配到每天，少于天数时每天一个、其余天留作机动，
+    不会丢弃任何知识点。对象很小、可直接 pickle，适合缓存与跨进程传递。
+    """
+    def __init__(self, topics: Iterable[Hashable], days: int, names: Dict[Hashable, str], first_day: int = 1):
+        self.topics = tuple(topics)
+        self.days = max(1, int(days))
+        self.names = names
+        self.first_day = first_day
+
+    def __len__(self) -> int:
+        return self.days
+
+    def _bounds(self, i: int) -> Tuple[int, int]:
+        n = len(self.topics)
+        if n > self.days:
+            return i * n // self.days, (i + 1) * n // self.days
+        return min(i, n), min(i + 1, n)
+
+    def label(self, i: int) -> str:
+        return f"第{self.first_day + i}天"
+
+    def _day(self, i: int) -> Dict:
+        start, end = self._bounds(i)
+        daily_topics = list(self.topics[start:end])
+        return {
+            "复习内容": daily_topics,
+            "知识点名称": [self.names[t] for t in daily_topics if t in self.names],
+            "学习时长": "60-90分钟",
+            "练习建议": {
+                "基础巩固": f"{len(daily_topics)*5}道基础题",
+                "能力提升": f"{len(daily_topics)*2}道应用题",
+                "易错回顾": "回顾前日错题"
+            }
+        }
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._day(i) for i in range(*index.indices(self.days))]
+        if index < 0:
+            index += self.days
+        if not 0 <= index < self.days:
+            raise IndexError("天数超出范围")
+        return self._day(index)
+
+    def items(self) -> Iterator[Tuple[str, Dict]]:
+        """(第N天, 当天安排)，与旧版字典形式的 daily_plan.items() 兼容"""
+        for i in range(self.days):
+            yield self.label(i), self._day(i)
+
+    def page(self, number: int, size: int = 7) -> List[Tuple[str, Dict]]:
+        """第 number 页（从 0 开始）的 (第N天, 当天安排) 列表"""
+        start = number * size
+        return [(self.label(i), self._day(i)) for i in range(start, min(start + size, self.days))]
+
+    def page_count(self, size: int = 7) -> int:
+        return -(-self.days // size)
+
+    def __eq__(self, other) -> bool:
+        return (isinstance(other, LazyDailyPlan) and self.topics == other.topics and self.days == other.days
+                and self.first_day == other.first_day and self.names == other.names)
+
+    def __repr__(self) -> str:
+        return f"LazyDailyPlan({len(self.topics)} 个知识点, {self.days} 天, 从第{self.first_day}天开始)"
+
+
+def iter_json(obj) -> Iterator[str]:
+    """逐块生成 obj 的 JSON 文本；LazyDailyPlan 序列化为 {"第N天": {...}} 对象，逐天生成而不整体展开"""
+    if isinstance(obj, LazyDailyPlan):
+        yield "{"
+        for i, (label, day) in enumerate(obj.items()):
+            if i:
+                yield ", "
+            yield json.dumps(label, ensure_ascii=False)
+            yield ": "
+            yield from iter_json(day)
+        yield "}"
+    elif isinstance(obj, dict):
+        yield "{"
+        for i, (key, value) in enumerate(obj.items()):
+            if i:
+                yield ", "
+            yield json.dumps(str(key), ensure_ascii=False)
+            yield ": "
+            yield from iter_json(value)
+        yield "}"
+    elif isinstance(obj, (list, tuple)):
+        yield "["
+        for i, value in enumerate(obj):
+            if i:
+                yield ", "
+            yield from iter_json(value)
+        yield "]"
+    else:
+        yield json.dumps(obj, ensure_ascii=False)
+
+
+def write_json(obj, out: TextIO):
+    """把 obj 流式写入文本流"""
+    for chunk in iter_json(obj):
+        out.write(chunk)
@@ -2,27 +2,94 @@
 import streamlit as st
 import networkx as nx
 from typing import Dict, List, Optional
+from knowledge_graph import MathKnowledgeGraph
+from reachability_index import ReachabilityIndex
 
 class LearningPathRecommender:
     """学习路径推荐基类"""
     def __init__(self, graph):
-        self.graph = graph
+        # 既可传入 MathKnowledgeGraph（复用其可达性索引），也可直接传入 networkx 图
+        if isinstance(graph, MathKnowledgeGraph):
+            self.knowledge_graph = graph
+            self.graph = graph.graph
+        else:
+            self.knowledge_graph = None
+            self.graph = graph
+        self._reachability = None
+        self._prereq_tree_memo = {}
+        self._prereq_tree_version = None
+
+    @property
+    def graph_version(self) -> Optional[str]:
+        """所依赖图谱的版本戳；直接传入图时为 None"""
+        return self.knowledge_graph.version if self.knowledge_graph is not None else None
+
+    @property
+    def reachability(self) -> ReachabilityIndex:
+        """先修可达性索引；直接传入图时按该图构建一次（之后图不应再被修改）"""
+        if self.knowledge_graph is not None:
+            return self.knowledge_graph.reachability
+        if self._reachability is None:
+            self._reachability = ReachabilityIndex(self.graph)
+        return self._reachability
+    
+    def _tree_memo(self) -> Dict:
+        """先修知识树的备忘表，图谱版本变化时整体失效"""
+        version = self.graph_version
+        if version != self._prereq_tree_version:
+            self._prereq_tree_memo = {}
+            self._prereq_tree_version = version
+        return self._prereq_tree_memo
     
     def get_prerequisite_tree(self, node_id: str) -> Dict:
-        """获取先修知识树"""
+        """获取先修知识树
+
+        迭代后序遍历并按节点备忘：共同的先修子树只构建一次并被共享引用，
+        结果规模与图的边数成正比，且不受递归深度限制。返回的子树是共享的，调用方不应修改。
+        """
         if node_id not in self.graph:
             return {}
         
-        tree = {}
-        for pred in self.graph.predecessors(node_id):
-            tree[pred] = self.get_prerequisite_tree(pred)
+        memo = self._tree_memo()
+        stack = [node_id]
+        visiting = set()
+        while stack:
+            current = stack[-1]
+            if current in memo:
+                stack.pop()
+                continue
+            visiting.add(current)
+            pending = [pred for pred in self.graph.predecessors(current) if pred not in memo]
+            if pending:
+                if any(pred in visiting for pred in pending):
+                    raise ValueError(f"知识点 {current} 的先修关系中存在环")
+                stack.extend(pending)
+            else:
+                memo[current] = {pred: memo[pred] for pred in self.graph.predecessors(current)}
+                visiting.discard(current)
+                stack.pop()
         
-        return tree
+        return memo[node_id]
+    
+    def get_prerequisite_set(self, node_id: str) -> frozenset:
+        """直接获取展平后的全部先修知识点（不构建嵌套树）"""
+        return frozenset(self.reachability.ancestors(node_id))
+    
+    def count_prerequisites(self, node_id: str) -> int:
+        """先修知识点数量，等价于 len(_flatten_prereq_tree(get_prerequisite_tree(node_id)))"""
+        return self.reachability.count_ancestors(node_id)
     
     def _flatten_prereq_tree(self, tree: Dict) -> List[str]:
-        """展平先修知识树"""
-        nodes = []
-        for node, subtree in tree.items():
-            nodes.append(node)
-            nodes.extend(self._flatten_prereq_tree(subtree))
-        return list(set(nodes))
\ No newline at end of file
+        """展平先修知识树（共享子树只遍历一次）"""
+        nodes = set()
+        seen_subtrees = set()
+        stack = [tree]
+        while stack:
+            subtree = stack.pop()
+            if id(subtree) in seen_subtrees:
+                continue
+            seen_subtrees.add(id(subtree))
+            for node, child in subtree.items():
+                nodes.add(node)
+                stack.append(child)
+        return list(nodes)
\ No newline at end of file
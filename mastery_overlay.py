@@ -0,0 +1,112 @@
+"""学生知识点掌握情况覆盖层"""
+import hashlib
+from typing import Dict, Iterable, List
+import numpy as np
+from knowledge_graph import DomainProgress, MathKnowledgeGraph
+
+
+class MasteryOverlay:
+    """单个学生的掌握情况：与图谱节点编号（kg.node_ids）对齐的布尔数组
+
+    共享图谱本身不保存掌握状态，每个学生只需一个 n 位的数组。
+    fork() 得到的副本与原数组共享内存，任何一方第一次修改时才复制（写时复制）；
+    批量加载的多个学生也共享同一块矩阵内存，直到各自被修改。
+    """
+    def __init__(self, kg: MathKnowledgeGraph, bits: np.ndarray = None):
+        self.kg = kg
+        self.graph_version = kg.version
+        if bits is None:
+            self._bits = np.zeros(len(kg.node_ids), dtype=bool)
+            self._owned = True
+        else:
+            if len(bits) != len(kg.node_ids):
+                raise ValueError(f"掌握情况长度 {len(bits)} 与图谱节点数 {len(kg.node_ids)} 不一致")
+            self._bits = bits
+            self._owned = False
+        self._fingerprint = None
+        self.progress = DomainProgress(kg)
+        for position in np.flatnonzero(self._bits):
+            self.progress.update(kg.node_ids[position], True)
+
+    @classmethod
+    def from_nodes(cls, kg: MathKnowledgeGraph, mastered_nodes: Iterable[str]) -> "MasteryOverlay":
+        overlay = cls(kg)
+        for node_id in mastered_nodes:
+            overlay.set_mastered(node_id)
+        return overlay
+
+    def fork(self) -> "MasteryOverlay":
+        """写时复制的副本"""
+        other = MasteryOverlay.__new__(MasteryOverlay)
+        other.kg, other.graph_version = self.kg, self.graph_version
+        other._bits, other._owned = self._bits, False
+        other._fingerprint = self._fingerprint
+        other.progress = self.progress.copy()
+        self._owned = False
+        return other
+
+    def is_mastered(self, node_id: str) -> bool:
+        position = self.kg.node_position(node_id)
+        return position is not None and bool(self._bits[position])
+
+    def __contains__(self, node_id) -> bool:
+        return self.is_mastered(node_id)
+
+    def set_mastered(self, node_id: str, mastered: bool = True):
+        """更新单个知识点的掌握状态（O(1)，同步领域进度计数）"""
+        position = self.kg.node_position(node_id)
+        if position is None:
+            raise KeyError(f"知识点 {node_id} 不在图谱中")
+        if bool(self._bits[position]) == mastered:
+            return
+        if not self._owned:
+            self._bits = self._bits.copy()
+            self._owned = True
+        self._bits[position] = mastered
+        self._fingerprint = None
+        self.progress.update(node_id, mastered)
+
+    def mastered_nodes(self) -> List[str]:
+        return [self.kg.node_ids[position] for position in np.flatnonzero(self._bits)]
+
+    def fingerprint(self) -> str:
+        """掌握情况的摘要，可作为渲染结果、复习计划等缓存键的一部分"""
+        if self._fingerprint is None:
+            self._fingerprint = hashlib.sha1(np.packbits(self._bits).tobytes()).hexdigest()[:12]
+        return self._fingerprint
+
+    def to_array(self) -> np.ndarray:
+        return self._bits.copy()
+
+
+def save_overlays(path: str, overlays: Dict[str, MasteryOverlay]):
+    """把多个学生的掌握情况按位打包后一次写入 .npz 文件"""
+    if not overlays:
+        raise ValueError("没有需要保存的掌握情况")
+    kg = next(iter(overlays.values())).kg
+    students = list(overlays)
+    matrix = np.packbits(np.stack([overlays[student]._bits for student in students]), axis=1)
+    np.savez_compressed(
+        path,
+        students=np.array(students, dtype=str),
+        node_ids=np.array(kg.node_ids, dtype=str),
+        bits=matrix,
+    )
+
+
+def load_overlays(path: str, kg: MathKnowledgeGraph) -> Dict[str, MasteryOverlay]:
+    """批量读取掌握情况；节点顺序与当前图谱不同时按节点ID重新对齐，缺失的知识点视为未掌握"""
+    with np.load(path) as data:
+        students = data["students"].tolist()
+        saved_ids = data["node_ids"].tolist()
+        matrix = np.unpackbits(data["bits"], axis=1, count=len(saved_ids)).astype(bool)
+
+    if saved_ids != kg.node_ids:
+        aligned = np.zeros((len(students), len(kg.node_ids)), dtype=bool)
+        positions = [(i, kg.node_position(node_id)) for i, node_id in enumerate(saved_ids)]
+        source = [i for i, position in positions if position is not None]
+        target = [position for _, position in positions if position is not None]
+        aligned[:, target] = matrix[:, source]
+        matrix = aligned
+
+    return {student: MasteryOverlay(kg, matrix[row]) for row, student in enumerate(students)}
@@ -0,0 +1,367 @@
+"""复习计划的紧凑导出格式：字符串驻留表 + 编号引用，流式写出，可选按表拆成 CSV、可选 gzip
+
+JSONL 中每条逐日安排都重复写出知识点名称、学习时长和练习建议，整年级导出时非常大。紧凑格式：
+- 所有字符串（知识点ID、名称、字段名、练习建议……）只写一次，之后用编号引用；
+- 逐日安排（LazyDailyPlan）只写知识点编号、天数和起始天，名称来自知识点名称表，读取时按需还原；
+- 内容相同的计划只写一次，学生记录只引用计划编号（批量生成时大量学生共用同一份计划）。
+
+用法（与当前 JSONL 格式比较体积和读写耗时）：
+    python plan_export.py --students 2000 --strategy exam_preparation
+"""
+import argparse
+import contextlib
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Union
+
+from lazy_plan import LazyDailyPlan, write_json
+
+FORMAT_NAME = "compact-review-plans"
+FORMAT_VERSION = 1
+CSV_TABLES = ("strings", "topic_names", "plans", "records")
+RECORD_FIELDS = ("name", "strategy", "error")
+
+
+def _open_text(path: str, mode: str, compress: bool) -> TextIO:
+    if compress:
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+class CompactPlanWriter:
+    """紧凑格式的流式写出器
+
+    layout="jsonl" 时写成一个文件，每行一个事件（新增字符串、新增知识点名称、新计划、学生记录），
+    引用总是出现在被引用内容之后，读取时单遍即可还原；layout="csv" 时 path 为目录，
+    四类事件分别追加到 strings / topic_names / plans / records 四张 CSV 表
+    （records 表只保留 name、strategy、error 三个字段）。没有计划的错误记录不引用计划。compress=True 时每个文件都用 gzip 压缩。
+    """
+    def __init__(self, path: Union[str, TextIO], layout: str = "jsonl", compress: bool = False,
+                 plan_memo_size: int = 1024):
+        if layout not in ("jsonl", "csv"):
+            raise ValueError(f"不支持的导出布局: {layout}")
+        self.layout = layout
+        self._strings: Dict[str, int] = {}
+        self._new_strings: List[str] = []
+        self._named_topics = set()
+        self._new_names: List[List[int]] = []
+        self._plans: Dict[str, int] = {}
+        self._recent: "OrderedDict[int, tuple]" = OrderedDict()  # id(计划) -> (计划, 编号)，保留引用防止 id 复用
+        self._plan_memo_size = plan_memo_size
+        self.records = 0
+
+        suffix = ".gz" if compress else ""
+        if layout == "jsonl":
+            # 也可以直接写入已打开的文本流（由调用方负责关闭）
+            self._owns_out = isinstance(path, str)
+            self._out = _open_text(path, "w", compress) if self._owns_out else path
+            self._out.write(_dumps({"format": FORMAT_NAME, "version": FORMAT_VERSION}) + "\n")
+        else:
+            os.makedirs(path, exist_ok=True)
+            self._files = {table: _open_text(os.path.join(path, f"{table}.csv{suffix}"), "w", compress)
+                           for table in CSV_TABLES}
+            self._tables = {table: csv.writer(f) for table, f in self._files.items()}
+            self._tables["strings"].writerow(["ref", "text"])
+            self._tables["topic_names"].writerow(["topic", "name"])
+            self._tables["plans"].writerow(["plan", "value"])
+            self._tables["records"].writerow([*RECORD_FIELDS, "plan"])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- 编码 ----------
+    def _ref(self, text: str) -> int:
+        ref = self._strings.get(text)
+        if ref is None:
+            ref = self._strings[text] = len(self._strings)
+            self._new_strings.append(text)
+        return ref
+
+    def _encode(self, value):
+        """字符串 -> 编号；数字与整数列表 -> {"#": ...}；逐日安排 -> {"@": 知识点编号, "d": 天数, "f": 起始天}"""
+        if isinstance(value, str):
+            return self._ref(value)
+        if value is None or isinstance(value, bool):
+            return value
+        if isinstance(value, (int, float)):
+            return {"#": value}
+        if isinstance(value, LazyDailyPlan):
+            topics = [self._ref(str(topic)) for topic in value.topics]
+            for topic, ref in zip(value.topics, topics):
+                if ref not in self._named_topics and topic in value.names:
+                    self._named_topics.add(ref)
+                    self._new_names.append([ref, self._ref(value.names[topic])])
+            return {"@": topics, "d": value.days, "f": value.first_day}
+        if isinstance(value, dict):
+            return {str(self._ref(str(key))): self._encode(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple, set, frozenset)):
+            if value and all(isinstance(item, int) and not isinstance(item, bool) for item in value):
+                return {"#": list(value)}
+            return [self._encode(item) for item in value]
+        raise TypeError(f"无法导出的类型: {type(value).__name__}")
+
+    # ---------- 写出 ----------
+    def _flush_tables(self):
+        """先写出新增的字符串和知识点名称，保证引用出现在被引用内容之后"""
+        if self._new_strings:
+            start = len(self._strings) - len(self._new_strings)
+            if self.layout == "jsonl":
+                self._out.write(_dumps({"strings": self._new_strings}) + "\n")
+            else:
+                self._tables["strings"].writerows(enumerate(self._new_strings, start))
+            self._new_strings = []
+        if self._new_names:
+            if self.layout == "jsonl":
+                self._out.write(_dumps({"names": self._new_names}) + "\n")
+            else:
+                self._tables["topic_names"].writerows(self._new_names)
+            self._new_names = []
+
+    def _plan_ref(self, plan) -> int:
+        recent = self._recent.get(id(plan))
+        if recent is not None and recent[0] is plan:
+            self._recent.move_to_end(id(plan))
+            return recent[1]
+        encoded = _dumps(self._encode(plan))
+        digest = hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+        ref = self._plans.get(digest)
+        if ref is None:
+            ref = self._plans[digest] = len(self._plans)
+            self._flush_tables()
+            if self.layout == "jsonl":
+                self._out.write(f'{{"plan":{ref},"value":{encoded}}}\n')
+            else:
+                self._tables["plans"].writerow([ref, encoded])
+        self._recent[id(plan)] = (plan, ref)
+        if len(self._recent) > self._plan_memo_size:
+            self._recent.popitem(last=False)
+        return ref
+
+    def write(self, record: Dict):
+        """写出一条学生记录 {"name", "strategy", "plan", ...}，或没有 plan 的 {"name", "strategy", "error"}"""
+        plan = self._plan_ref(record["plan"]) if "plan" in record else None
+        if self.layout == "jsonl":
+            fields = self._encode({key: value for key, value in record.items() if key != "plan"})
+            self._flush_tables()
+            event = {"record": fields} if plan is None else {"record": fields, "plan": plan}
+            self._out.write(_dumps(event) + "\n")
+        else:
+            self._tables["records"].writerow(
+                [*(record.get(field) for field in RECORD_FIELDS), "" if plan is None else plan])
+        self.records += 1
+
+    def close(self):
+        self._flush_tables()
+        if self.layout == "csv":
+            for f in self._files.values():
+                f.close()
+        elif self._owns_out:
+            self._out.close()
+
+
+class JsonPlanWriter:
+    """当前的 JSONL 格式：每行一条完整记录，逐日安排展开写出"""
+    def __init__(self, out: TextIO, close_out: bool = False):
+        self._out = out
+        self._close_out = close_out
+        self.records = 0
+
+    def write(self, record: Dict):
+        write_json(record, self._out)
+        self._out.write("\n")
+        self.records += 1
+
+    def close(self):
+        if self._close_out:
+            self._out.close()
+
+
+def compact_bytes(records: Iterable[Dict], compress: bool = True) -> bytes:
+    """把记录导出为内存中的紧凑 JSONL（默认 gzip 压缩），用于下载"""
+    buffer = io.BytesIO()
+    raw = gzip.GzipFile(fileobj=buffer, mode="wb") if compress else buffer
+    text = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+    with CompactPlanWriter(text) as writer:
+        for record in records:
+            writer.write(record)
+    text.flush()
+    if compress:
+        raw.close()
+    return buffer.getvalue()
+
+
+# ---------- 读取 ----------
+class _Decoder:
+    def __init__(self):
+        self.strings: List[str] = []
+        self.names: Dict[str, str] = {}
+
+    def decode(self, value):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return self.strings[value]
+        if isinstance(value, list):
+            return [self.decode(item) for item in value]
+        if isinstance(value, dict):
+            if "#" in value:
+                return value["#"]
+            if "@" in value:
+                topics = [self.strings[ref] for ref in value["@"]]
+                return LazyDailyPlan(topics, value["d"], {t: self.names[t] for t in topics if t in self.names},
+                                     first_day=value["f"])
+            return {self.strings[int(key)]: self.decode(item) for key, item in value.items()}
+        return value
+
+
+def _read_jsonl(path: str, compress: bool) -> Iterator[Dict]:
+    decoder = _Decoder()
+    plans: Dict[int, Dict] = {}
+    with _open_text(path, "r", compress) as f:
+        header = json.loads(f.readline())
+        if header.get("format") != FORMAT_NAME:
+            raise ValueError(f"{path} 不是紧凑复习计划格式")
+        for line in f:
+            event = json.loads(line)
+            if "strings" in event:
+                decoder.strings.extend(event["strings"])
+            elif "names" in event:
+                decoder.names.update((decoder.strings[t], decoder.strings[n]) for t, n in event["names"])
+            elif "value" in event:
+                plans[event["plan"]] = decoder.decode(event["value"])
+            else:
+                record = decoder.decode(event["record"])
+                if "plan" in event:
+                    record["plan"] = plans[event["plan"]]
+                yield record
+
+
+def _read_csv(path: str) -> Iterator[Dict]:
+    compress = os.path.exists(os.path.join(path, "records.csv.gz"))
+    suffix = ".gz" if compress else ""
+
+    def rows(table):
+        with _open_text(os.path.join(path, f"{table}.csv{suffix}"), "r", compress) as f:
+            reader = csv.reader(f)
+            next(reader)
+            yield from reader
+
+    decoder = _Decoder()
+    decoder.strings = [text for _, text in rows("strings")]
+    decoder.names = {decoder.strings[int(t)]: decoder.strings[int(n)] for t, n in rows("topic_names")}
+    plans = {int(ref): decoder.decode(json.loads(value)) for ref, value in rows("plans")}
+    for row in rows("records"):
+        record = {field: value or None for field, value in zip(RECORD_FIELDS[:2], row)}
+        if row[-1]:
+            record["plan"] = plans[int(row[-1])]
+        else:
+            record["error"] = row[2]
+        yield record
+
+
+def read_plans(path: str) -> Iterator[Dict]:
+    """逐条读回紧凑格式导出的学生记录；逐日安排还原为 LazyDailyPlan，相同计划的记录共享同一对象"""
+    if os.path.isdir(path):
+        return _read_csv(path)
+    with open(path, "rb") as f:
+        compressed = f.read(2) == b"\x1f\x8b"  # gzip 魔数
+    return _read_jsonl(path, compressed)
+
+
+def open_plan_writer(path: str, fmt: str = "jsonl", compress: bool = False):
+    """按格式打开写出器：jsonl（当前格式）、compact、compact-csv"""
+    if fmt == "compact":
+        return CompactPlanWriter(path, "jsonl", compress)
+    if fmt == "compact-csv":
+        return CompactPlanWriter(path, "csv", compress)
+    if fmt != "jsonl":
+        raise ValueError(f"不支持的导出格式: {fmt}")
+    return JsonPlanWriter(_open_text(path, "w", compress), close_out=True)
+
+
+# ---------- 格式比较 ----------
+def _path_size(path: str) -> int:
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    return os.path.getsize(path)
+
+
+def compare_formats(records: List[Dict], directory: str) -> List[Dict]:
+    """把同一批记录按各格式写出再读回，返回 [{格式, 字节数, 写出秒数, 读取秒数}]"""
+    report = []
+    for fmt in ("jsonl", "compact", "compact-csv"):
+        for compress in (False, True):
+            name = fmt + (".gz" if compress else "")
+            path = os.path.join(directory, {"jsonl": "plans.jsonl", "compact": "plans.compact.jsonl",
+                                            "compact-csv": "plans_csv"}[fmt] + (".gz" if compress else ""))
+            started = time.perf_counter()
+            writer = open_plan_writer(path, fmt, compress)
+            for record in records:
+                writer.write(record)
+            writer.close()
+            written = time.perf_counter() - started
+
+            started = time.perf_counter()
+            if fmt == "jsonl":
+                with _open_text(path, "r", compress) as f:
+                    count = sum(1 for line in f if json.loads(line))
+            else:
+                count = sum(1 for _ in read_plans(path))
+            read = time.perf_counter() - started
+            if count != len(records):
+                raise ValueError(f"{name} 读回 {count} 条记录，应为 {len(records)} 条")
+            report.append({"format": name, "bytes": _path_size(path),
+                           "write_seconds": round(written, 3), "read_seconds": round(read, 3)})
+    return report
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="比较复习计划各导出格式的体积与读写耗时")
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--strategy", default="exam_preparation")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    from knowledge_graph import GradeSixReviewGraph
+    from review_path_recommender import GradeSixReviewRecommender
+    with contextlib.redirect_stdout(sys.stderr):
+        kg = GradeSixReviewGraph().freeze()
+    recommender = GradeSixReviewRecommender(kg)
+    rng = random.Random(args.seed)
+    review_nodes = kg.review_nodes()
+    records = []
+    for i in range(args.students):
+        profile = {"weaknesses": rng.sample(review_nodes, min(2, len(review_nodes))),
+                   "target_days": rng.choice([30, 60, 90]), "days_until_exam": rng.randint(20, 120)}
+        records.append({"name": f"学生{i}", "strategy": args.strategy,
+                        "plan": recommender.generate_review_plan(profile, args.strategy)})
+
+    directory = tempfile.mkdtemp()
+    try:
+        report = compare_formats(records, directory)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    baseline = report[0]["bytes"]
+    for row in report:
+        print(f"{row['format']:<16} {row['bytes'] / 1024:>10.1f} KB  {row['bytes'] / baseline:>6.1%}  "
+              f"写出 {row['write_seconds']:.3f} 秒  读取 {row['read_seconds']:.3f} 秒")
+    return report
+
+
+if __name__ == "__main__":
+    main()
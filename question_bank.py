@@ -0,0 +1,255 @@
+"""题库与组卷：按列存储的题目表 + 倒排索引，按总分、题型比例和弱项覆盖约束组卷
+
+题目按知识点ID、难度、题型、分值和关键词（来自知识图谱）标注；倒排索引把
+（知识点, 题型）、关键词映射到题目编号数组，组卷只在少量候选数组上做向量化筛选。
+"""
+import json
+import random
+from collections import deque
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+QUESTION_TYPES = ("选择题", "填空题", "计算题", "应用题")
+TYPE_SCORES = {"选择题": 5, "填空题": 4, "计算题": 6, "应用题": 10}
+CHOICE = QUESTION_TYPES.index("选择题")
+
+# 各类试卷的总分、题型分值占比和难度范围
+PAPER_BLUEPRINTS = {
+    "单元测试": {"total": 100, "mix": {"选择题": 0.3, "填空题": 0.3, "计算题": 0.2, "应用题": 0.2}, "difficulty": (1, 3)},
+    "专题测试": {"total": 60, "mix": {"选择题": 0.2, "填空题": 0.3, "计算题": 0.3, "应用题": 0.2}, "difficulty": (2, 4)},
+    "综合模拟": {"total": 100, "mix": {"选择题": 0.2, "填空题": 0.2, "计算题": 0.3, "应用题": 0.3}, "difficulty": (2, 5)},
+    "小升初真题": {"total": 120, "mix": {"选择题": 0.15, "填空题": 0.2, "计算题": 0.25, "应用题": 0.4}, "difficulty": (3, 5)},
+}
+
+
+def _group(keys: np.ndarray) -> Dict[int, np.ndarray]:
+    """按键分组的倒排表：{键: 有序的题目编号数组}"""
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]) if len(keys) else []
+    bounds = list(starts) + [len(keys)]
+    return {int(sorted_keys[a]): order[a:b] for a, b in zip(bounds[:-1], bounds[1:])}
+
+
+class QuestionBank:
+    """按列存储的题库
+
+    - topic / qtype / difficulty / score / choice_key 为 NumPy 列，content / options / answers 为列表；
+    - choice_key 为选择题正确选项的下标，其余题型为 -1，answers 为各题的标准答案文本；
+    - type_scores：各题型最常见的分值（组卷按它计算题数，题库中没有该题型时取 TYPE_SCORES）；
+    - 倒排索引：by_topic_type[(知识点下标, 题型下标)]、by_keyword[关键词] -> 题目编号数组。
+    """
+    def __init__(self, graph, topics: Sequence[Hashable], qtype: Sequence[int], difficulty: Sequence[int],
+                 score: Sequence[int], content: List[str], options: List[Optional[List[str]]],
+                 answers: List[str], choice_key: Sequence[int]):
+        self.graph = graph
+        self.topics: List[Hashable] = list(graph.nodes())
+        self.topic_index = {topic: i for i, topic in enumerate(self.topics)}
+        self.topic = np.fromiter((self.topic_index[t] for t in topics), dtype=np.int32, count=len(content))
+        self.qtype = np.asarray(qtype, dtype=np.int8)
+        self.difficulty = np.asarray(difficulty, dtype=np.int8)
+        self.score = np.asarray(score, dtype=np.int16)
+        self.choice_key = np.asarray(choice_key, dtype=np.int8)
+        self.content = content
+        self.options = options
+        self.answers = answers
+        self.type_scores = {}
+        for k, name in enumerate(QUESTION_TYPES):
+            values, counts = np.unique(self.score[self.qtype == k], return_counts=True)
+            self.type_scores[name] = int(values[np.argmax(counts)]) if len(values) else TYPE_SCORES[name]
+
+        self.by_topic_type = {(key // len(QUESTION_TYPES), key % len(QUESTION_TYPES)): items
+                              for key, items in _group(self.topic.astype(np.int64) * len(QUESTION_TYPES) + self.qtype).items()}
+        by_topic = _group(self.topic)
+        self.by_keyword: Dict[str, np.ndarray] = {}
+        for t, items in by_topic.items():
+            for word in graph.nodes[self.topics[t]].get("keywords", []):
+                self.by_keyword.setdefault(word, []).append(items)
+        self.by_keyword = {word: np.sort(np.concatenate(parts)) for word, parts in self.by_keyword.items()}
+
+    def __len__(self) -> int:
+        return len(self.content)
+
+    @classmethod
+    def from_records(cls, graph, records: Iterable[Dict]) -> "QuestionBank":
+        """由 {"topic", "type", "difficulty", "content", "answer", "options"?, "score"?} 记录构建题库"""
+        columns = {name: [] for name in ("topics", "qtype", "difficulty", "score", "content", "options", "answers", "choice_key")}
+        for record in records:
+            if record["topic"] not in graph:
+                raise ValueError(f"知识点 {record['topic']} 不存在")
+            qtype = QUESTION_TYPES.index(record["type"])
+            options = record.get("options")
+            columns["topics"].append(record["topic"])
+            columns["qtype"].append(qtype)
+            columns["difficulty"].append(record["difficulty"])
+            columns["score"].append(record.get("score", TYPE_SCORES[record["type"]]))
+            columns["content"].append(record["content"])
+            columns["options"].append(options)
+            columns["answers"].append(str(record["answer"]))
+            columns["choice_key"].append(options.index(record["answer"]) if qtype == CHOICE else -1)
+        return cls(graph, **columns)
+
+    def question(self, item: int) -> Dict:
+        """题目详情（不含标准答案）"""
+        topic = self.topics[self.topic[item]]
+        return {
+            "id": int(item),
+            "type": QUESTION_TYPES[self.qtype[item]],
+            "content": self.content[item],
+            "options": self.options[item],
+            "score": int(self.score[item]),
+            "difficulty": int(self.difficulty[item]),
+            "topic": topic,
+            "topic_name": self.graph.nodes[topic].get("name", topic),
+        }
+
+    def candidates(self, topic, qtype: Optional[str] = None) -> np.ndarray:
+        t = self.topic_index.get(topic)
+        if t is None:
+            return np.empty(0, dtype=np.int64)
+        types = range(len(QUESTION_TYPES)) if qtype is None else [QUESTION_TYPES.index(qtype)]
+        parts = [self.by_topic_type[(t, k)] for k in types if (t, k) in self.by_topic_type]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+    def search_keyword(self, word: str) -> np.ndarray:
+        return self.by_keyword.get(word, np.empty(0, dtype=np.int64))
+
+
+def read_question_records(path: str) -> Iterable[Dict]:
+    """逐条读取题目记录文件（JSONL，每行一条 from_records 所需的记录）"""
+    with open(path, "r", encoding="utf-8-sig") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def generate_question_bank(graph, size: int = 100_000, seed: int = 0) -> QuestionBank:
+    """生成合成题库：题目均匀分布在各知识点和题型上，难度围绕知识点的 level 浮动"""
+    rng = np.random.default_rng(seed)
+    topics = list(graph.nodes())
+    topic_idx = np.arange(size) % len(topics)
+    qtype = rng.integers(0, len(QUESTION_TYPES), size)
+    level = np.array([graph.nodes[t].get("level", 3) for t in topics])[topic_idx]
+    difficulty = np.clip(np.rint(level / 2 + rng.normal(1.5, 1.0, size)), 1, 5).astype(np.int8)
+    a, b = rng.integers(2, 50, size), rng.integers(2, 20, size)
+    values = a * b
+    choice_key = np.where(qtype == CHOICE, rng.integers(0, 4, size), -1)
+
+    names = [graph.nodes[t].get("name", t) for t in topics]
+    content, options, answers = [], [], []
+    for i in range(size):
+        t, k, value = topic_idx[i], qtype[i], int(values[i])
+        content.append(f"【{names[t]}】{QUESTION_TYPES[k]}（第{i}题）：计算 {a[i]} × {b[i]} 的结果")
+        answers.append(str(value))
+        if k == CHOICE:
+            wrong = [value + int(b[i]), value - int(a[i]), value + 10]
+            wrong.insert(int(choice_key[i]), value)
+            options.append([str(v) for v in wrong])
+        else:
+            options.append(None)
+    return QuestionBank(graph, [topics[t] for t in topic_idx], qtype, difficulty,
+                        [TYPE_SCORES[QUESTION_TYPES[k]] for k in qtype], content, options, answers, choice_key)
+
+
+class PaperAssembler:
+    """约束组卷
+
+    1. 按蓝图的总分、题型占比和题库中各题型的分值，求出各题型题数（总分精确命中，题数尽量接近占比），
+       之后只选分值等于该题型分值的题，凑不出总分时报错而不是给出总分不符的试卷；
+    2. 覆盖顺序：弱项知识点 → 弱项的先修（由近及远）→ 其余复习知识点；
+    3. 各题型的题位交错排列，依次取覆盖顺序中下一个有该题型可用题目的知识点，
+       在其候选题中排除已做过、已选中和难度不符的题后随机取一道。
+    """
+    def __init__(self, bank: QuestionBank):
+        self.bank = bank
+
+    @staticmethod
+    def type_counts(total: int, mix: Dict[str, float], scores: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+        """总分恰为 total、且各题型分值尽量接近占比的题数；scores 为各题型每题分值，默认 TYPE_SCORES"""
+        scores = scores or TYPE_SCORES
+        ideal = {t: total * share / scores[t] for t, share in mix.items()}
+        base = {t: int(round(count)) for t, count in ideal.items()}
+        best, best_cost = None, None
+        # 先只调整前三种题型，凑不出总分时四种题型都调整
+        for adjustable in ([t for t in ("选择题", "填空题", "计算题") if t in mix], list(mix)):
+            ranges = [range(-4, 5)] * len(adjustable)
+            for deltas in np.array(np.meshgrid(*ranges)).T.reshape(-1, len(adjustable)):
+                counts = dict(base)
+                for t, d in zip(adjustable, deltas):
+                    counts[t] = base[t] + int(d)
+                if min(counts.values()) < 0 or sum(c * scores[t] for t, c in counts.items()) != total:
+                    continue
+                cost = sum(abs(counts[t] - ideal[t]) for t in counts)
+                if best_cost is None or cost < best_cost:
+                    best, best_cost = counts, cost
+            if best is not None:
+                return best
+        raise ValueError(f"无法用现有题型分值（{', '.join(f'{t}{scores[t]}分' for t in mix)}）凑出总分 {total}")
+
+    def coverage_order(self, weak_nodes: Iterable[Hashable]) -> Tuple[List[Hashable], List[Hashable]]:
+        """(弱项, 弱项的先修（按距离由近及远）)"""
+        graph = self.bank.graph
+        weak = [node for node in dict.fromkeys(weak_nodes) if node in graph]
+        seen, prerequisites = set(weak), []
+        queue = deque(weak)
+        while queue:
+            for pred in graph.predecessors(queue.popleft()):
+                if pred not in seen:
+                    seen.add(pred)
+                    prerequisites.append(pred)
+                    queue.append(pred)
+        return weak, prerequisites
+
+    def assemble(self, test_type: str, weak_nodes: Iterable[Hashable] = (), seen: Iterable[int] = (),
+                 seed: Optional[int] = None) -> Dict:
+        if test_type not in PAPER_BLUEPRINTS:
+            raise ValueError(f"不支持的测试类型: {test_type}")
+        blueprint = PAPER_BLUEPRINTS[test_type]
+        bank, rng = self.bank, random.Random(seed)
+        low, high = blueprint["difficulty"]
+        counts = self.type_counts(blueprint["total"], blueprint["mix"], bank.type_scores)
+
+        weak, prerequisites = self.coverage_order(weak_nodes)
+        covered = set(weak) | set(prerequisites)
+        others = [t for t in bank.topics if t not in covered and bank.graph.nodes[t].get("is_review")]
+        rng.shuffle(others)
+        order = weak + prerequisites + others
+        if not order:
+            raise ValueError("没有可出题的知识点：弱项都不在知识图谱中，且图谱中没有复习知识点")
+
+        excluded = np.zeros(len(bank), dtype=bool)  # 已做过或已选中的题
+        seen = np.fromiter(seen, dtype=np.int64)
+        excluded[seen[(seen >= 0) & (seen < len(bank))]] = True  # 其他题库的做题记录忽略
+        slots = [t for t, _ in sorted(((t, i / c) for t, c in counts.items() for i in range(c)), key=lambda x: x[1])]
+        chosen, pointer = [], 0
+        for qtype in slots:
+            for step in range(len(order)):
+                topic = order[(pointer + step) % len(order)]
+                items = bank.candidates(topic, qtype)
+                items = items[(bank.difficulty[items] >= low) & (bank.difficulty[items] <= high)
+                              & (bank.score[items] == bank.type_scores[qtype]) & ~excluded[items]]
+                if len(items):
+                    item = int(items[rng.randrange(len(items))])
+                    chosen.append(item)
+                    excluded[item] = True
+                    pointer = (pointer + step + 1) % len(order)
+                    break
+            else:
+                raise ValueError(f"题库中没有足够的{qtype}（难度 {low}-{high}，{bank.type_scores[qtype]}分）")
+
+        questions = [bank.question(item) for item in chosen]
+        total_score = sum(q["score"] for q in questions)
+        if total_score != blueprint["total"]:
+            raise ValueError(f"试卷总分 {total_score} 与要求的 {blueprint['total']} 不符")
+        topics = {q["topic"] for q in questions}
+        return {
+            "test_type": test_type,
+            "total_score": total_score,
+            "questions": questions,
+            "coverage": {
+                "weaknesses": [t for t in weak if t in topics],
+                "prerequisites": [t for t in prerequisites if t in topics],
+                "missing_weaknesses": [t for t in weak if t not in topics],
+            },
+        }
@@ -0,0 +1,149 @@
+"""先修关系可达性索引"""
+from typing import Dict, Hashable, Iterable, List, Set
+
+
+class ReachabilityIndex:
+    """基于位集的传递闭包索引
+
+    每个节点分配一个比特位，按拓扑序一次性算出所有节点的祖先位集（反向得到后代位集）。
+    之后“X 是否是 Y 的先修”只需一次位运算，多个节点的祖先并集只需若干次按位或。
+    新增节点/边时增量更新，无需重建。
+    """
+    def __init__(self, graph=None):
+        self._node_ids: List[Hashable] = []
+        self._position: Dict[Hashable, int] = {}
+        self._ancestors: List[int] = []
+        self._descendants: List[int] = []
+        if graph is not None:
+            self._build(graph)
+
+    def _build(self, graph):
+        """按拓扑序（Kahn 算法）计算祖先位集，再按逆拓扑序计算后代位集"""
+        for node_id in graph.nodes():
+            self.add_node(node_id)
+
+        in_degree = {node_id: 0 for node_id in self._node_ids}
+        for node_id in self._node_ids:
+            for succ in graph.successors(node_id):
+                in_degree[succ] += 1
+
+        order = [node_id for node_id, degree in in_degree.items() if degree == 0]
+        for node_id in order:  # order 在遍历中增长，等价于队列
+            for succ in graph.successors(node_id):
+                in_degree[succ] -= 1
+                if in_degree[succ] == 0:
+                    order.append(succ)
+        if len(order) != len(self._node_ids):
+            raise ValueError("先修关系中存在环，无法建立可达性索引")
+
+        for node_id in order:
+            pos = self._position[node_id]
+            mask = 0
+            for pred in graph.predecessors(node_id):
+                pred_pos = self._position[pred]
+                mask |= self._ancestors[pred_pos] | (1 << pred_pos)
+            self._ancestors[pos] = mask
+
+        for node_id in reversed(order):
+            pos = self._position[node_id]
+            mask = 0
+            for succ in graph.successors(node_id):
+                succ_pos = self._position[succ]
+                mask |= self._descendants[succ_pos] | (1 << succ_pos)
+            self._descendants[pos] = mask
+
+    def __contains__(self, node_id) -> bool:
+        return node_id in self._position
+
+    def __len__(self) -> int:
+        return len(self._node_ids)
+
+    def _decode(self, mask: int) -> Set[Hashable]:
+        """把位集还原为节点ID集合"""
+        nodes = set()
+        while mask:
+            low_bit = mask & -mask
+            nodes.add(self._node_ids[low_bit.bit_length() - 1])
+            mask ^= low_bit
+        return nodes
+
+    def add_node(self, node_id):
+        """登记新节点（孤立节点没有祖先和后代）"""
+        if node_id in self._position:
+            return
+        self._position[node_id] = len(self._node_ids)
+        self._node_ids.append(node_id)
+        self._ancestors.append(0)
+        self._descendants.append(0)
+
+    def add_edge(self, source, target):
+        """增量加入一条 source -> target 的边，并更新受影响节点的祖先/后代位集"""
+        self.add_node(source)
+        self.add_node(target)
+        src, dst = self._position[source], self._position[target]
+        if self._ancestors[dst] >> src & 1:
+            return  # 已经可达，传递闭包不变
+        if src == dst or self._descendants[dst] >> src & 1:
+            raise ValueError(f"加入边 {source} -> {target} 会形成环")
+
+        new_ancestors = self._ancestors[src] | (1 << src)
+        affected = self._descendants[dst] | (1 << dst)
+        while affected:
+            low_bit = affected & -affected
+            self._ancestors[low_bit.bit_length() - 1] |= new_ancestors
+            affected ^= low_bit
+
+        new_descendants = self._descendants[dst] | (1 << dst)
+        affected = new_ancestors
+        while affected:
+            low_bit = affected & -affected
+            self._descendants[low_bit.bit_length() - 1] |= new_descendants
+            affected ^= low_bit
+
+    def is_ancestor(self, ancestor, node_id) -> bool:
+        """ancestor 是否是 node_id 的（直接或间接）先修，O(1)"""
+        if ancestor not in self._position or node_id not in self._position:
+            return False
+        return bool(self._ancestors[self._position[node_id]] >> self._position[ancestor] & 1)
+
+    def ancestor_mask(self, node_ids: Iterable) -> int:
+        """多个节点祖先位集的并集（忽略不存在的节点）"""
+        mask = 0
+        for node_id in node_ids:
+            pos = self._position.get(node_id)
+            if pos is not None:
+                mask |= self._ancestors[pos]
+        return mask
+
+    def node_mask(self, node_ids: Iterable) -> int:
+        """多个节点自身比特位的并集（忽略不存在的节点）"""
+        mask = 0
+        for node_id in node_ids:
+            pos = self._position.get(node_id)
+            if pos is not None:
+                mask |= 1 << pos
+        return mask
+
+    def has_descendant_in(self, node_id, mask: int) -> bool:
+        """node_id 的后代中是否有 mask 里的节点，O(1)"""
+        pos = self._position.get(node_id)
+        return pos is not None and bool(self._descendants[pos] & mask)
+
+    def ancestors(self, node_id) -> Set[Hashable]:
+        if node_id not in self._position:
+            return set()
+        return self._decode(self._ancestors[self._position[node_id]])
+
+    def descendants(self, node_id) -> Set[Hashable]:
+        if node_id not in self._position:
+            return set()
+        return self._decode(self._descendants[self._position[node_id]])
+
+    def ancestors_of_all(self, node_ids: Iterable) -> Set[Hashable]:
+        """多个节点的祖先并集"""
+        return self._decode(self.ancestor_mask(node_ids))
+
+    def count_ancestors(self, node_id) -> int:
+        if node_id not in self._position:
+            return 0
+        return self._ancestors[self._position[node_id]].bit_count()
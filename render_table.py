@@ -0,0 +1,56 @@
+"""节点渲染属性表：标签、颜色、大小、提示信息按列预先计算，所有可视化视图共用"""
+from typing import Dict, Hashable, List
+import numpy as np
+
+DEFAULT_COLOR = "#95A5A6"
+
+
+def node_tooltip(node_data: Dict) -> str:
+    """节点提示信息（HTML）"""
+    parts = [
+        f"名称: {node_data['name']}",
+        f"领域: {node_data.get('domain', '未知')}",
+        f"难度等级: {node_data.get('level', '未知')}",
+    ]
+    if 'keywords' in node_data:
+        parts.append(f"关键词: {', '.join(node_data['keywords'])}")
+    if 'common_errors' in node_data:
+        parts.append(f"常见错误: {', '.join(node_data['common_errors'])}")
+    parts.append("")
+    return "<br>".join(parts)
+
+
+class RenderTable:
+    """与图中节点顺序对齐的列式渲染属性表
+
+    只依赖图谱本身的属性（label、color、size、tooltip）在构建时一次算好，按图谱版本缓存；
+    依赖学生掌握情况的属性（形状等）由各视图在渲染时单独计算。
+    """
+    def __init__(self, graph, colors: Dict[str, str], default_color: str = DEFAULT_COLOR):
+        self.node_ids: List[Hashable] = []
+        self.labels: List[str] = []
+        self.colors: List[str] = []
+        self.tooltips: List[str] = []
+        levels = []
+        for node_id, data in graph.nodes(data=True):
+            self.node_ids.append(node_id)
+            self.labels.append(f"{node_id}\n{data['name']}")
+            self.colors.append(colors.get(data.get('domain', ''), default_color))
+            self.tooltips.append(node_tooltip(data))
+            levels.append(data.get('level', 1))
+        self.sizes = 15 + np.asarray(levels, dtype=np.int64) * 3
+        self._position = {node_id: i for i, node_id in enumerate(self.node_ids)}
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    def __contains__(self, node_id) -> bool:
+        return node_id in self._position
+
+    def position(self, node_id) -> int:
+        return self._position[node_id]
+
+    def row(self, node_id) -> Dict:
+        """单个节点的渲染属性，可直接作为 Network.add_node 的关键字参数"""
+        i = self._position[node_id]
+        return {"label": self.labels[i], "color": self.colors[i], "size": int(self.sizes[i]), "title": self.tooltips[i]}
@@ -4,48 +4,204 @@ import networkx as nx
 import json
 from typing import Dict, List, Optional
 from learning_path_recommender_base import LearningPathRecommender
+from bounded_cache import BoundedCache
+from review_scheduler import ReviewScheduler, Schedule
+from concept_clusters import detect_concept_clusters
+from lazy_plan import LazyDailyPlan
 
 class GradeSixReviewRecommender(LearningPathRecommender):
-    def __init__(self, graph):
+    # 各策略实际读取的档案字段及默认值；只有这些字段相同的档案才会得到相同的计划
+    STRATEGY_PROFILE_FIELDS = {
+        "weakness_focused": {"weaknesses": (), "target_days": 30, "daily_minutes": 90, "mastered": ()},
+        "exam_preparation": {"days_until_exam": 30},
+        "concept_integration": {"mastered": ()},
+    }
+    POSITIVE_INT_FIELDS = ("target_days", "days_until_exam", "daily_minutes")
+
+    def __init__(self, graph, plan_cache: Optional[BoundedCache] = None):
         super().__init__(graph)
+        self.plan_cache = plan_cache
+        self._cluster_paths = None
+        self._cluster_paths_version = None
         self.review_strategies = {
             "weakness_focused": self._weakness_focused_path,
             "exam_preparation": self._exam_preparation_path,
             "concept_integration": self._concept_integration_path
         }
     
-    def generate_review_plan(self, student_profile: Dict, strategy: str = "exam_preparation") -> Dict:
+    def generate_review_plan(self, student_profile: Dict, strategy: str = "exam_preparation",
+                             mastery=None) -> Dict:
         """
         生成个性化复习计划
+
+        mastery 为学生的掌握情况覆盖层（MasteryOverlay）；未提供时读取档案中的 "mastered" 列表。
+        配置了 plan_cache 时，结果按（规范化档案, 策略, 掌握情况, 图谱版本）缓存，
+        缓存返回的计划被多个调用方共享，不应修改。
         """
         if strategy not in self.review_strategies:
             raise ValueError(f"不支持的复习策略: {strategy}")
         
-        return self.review_strategies[strategy](student_profile)
+        if self.plan_cache is None:
+            return self._build_plan(student_profile, strategy, mastery)
+        return self.plan_cache.get_or_compute(
+            self.profile_key(student_profile, strategy, mastery),
+            lambda: self._build_plan(student_profile, strategy, mastery),
+            version=self.graph_version,
+        )
+    
+    def _build_plan(self, student_profile: Dict, strategy: str, mastery) -> Dict:
+        if mastery is None:
+            mastery = frozenset(student_profile.get("mastered", []))
+        return self.review_strategies[strategy](student_profile, mastery)
+    
+    def profile_key(self, student_profile: Dict, strategy: str, mastery=None) -> tuple:
+        """档案在给定策略下的规范化键
+
+        只包含该策略会读取的字段（姓名等无关字段不参与）；弱项与已掌握知识点去重排序，
+        天数、每日时长规范为正整数。传入掌握情况覆盖层时以其指纹代替档案中的 "mastered"。
+        """
+        if strategy not in self.STRATEGY_PROFILE_FIELDS:
+            raise ValueError(f"不支持的复习策略: {strategy}")
+        key = [strategy]
+        for field, default in self.STRATEGY_PROFILE_FIELDS[strategy].items():
+            if field == "mastered" and mastery is not None:
+                key.append(("mastery", mastery.fingerprint()))
+                continue
+            value = student_profile.get(field, default)
+            if field in self.POSITIVE_INT_FIELDS:
+                value = self._normalize_days(value, default)
+            elif isinstance(value, (list, tuple, set, frozenset)):
+                value = tuple(sorted(set(value)))
+            key.append((field, value))
+        return tuple(key)
+    
+    @staticmethod
+    def _normalize_days(value, default: int) -> int:
+        try:
+            return max(1, int(value))
+        except (TypeError, ValueError):
+            return default
+    
+    def _canonical_weaknesses(self, weaknesses) -> List[str]:
+        """弱项去重，并按先修深度（先修知识点数）排序：越基础的弱项越先攻克，与输入顺序无关"""
+        return sorted(set(weaknesses), key=lambda node: (self.count_prerequisites(node), node))
     
-    def _weakness_focused_path(self, profile: Dict) -> Dict:
+    def _weakness_focused_path(self, profile: Dict, mastery) -> Dict:
         """弱项突破型复习路径"""
-        weaknesses = profile.get("weaknesses", [])
-        target_days = profile.get("target_days", 30)
+        weaknesses = self._canonical_weaknesses(profile.get("weaknesses", []))
+        target_days = self._normalize_days(profile.get("target_days", 30), 30)
+        daily_minutes = self._normalize_days(profile.get("daily_minutes", 90), 90)
         
-        # 对每个弱项知识点，找到其先修基础
-        foundation_nodes = set()
-        for weak in weaknesses:
-            prereqs = nx.ancestors(self.graph, weak)
-            foundation_nodes.update(prereqs)
-        
-        # 按领域和难度组织复习内容
-        review_schedule = self._organize_by_week(foundation_nodes, weaknesses, target_days)
+        # 对每个弱项知识点，找到其尚未掌握的先修基础；图中不存在的弱项不排入，列在 unknown_topics 中
+        foundation_nodes = [
+            node for node in self.reachability.ancestors_of_all(weaknesses) if node not in mastery
+        ]
         
+        # 先修在前、按每日时长装箱；排不下的知识点列入 unscheduled，不会被丢弃
+        schedule = ReviewScheduler(self.graph, daily_minutes).schedule(
+            foundation_nodes + weaknesses, target_days, weaknesses)
+        return self._weakness_plan(weaknesses, target_days, daily_minutes, schedule)
+    
+    @staticmethod
+    def _assessment_points(days: int) -> List[int]:
+        """评估时间点：每满一周一次，不足一周时在最后一天"""
+        return list(range(7, days + 1, 7)) or [days]
+    
+    def _weakness_plan(self, weaknesses: List[str], target_days: int, daily_minutes: int,
+                       schedule: Schedule) -> Dict:
+        unknown = set(schedule.unknown)
         return {
             "strategy": "弱项突破",
             "total_days": target_days,
-            "weaknesses": weaknesses,
-            "schedule": review_schedule,
-            "assessment_points": [7, 14, 21, 28]  # 评估时间点
+            "daily_minutes": daily_minutes,
+            "weaknesses": [node for node in weaknesses if node not in unknown],
+            "schedule": self._organize_by_week(schedule, weaknesses),
+            "unscheduled": schedule.overflow,
+            "unknown_topics": schedule.unknown,
+            "assessment_points": self._assessment_points(target_days)
         }
     
-    def _exam_preparation_path(self, profile: Dict) -> Dict:
+    @staticmethod
+    def _schedule_from_plan(plan: Dict) -> Schedule:
+        """从弱项突破计划的按周分组还原逐日排程（各天列表与原计划共享，不会被修改）"""
+        days, minutes = [], []
+        for week in plan["schedule"].values():
+            days.extend(week["每日安排"].values())
+            minutes.extend(week["每日时长"])
+        return Schedule(days, minutes, list(plan["unscheduled"]), [], list(plan.get("unknown_topics", [])))
+    
+    def replan_weakness_plan(self, previous_plan: Dict, completed_days: int = 0,
+                             added_weaknesses=(), removed_weaknesses=(),
+                             added_mastered=(), removed_mastered=(), mastery=None) -> Dict:
+        """弱项或已掌握知识点变化后，在原弱项突破计划上增量调整
+        
+        只对变化涉及的弱项求祖先集合、只改动受影响的那几天，前 completed_days 天保持不变；
+        mastery 为变化后的掌握情况。返回新计划，其中 "diff" 列出新增、删除和改期的知识点；
+        新增知识点与已排的后续冲突时退回到整体重排未完成的天数（"full_replan" 为 True）。
+        """
+        mastery = mastery if mastery is not None else frozenset()
+        reach = self.reachability
+        added_weak = set(added_weaknesses)
+        removed_weak = set(removed_weaknesses) - added_weak
+        weak = (set(previous_plan["weaknesses"]) - removed_weak) | added_weak
+        # 图中不存在的弱项不参与排程，只在 unknown_topics 中增删
+        unknown = [node for node in previous_plan.get("unknown_topics", []) if node not in removed_weak]
+        unknown += sorted((node for node in added_weak if node not in self.graph and node not in unknown), key=str)
+        weak = {node for node in weak if node in self.graph}
+        weaknesses = self._canonical_weaknesses(weak)
+        newly_mastered = set(added_mastered)
+        weak_mask = reach.node_mask(weaknesses)
+        
+        def needed(node) -> bool:
+            if node in weak:
+                return True
+            return node not in mastery and node not in newly_mastered and reach.has_descendant_in(node, weak_mask)
+        
+        schedule = self._schedule_from_plan(previous_plan)
+        completed = min(max(0, int(completed_days)), len(schedule.days))
+        # pending：尚未完成的天和排不下的知识点，只有它们可以删除或重新放置；已完成的天原样保留
+        pending = {topic for day in schedule.days[completed:] for topic in day}
+        pending.update(schedule.overflow)
+        planned = pending | {topic for day in schedule.days[:completed] for topic in day}
+        # 只检查变化涉及的知识点：被移除弱项及其祖先、新掌握的知识点可能不再需要；
+        # 新增弱项及其祖先、取消掌握的知识点可能需要加入；弱项身份变化的知识点按新时长重新放置
+        remove = {node for node in removed_weak | reach.ancestors_of_all(removed_weak) | newly_mastered
+                  if node in pending and not needed(node)}
+        add = {node for node in added_weak | reach.ancestors_of_all(added_weak) | set(removed_mastered)
+               if node not in planned and needed(node)}
+        recost = ((added_weak | removed_weak) & pending) - remove
+        order = sorted(add | recost, key=lambda node: (self.count_prerequisites(node), str(node)))
+        
+        total_days, daily_minutes = previous_plan["total_days"], previous_plan["daily_minutes"]
+        scheduler = ReviewScheduler(self.graph, daily_minutes)
+        patched = scheduler.patch(schedule, total_days, remove | recost, order, completed, weaknesses)
+        if patched is not None:
+            new_schedule, moves = patched
+        else:
+            # 新增知识点插不进去：保留已完成的天，其余知识点整体重排
+            done = {topic for day in schedule.days[:completed] for topic in day}
+            remaining = [topic for day in schedule.days[completed:] for topic in day if topic not in remove]
+            remaining += [topic for topic in schedule.overflow if topic not in remove] + order
+            rest = scheduler.schedule([topic for topic in remaining if topic not in done],
+                                      total_days - completed, weaknesses)
+            new_schedule = Schedule(schedule.days[:completed] + rest.days, schedule.minutes[:completed] + rest.minutes,
+                                    rest.overflow, rest.over_budget)
+            old_day, new_day = schedule.day_of(), new_schedule.day_of()
+            moves = {topic: (old_day.get(topic), new_day.get(topic))
+                     for topic in planned | add if topic in add or old_day.get(topic) != new_day.get(topic)}
+        
+        new_schedule.unknown = unknown
+        plan = self._weakness_plan(weaknesses, total_days, daily_minutes, new_schedule)
+        plan["diff"] = {
+            "added": {topic: moves[topic][1] for topic in order if topic in add and topic in moves},
+            "removed": sorted(remove, key=str),
+            "moved": {topic: list(days) for topic, days in moves.items()
+                      if topic not in add and topic not in remove and days[0] != days[1]},
+            "full_replan": patched is None,
+        }
+        return plan
+    
+    def _exam_preparation_path(self, profile: Dict, mastery) -> Dict:
         """考试冲刺型复习路径"""
         exam_topics = [
             "NA1", "NA2", "NA4",  # 数与代数核心
@@ -54,63 +210,72 @@ class GradeSixReviewRecommender(LearningPathRecommender):
             "SP1"                 # 统计
         ]
         
-        # 构建倒计时复习计划（考前30天）
-        days_until_exam = profile.get("days_until_exam", 30)
+        # 倒计时复习计划：考前天数三等分为三个阶段，每日安排按需生成；
+        # 不足三天时每个阶段至少一天，靠前的阶段并入第一个保留的阶段（记录在 merged_phases 中）
+        days_until_exam = self._normalize_days(profile.get("days_until_exam", 30), 30)
+        phases = [
+            ("知识梳理", ["NA1", "NA2", "GG1", "GG2"], "基础题+概念辨析"),
+            ("综合提升", ["NA4", "CA1", "CA2", "CA3"], "应用题+综合题"),
+            ("模拟冲刺", exam_topics, "模拟卷+错题回顾"),
+        ]
+        merged = phases[:max(0, len(phases) - days_until_exam)]
+        if merged:
+            phases = phases[len(merged):]
+            title, focus, practice_type = phases[0]
+            merged_focus = [topic for _, topics, _ in merged for topic in topics] + focus
+            phases[0] = (title, list(dict.fromkeys(merged_focus)), practice_type)
+        bounds = [days_until_exam * k // len(phases) for k in range(len(phases) + 1)]
         
-        schedule = {
-            "第一阶段：知识梳理（第1-10天）": {
-                "focus": ["NA1", "NA2", "GG1", "GG2"],
-                "daily_plan": self._create_daily_plan(["NA1", "NA2", "GG1", "GG2"], 10),
-                "practice_type": "基础题+概念辨析"
-            },
-            "第二阶段：综合提升（第11-20天）": {
-                "focus": ["NA4", "CA1", "CA2", "CA3"],
-                "daily_plan": self._create_daily_plan(["NA4", "CA1", "CA2", "CA3"], 10),
-                "practice_type": "应用题+综合题"
-            },
-            "第三阶段：模拟冲刺（第21-30天）": {
-                "focus": exam_topics,
-                "daily_plan": self._create_daily_plan(exam_topics, 10),
-                "practice_type": "模拟卷+错题回顾"
+        schedule = {}
+        for k, (title, focus, practice_type) in enumerate(phases):
+            first, last = bounds[k] + 1, bounds[k + 1]
+            schedule[f"第{'一二三'[k]}阶段：{title}（第{first}-{last}天）"] = {
+                "focus": focus,
+                "daily_plan": self._create_daily_plan(focus, last - first + 1, first_day=first),
+                "practice_type": practice_type
             }
-        }
         
+        mock_days = bounds[1:-1] + [days_until_exam - 5, days_until_exam - 2, days_until_exam]
         return {
             "strategy": "考试冲刺",
-            "total_phases": 3,
-            "days_per_phase": 10,
+            "total_phases": len(schedule),
+            "days_per_phase": days_until_exam // len(phases),
+            "merged_phases": [title for title, _, _ in merged],
             "schedule": schedule,
-            "mock_exam_schedule": [10, 20, 25, 28, 30]  # 模拟考试日期
+            "mock_exam_schedule": sorted({day for day in mock_days if day > 0})  # 模拟考试日期
         }
     
-    def _concept_integration_path(self, profile: Dict) -> Dict:
-        """概念整合型复习路径"""
-        # 识别跨领域知识簇
-        concept_clusters = {
-            "数的扩展": ["N5", "N6", "NA1", "NA2"],  # 分数→小数→百分数
-            "图形度量": ["G3", "GG1", "GG2"],        # 面积→圆→立体图形
-            "问题解决": ["NA4", "CA1", "CA2", "CA3"]  # 方程→各类应用题
-        }
-        
-        integration_path = []
-        for cluster_name, nodes in concept_clusters.items():
-            cluster_path = []
-            for node in nodes:
-                if node in self.graph:
-                    prereq_tree = self.get_prerequisite_tree(node)
-                    cluster_path.append({
+    def concept_cluster_paths(self) -> List[tuple]:
+        """自动识别的概念簇及其簇内学习顺序 [(ConceptCluster, [知识点条目...])]
+
+        社区发现与先修计数只在图谱版本变化时重新计算；返回的条目被所有请求共享，不应修改。
+        """
+        version = self.graph_version
+        if self._cluster_paths is None or version != self._cluster_paths_version:
+            clusters = detect_concept_clusters(self.graph, self.count_prerequisites)
+            self._cluster_paths = [
+                (cluster, [
+                    {
                         "concept": node,
                         "name": self.graph.nodes[node]["name"],
-                        "prerequisite_count": len(self._flatten_prereq_tree(prereq_tree))
-                    })
-            
-            # 按先修关系排序
-            cluster_path.sort(key=lambda x: x["prerequisite_count"])
-            
+                        "prerequisite_count": cluster.prerequisite_counts[node],
+                    }
+                    for node in cluster.members
+                ])
+                for cluster in clusters
+            ]
+            self._cluster_paths_version = version
+        return self._cluster_paths
+    
+    def _concept_integration_path(self, profile: Dict, mastery) -> Dict:
+        """概念整合型复习路径"""
+        # 概念簇与簇内顺序（先修在前）来自按图谱版本缓存的预计算，每次请求只补充掌握情况
+        integration_path = []
+        for cluster, entries in self.concept_cluster_paths():
             integration_path.append({
-                "cluster": cluster_name,
-                "description": f"{cluster_name}知识簇",
-                "learning_path": cluster_path,
+                "cluster": cluster.name,
+                "description": f"{cluster.name}（{'、'.join(cluster.domains)}）",
+                "learning_path": [dict(entry, mastered=entry["concept"] in mastery) for entry in entries],
                 "integration_activities": ["专题练习", "跨领域应用题"]
             })
         
@@ -120,74 +285,29 @@ class GradeSixReviewRecommender(LearningPathRecommender):
             "integration_projects": ["生活数学项目", "数学建模小任务"]
         }
     
-    def _organize_by_week(self, foundation_nodes, weak_nodes, total_days):
-        """按周组织复习计划"""
-        weeks = total_days // 7 if total_days >= 7 else 1
-        schedule = {}
-        
-        # 第一周：基础巩固
-        foundation_list = list(foundation_nodes)
-        schedule["第1周：基础巩固"] = {
-            "目标": "夯实弱项知识点的基础",
-            "知识点": foundation_list[:min(5, len(foundation_list))],  # 取最重要的5个基础点
-            "每日安排": self._distribute_to_days(foundation_list[:min(5, len(foundation_list))], min(7, total_days)),
-            "配套练习": "基础题+概念判断题"
-        }
-        
-        # 中间周：弱项突破
-        for week in range(2, weeks + 1):
-            week_key = f"第{week}周：专项突破"
-            if week-2 < len(weak_nodes):
-                weak_topic = [weak_nodes[week-2]] if week-2 < len(weak_nodes) else []
-                schedule[week_key] = {
-                    "目标": f"集中攻克第{week-1}个弱项",
-                    "知识点": weak_topic,
-                    "每日安排": self._distribute_to_days(weak_topic, 7),
-                    "配套练习": "专项训练题+易错题"
-                }
-        
-        return schedule
-    
-    def _create_daily_plan(self, topics, days):
-        """创建每日学习计划"""
-        daily_plans = {}
-        topics_per_day = max(1, len(topics) // days)
-        
-        for day in range(1, days + 1):
-            start_idx = (day - 1) * topics_per_day
-            end_idx = min(start_idx + topics_per_day, len(topics))
-            daily_topics = topics[start_idx:end_idx]
-            
-            # 获取知识点名称
-            topic_names = []
-            for t in daily_topics:
-                if t in self.graph:
-                    topic_names.append(self.graph.nodes[t].get("name", t))
-            
-            daily_plans[f"第{day}天"] = {
-                "复习内容": daily_topics,
-                "知识点名称": topic_names,
-                "学习时长": "60-90分钟",
-                "练习建议": {
-                    "基础巩固": f"{len(daily_topics)*5}道基础题",
-                    "能力提升": f"{len(daily_topics)*2}道应用题",
-                    "易错回顾": "回顾前日错题"
-                }
+    def _organize_by_week(self, schedule: Schedule, weak_nodes) -> Dict:
+        """把逐日排程按周分组：含弱项的周为专项突破，其余为基础巩固"""
+        weak = set(weak_nodes)
+        weeks = {}
+        for start in range(0, len(schedule.days), 7):
+            days = schedule.days[start:start + 7]
+            topics = [topic for day in days for topic in day]
+            week_weak = [topic for topic in topics if topic in weak]
+            week = start // 7 + 1
+            if week_weak:
+                title, goal, practice = f"第{week}周：专项突破", f"集中攻克弱项 {'、'.join(week_weak)}", "专项训练题+易错题"
+            else:
+                title, goal, practice = f"第{week}周：基础巩固", "夯实弱项知识点的基础", "基础题+概念判断题"
+            weeks[title] = {
+                "目标": goal,
+                "知识点": topics,
+                "每日安排": {f"第{start + i}天": day for i, day in enumerate(days, 1)},
+                "每日时长": schedule.minutes[start:start + 7],
+                "配套练习": practice
             }
-        
-        return daily_plans
+        return weeks
     
-    def _distribute_to_days(self, topics, days):
-        """将知识点分配到每天"""
-        if not topics:
-            return {}
-        
-        daily_dist = {}
-        topics_per_day = max(1, len(topics) // days)
-        
-        for day in range(1, min(days, len(topics)) + 1):
-            start_idx = (day - 1) * topics_per_day
-            end_idx = min(start_idx + topics_per_day, len(topics))
-            daily_dist[f"第{day}天"] = topics[start_idx:end_idx]
-        
-        return daily_dist
\ No newline at end of file
+    def _create_daily_plan(self, topics, days, first_day: int = 1) -> LazyDailyPlan:
+        """创建每日学习计划：返回按需计算每天安排的惰性序列，只预先取出这些知识点的名称"""
+        names = {t: self.graph.nodes[t].get("name", t) for t in topics if t in self.graph}
+        return LazyDailyPlan(topics, days, names, first_day=first_day)
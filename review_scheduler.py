@@ -0,0 +1,244 @@
+"""复习排程：按先修关系拓扑排序，在每日时长预算内把知识点装入各天"""
+import heapq
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+class Schedule:
+    """排程结果
+
+    - days：第 i 项为第 i+1 天的知识点列表（先修在前）；
+    - minutes：每天占用的分钟数；
+    - overflow：在给定天数内排不下的知识点（按应学顺序），不会被丢弃；
+    - over_budget：单个知识点就超过每日预算、只能独占一天的知识点；
+    - unknown：图谱中不存在、没有排入的知识点ID（按输入顺序）。
+    """
+    def __init__(self, days: List[List[Hashable]], minutes: List[int], overflow: List[Hashable],
+                 over_budget: List[Hashable], unknown: Optional[List[Hashable]] = None):
+        self.days = days
+        self.minutes = minutes
+        self.overflow = overflow
+        self.over_budget = over_budget
+        self.unknown = unknown or []
+
+    @property
+    def scheduled_count(self) -> int:
+        return sum(len(day) for day in self.days)
+
+    def day_of(self) -> Dict[Hashable, int]:
+        """{知识点: 第几天（从 1 开始）}"""
+        return {topic: i for i, day in enumerate(self.days, 1) for topic in day}
+
+
+class ReviewScheduler:
+    """拓扑有序、容量受限的每日排程器
+
+    在待复习知识点及其全部先修构成的子图上做 Kahn 拓扑排序，就绪的知识点放进优先队列；
+    每天按优先级依次取出能放进剩余时长的知识点（放不下的暂存，当天结束后放回；
+    连续 lookahead 个放不下即结束当天，避免每天扫描整个队列），
+    一个知识点排入后它的后续知识点随即就绪，同一天内也可以接着学。
+    已掌握（不在 topics 中）的先修视为已完成，不占用时间；图谱中不存在的知识点ID不排入，
+    列在 Schedule.unknown 中。复杂度 O((V + E) log V)。
+    """
+    BASE_MINUTES = 20
+    LEVEL_MINUTES = 5
+    WEAKNESS_FACTOR = 1.5
+
+    def __init__(self, graph, minutes_per_day: int = 90, lookahead: int = 16):
+        self.graph = graph
+        self.minutes_per_day = minutes_per_day
+        self.lookahead = lookahead
+
+    def estimate_minutes(self, node, weak: bool = False) -> int:
+        """知识点的预计复习时长：难度越高越长，弱项额外加时"""
+        level = self.graph.nodes[node].get("level", 1) if node in self.graph else 1
+        minutes = self.BASE_MINUTES + self.LEVEL_MINUTES * level
+        return int(round(minutes * self.WEAKNESS_FACTOR)) if weak else minutes
+
+    def _default_priority(self, node) -> tuple:
+        data = self.graph.nodes[node] if node in self.graph else {}
+        return (data.get("level", 0), str(node))
+
+    def schedule(self, topics: Iterable[Hashable], days: int, weaknesses: Iterable[Hashable] = (),
+                 cost: Optional[Callable[[Hashable], int]] = None,
+                 priority: Optional[Callable[[Hashable], tuple]] = None) -> Schedule:
+        """把 topics 排入 days 天；cost 为知识点耗时（分钟），priority 越小越先学"""
+        topics = list(dict.fromkeys(topics))
+        unknown = [node for node in topics if node not in self.graph]
+        weak = set(weaknesses)
+        cost = cost or (lambda node: self.estimate_minutes(node, node in weak))
+        priority = priority or self._default_priority
+        wanted = set(topics)
+
+        # 待复习知识点及其全部先修（在图中）构成的子图
+        closure = {node for node in topics if node in self.graph}
+        stack = list(closure)
+        while stack:
+            for pred in self.graph.predecessors(stack.pop()):
+                if pred not in closure:
+                    closure.add(pred)
+                    stack.append(pred)
+        indegree = {node: 0 for node in closure}
+        for node in closure:
+            for succ in self.graph.successors(node):
+                if succ in indegree:
+                    indegree[succ] += 1
+
+        ready: list = []
+        passthrough = [node for node, degree in indegree.items() if degree == 0]
+
+        def release(node):
+            for succ in self.graph.successors(node):
+                if succ in indegree:
+                    indegree[succ] -= 1
+                    if indegree[succ] == 0:
+                        passthrough.append(succ)
+
+        def drain():
+            # 已掌握的先修直接视为完成；需要复习的就绪知识点进入优先队列
+            while passthrough:
+                node = passthrough.pop()
+                if node in wanted:
+                    heapq.heappush(ready, (priority(node), node))
+                else:
+                    release(node)
+
+        drain()
+        plan_days: List[List[Hashable]] = []
+        minutes: List[int] = []
+        over_budget: List[Hashable] = []
+        for _ in range(days):
+            if not ready:
+                break
+            today, used, deferred = [], 0, []
+            while ready:
+                item = heapq.heappop(ready)
+                node = item[1]
+                needed = cost(node)
+                if today and used + needed > self.minutes_per_day:
+                    deferred.append(item)
+                    if len(deferred) >= self.lookahead:
+                        break
+                    continue
+                today.append(node)
+                used += needed
+                release(node)
+                drain()
+                if needed > self.minutes_per_day:
+                    over_budget.append(node)
+                    break
+            for item in deferred:
+                heapq.heappush(ready, item)
+            plan_days.append(today)
+            minutes.append(used)
+
+        # 排不下的知识点按拓扑顺序全部列出
+        overflow = []
+        while ready:
+            node = heapq.heappop(ready)[1]
+            overflow.append(node)
+            release(node)
+            drain()
+        return Schedule(plan_days, minutes, overflow, over_budget, unknown)
+
+    def patch(self, schedule: Schedule, days: int, remove: Iterable[Hashable], add: Iterable[Hashable],
+              completed: int = 0, weaknesses: Iterable[Hashable] = (),
+              cost: Optional[Callable[[Hashable], int]] = None) -> Optional[Tuple[Schedule, Dict]]:
+        """在已有排程上增量修改：删去 remove，再按给定顺序（须先修在前）插入 add
+
+        前 completed 天已经完成，保持不变；只复制和改动涉及的那几天。新增知识点放进
+        位于其先修之后、后续之前、且剩余时长放得下的最早一天；删除后空出的时长
+        依次补入原先排不下的知识点。返回 (新排程, {知识点: (原第几天, 新第几天)})，
+        不在排程中记为 None；有后续已排入的新增知识点找不到位置时返回 None，由调用方整体重排。
+        remove / add 只应包含图谱中的知识点，unknown 原样沿用。
+        """
+        weak = set(weaknesses)
+        cost = cost or (lambda node: self.estimate_minutes(node, node in weak))
+        plan_days = list(schedule.days)
+        minutes = list(schedule.minutes)
+        overflow = list(schedule.overflow)
+        over_budget = list(schedule.over_budget)
+        day_of = {topic: i for i, day in enumerate(plan_days) for topic in day}
+        copied = set()
+        moves: Dict[Hashable, tuple] = {}
+
+        def editable(d: int) -> List[Hashable]:
+            if d not in copied:
+                plan_days[d] = list(plan_days[d])
+                copied.add(d)
+            return plan_days[d]
+
+        def place(node, candidate_days: Optional[set] = None) -> Optional[bool]:
+            """放入一天（可限定候选天）：成功为 True，只能排不下为 False，与已排的后续冲突为 None"""
+            preds = set(self.graph.predecessors(node)) if node in self.graph else set()
+            succs = set(self.graph.successors(node)) if node in self.graph else set()
+            succ_days = [day_of[s] for s in succs if s in day_of]
+            if preds & waiting:
+                return None if succ_days else False
+            earliest = max([completed] + [day_of[p] for p in preds if p in day_of])
+            latest = min(succ_days) if succ_days else days - 1
+            needed = cost(node)
+            candidates = range(earliest, latest + 1) if candidate_days is None else \
+                sorted(d for d in candidate_days if earliest <= d <= latest)
+            for d in candidates:
+                while len(plan_days) <= d:
+                    plan_days.append([])
+                    minutes.append(0)
+                    copied.add(len(plan_days) - 1)
+                day = plan_days[d]
+                if day and minutes[d] + needed > self.minutes_per_day:
+                    continue
+                lo = max((i + 1 for i, topic in enumerate(day) if topic in preds), default=0)
+                hi = min((i for i, topic in enumerate(day) if topic in succs), default=len(day))
+                if lo > hi:
+                    continue
+                editable(d).insert(hi, node)
+                minutes[d] += needed
+                day_of[node] = d
+                if needed > self.minutes_per_day:
+                    over_budget.append(node)
+                moves[node] = (moves.get(node, (None,))[0], d + 1)
+                return True
+            return None if succ_days else False
+
+        unscheduled = set(overflow)
+        freed = set()
+        for node in remove:
+            d = day_of.get(node)
+            if d is not None and d >= completed:
+                del day_of[node]
+                editable(d).remove(node)
+                minutes[d] = sum(cost(topic) for topic in plan_days[d])
+                moves[node] = (d + 1, None)
+                freed.add(d)
+            elif node in unscheduled:
+                moves[node] = (None, None)
+        overflow = [node for node in overflow if node not in moves]
+        # waiting：尚未排入的知识点（排不下的与待插入的），它们的后续不能先于它们排入
+        add = [node for node in add if node not in day_of]
+        unscheduled.difference_update(moves)
+        waiting = unscheduled | set(add)
+
+        # 删除后空出的时长先补给原先排不下的知识点（保持原顺序，只看空出时长的那几天）
+        if freed:
+            for node in overflow:
+                if place(node, freed):
+                    unscheduled.discard(node)
+                    waiting.discard(node)
+            overflow = [node for node in overflow if node in unscheduled]
+
+        for node in add:
+            if node in day_of or node in unscheduled:
+                continue
+            waiting.discard(node)
+            placed = place(node)
+            if placed is None:
+                return None
+            if not placed:
+                # 排在原先排不下的后续知识点之前，overflow 保持应学顺序
+                succs = set(self.graph.successors(node)) if node in self.graph else set()
+                overflow.insert(next((i for i, topic in enumerate(overflow) if topic in succs), len(overflow)), node)
+                unscheduled.add(node)
+                waiting.add(node)
+                moves[node] = (moves.get(node, (None,))[0], None)
+
+        return Schedule(plan_days, minutes, overflow, over_budget, list(schedule.unknown)), moves
@@ -0,0 +1,182 @@
+"""间隔重复复习引擎（SM-2）：按 (学生, 知识点) 记录遗忘进度，取出今天到期的复习项
+
+所有状态保存在 学生 × 知识点 的紧凑 NumPy 矩阵中；日期用整数天（date.toordinal()）表示。
+"""
+from datetime import date
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from graph_layout import topological_depths
+
+
+def day_number(day: date) -> int:
+    return day.toordinal()
+
+
+class SpacedRepetitionEngine:
+    """SM-2 间隔重复引擎
+
+    - interval / ease / reps / lapses / due 为 学生 × 知识点 的矩阵，未加入复习的格子 due 为 NOT_SCHEDULED；
+    - 全局“今天到期”用按到期日分桶的索引（桶内为扁平下标，过期条目在读取时剔除），
+      不必扫描全部矩阵；单个学生的到期项直接在其所在行上筛选；
+    - 到期知识点按先修顺序（拓扑深度）排列，先修处于遗忘状态（最近一次回答失败）时后续知识点暂缓。
+    """
+    INITIAL_EASE = 2.5
+    MIN_EASE = 1.3
+    PASS_QUALITY = 3
+    NOT_SCHEDULED = np.iinfo(np.int32).max
+
+    def __init__(self, graph, capacity: int = 64):
+        self.graph = graph
+        self.topics: List[Hashable] = list(graph.nodes())
+        self.topic_index: Dict[Hashable, int] = {topic: i for i, topic in enumerate(self.topics)}
+        self.students: List[Hashable] = []
+        self.student_index: Dict[Hashable, int] = {}
+
+        depths = topological_depths(graph, self.topics)
+        order = sorted(range(len(self.topics)), key=lambda i: (depths[self.topics[i]], str(self.topics[i])))
+        self.topic_rank = np.empty(len(self.topics), dtype=np.int32)
+        self.topic_rank[order] = np.arange(len(self.topics), dtype=np.int32)
+        edges = [(self.topic_index[u], self.topic_index[v]) for u, v in graph.edges()]
+        self._edge_pred = np.array([u for u, _ in edges], dtype=np.int32)
+        self._edge_succ = np.array([v for _, v in edges], dtype=np.int32)
+
+        self._allocate(max(1, capacity))
+        self._buckets: Dict[int, List[np.ndarray]] = {}
+
+    # ---------- 存储 ----------
+    def _allocate(self, rows: int):
+        shape = (rows, len(self.topics))
+        old = getattr(self, "due", None)
+        fields = {
+            "interval": (np.float32, 0),
+            "ease": (np.float32, self.INITIAL_EASE),
+            "reps": (np.int16, 0),
+            "lapses": (np.int16, 0),
+            "due": (np.int32, self.NOT_SCHEDULED),
+        }
+        for name, (dtype, fill) in fields.items():
+            array = np.full(shape, fill, dtype=dtype)
+            if old is not None:
+                previous = getattr(self, name)
+                array[:previous.shape[0]] = previous
+            setattr(self, name, array)
+
+    def _student(self, student) -> int:
+        index = self.student_index.get(student)
+        if index is None:
+            index = len(self.students)
+            if index >= self.due.shape[0]:
+                self._allocate(self.due.shape[0] * 2)
+            self.students.append(student)
+            self.student_index[student] = index
+        return index
+
+    def _topic(self, topic) -> int:
+        try:
+            return self.topic_index[topic]
+        except KeyError:
+            raise ValueError(f"知识点 {topic} 不存在") from None
+
+    def _index(self, students: Iterable[Hashable], topics: Iterable[Hashable]) -> Tuple[np.ndarray, np.ndarray]:
+        rows = np.fromiter((self._student(s) for s in students), dtype=np.int64)
+        cols = np.fromiter((self._topic(t) for t in topics), dtype=np.int64)
+        if len(rows) != len(cols):
+            raise ValueError("学生与知识点数量不一致")
+        return rows, cols
+
+    def _file(self, flat: np.ndarray, due: np.ndarray):
+        """把扁平下标按到期日放入分桶索引"""
+        order = np.argsort(due, kind="stable")
+        flat, due = flat[order], due[order]
+        days, starts = np.unique(due, return_index=True)
+        for day, chunk in zip(days.tolist(), np.split(flat, starts[1:])):
+            self._buckets.setdefault(day, []).append(chunk)
+
+    # ---------- 更新 ----------
+    def enroll(self, student, topics: Iterable[Hashable], today: int):
+        """把知识点加入学生的复习队列（今天即到期）；已在队列中的知识点保持原进度"""
+        row = self._student(student)
+        cols = np.unique(np.fromiter((self._topic(t) for t in topics), dtype=np.int64))
+        cols = cols[self.due[row, cols] == self.NOT_SCHEDULED]
+        self.due[row, cols] = today
+        self._file(row * len(self.topics) + cols, np.full(len(cols), today, dtype=np.int64))
+
+    def review_batch(self, students: Iterable[Hashable], topics: Iterable[Hashable],
+                     qualities, today: int) -> np.ndarray:
+        """批量记录复习结果（quality 0-5，≥3 为通过），返回各项的下次到期日
+
+        同一批次内每个 (学生, 知识点) 至多出现一次。
+        """
+        rows, cols = self._index(students, topics)
+        return self.review_indices(rows, cols, qualities, today)
+
+    def review_indices(self, rows: np.ndarray, cols: np.ndarray, qualities, today: int) -> np.ndarray:
+        """review_batch 的下标版本：rows / cols 为已登记的学生下标与知识点下标"""
+        rows, cols = np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)
+        q = np.asarray(qualities, dtype=np.float32)
+        passed = q >= self.PASS_QUALITY
+
+        reps = np.where(passed, self.reps[rows, cols] + 1, 0).astype(np.int16)
+        grown = np.rint(self.interval[rows, cols] * self.ease[rows, cols])
+        interval = np.where(~passed | (reps == 1), 1, np.where(reps == 2, 6, grown)).astype(np.float32)
+        penalty = 5 - q
+        ease = np.maximum(self.MIN_EASE, self.ease[rows, cols] + 0.1 - penalty * (0.08 + penalty * 0.02))
+        due = (today + interval).astype(np.int64)
+
+        self.reps[rows, cols] = reps
+        self.interval[rows, cols] = interval
+        self.ease[rows, cols] = ease
+        self.lapses[rows, cols] += (~passed).astype(np.int16)
+        self.due[rows, cols] = due
+        self._file(rows * len(self.topics) + cols, due)
+        return due
+
+    def review(self, student, topic, quality: int, today: int) -> int:
+        """记录一次复习结果，返回下次到期日"""
+        return int(self.review_batch([student], [topic], [quality], today)[0])
+
+    # ---------- 查询 ----------
+    def due_items(self, today: int) -> Tuple[np.ndarray, np.ndarray]:
+        """全部学生今天到期（含逾期）的复习项，返回 (学生下标, 知识点下标) 数组
+
+        只读取到期日不晚于今天的分桶，开销与到期条目数成正比；读取时剔除已改期的条目并压缩该桶。
+        """
+        flat_due = self.due.reshape(-1)
+        chunks = []
+        for day in sorted(day for day in self._buckets if day <= today):
+            chunk = np.concatenate(self._buckets[day])
+            chunk = chunk[flat_due[chunk] == day]
+            if len(chunk):
+                self._buckets[day] = [chunk]
+                chunks.append(chunk)
+            else:
+                del self._buckets[day]
+        # 同一项可能在桶里出现多次：排序后去掉相邻重复（比 np.unique 快得多）
+        flat = np.sort(np.concatenate(chunks)) if chunks else np.empty(0, dtype=np.int64)
+        flat = flat[np.r_[True, flat[1:] != flat[:-1]]] if len(flat) else flat
+        return flat // len(self.topics), flat % len(self.topics)
+
+    def due_topics(self, student, today: int, limit: Optional[int] = None) -> List[Hashable]:
+        """学生今天到期的知识点，先修在前；先修处于遗忘状态的知识点暂缓到先修巩固之后"""
+        row = self.student_index.get(student)
+        if row is None:
+            return []
+        due = self.due[row] <= today
+        forgotten = (self.reps[row] == 0) & (self.lapses[row] > 0)
+        blocked = np.zeros(len(self.topics), dtype=bool)
+        blocked[self._edge_succ[forgotten[self._edge_pred]]] = True
+        cols = np.flatnonzero(due & ~blocked)
+        cols = cols[np.argsort(self.topic_rank[cols], kind="stable")]
+        if limit is not None:
+            cols = cols[:limit]
+        return [self.topics[i] for i in cols]
+
+    def next_due(self, student) -> Optional[int]:
+        """学生最近一个到期日；没有复习项时为 None"""
+        row = self.student_index.get(student)
+        if row is None:
+            return None
+        earliest = int(self.due[row].min())
+        return None if earliest == self.NOT_SCHEDULED else earliest
@@ -0,0 +1,241 @@
+"""批量导出静态 HTML（每个知识点的思维导图 + 复习路线图），供离线课堂使用
+
+用法：
+    python static_export.py -o site --workers 4 --per-domain-roadmaps
+
+所有页面共用 assets/ 下的一份 vis-network 脚本与样式，不再逐页内联或依赖 CDN；
+内容哈希与上次导出相同的页面不会重写，上次导出过、这次不再导出的页面会被删除，便于增量同步到教室电脑。
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import pyvis
+
+from bounded_cache import BoundedCache
+from grade_six_visualizer import GradeSixVisualizer
+from knowledge_graph import GradeSixReviewGraph
+
+ASSET_DIR = "assets"
+MANIFEST = "manifest.json"
+_VIS_LIB_DIR = os.path.join(os.path.dirname(pyvis.__file__), "templates", "lib", "vis-9.1.2")
+VIS_ASSETS = {"vis-network.min.js": "vis-network.min.js", "vis-network.css": "vis-network.min.css"}
+
+_SCRIPT_TAG = re.compile(r'<script src="https://cdnjs\.cloudflare\.com/[^"]*/vis-network\.min\.js"[^>]*></script>')
+_STYLE_TAG = re.compile(r'<link rel="stylesheet" href="https://cdnjs\.cloudflare\.com/[^"]*/vis-network\.min\.css"[^>]*/>')
+
+
+def localize_assets(html: str, asset_prefix: str) -> str:
+    """把页面中 CDN 上的 vis-network 引用替换为共享的本地资源"""
+    html = _SCRIPT_TAG.sub(f'<script src="{asset_prefix}vis-network.min.js"></script>', html)
+    return _STYLE_TAG.sub(f'<link rel="stylesheet" href="{asset_prefix}vis-network.min.css" />', html)
+
+
+def content_hash(data) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def _safe_name(name) -> str:
+    return re.sub(r'[\\/:*?"<>|\s]+', "_", str(name))
+
+
+def page_list(kg: GradeSixReviewGraph, per_domain_roadmaps: bool = False) -> List[Tuple[str, str, Optional[str]]]:
+    """需要导出的页面：[(相对路径, 视图, 参数)]"""
+    pages = [("roadmap.html", "roadmap", None)]
+    if per_domain_roadmaps:
+        domains = sorted({kg.domain_of(node) for node in kg.review_nodes()})
+        pages.extend((f"roadmap_{_safe_name(domain)}.html", "roadmap", domain) for domain in domains)
+    pages.extend((f"mindmap/{_safe_name(node)}.html", "mindmap", node) for node in kg.node_ids)
+    return pages
+
+
+# ---------- 工作进程 ----------
+_worker_visualizer: Optional[GradeSixVisualizer] = None
+_worker_hops = 1
+
+
+def _init_worker(backend: str, hops: int):
+    """每个工作进程只构建一次图谱；渲染结果不会重复使用，因此不保留渲染缓存"""
+    global _worker_visualizer, _worker_hops
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    with contextlib.redirect_stdout(sys.stderr):
+        kg = GradeSixReviewGraph(backend=backend).freeze()
+    _worker_visualizer = GradeSixVisualizer(kg, render_cache=BoundedCache(maxsize=1))
+    _worker_hops = hops
+
+
+def _render_page(view: str, param) -> Optional[str]:
+    if view == "roadmap":
+        return _worker_visualizer.render_review_roadmap(domain=param)
+    return _worker_visualizer.render_concept_mindmap(param, hops=_worker_hops)
+
+
+def _export_batch(out_dir: str, batch: List[Tuple[str, str, Optional[str], Optional[str]]]) -> List[Tuple[str, Optional[str], bool]]:
+    """渲染并写出一批页面，返回 [(相对路径, 内容哈希, 是否写入)]；渲染失败的页面哈希为 None"""
+    results = []
+    for relpath, view, param, old_hash in batch:
+        html = _render_page(view, param)
+        if html is None:
+            results.append((relpath, None, False))
+            continue
+        prefix = "../" * relpath.count("/") + ASSET_DIR + "/"
+        html = localize_assets(html, prefix)
+        digest = content_hash(html)
+        path = os.path.join(out_dir, relpath)
+        if digest == old_hash and os.path.exists(path):
+            results.append((relpath, digest, False))
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(html)
+        results.append((relpath, digest, True))
+    return results
+
+
+class StaticExporter:
+    """并行导出全部静态页面
+
+    - 页面按批分发到进程池，每个工作进程只构建一次图谱；
+    - vis-network 资源只复制一份到 assets/；
+    - manifest.json 记录每个页面的内容哈希，内容未变的页面不重写；
+      上次清单中有、本次没有成功导出的页面（知识点被删除、不再导出领域路线图、导出失败）从磁盘删除。
+    """
+    def __init__(self, out_dir: str, workers: int = None, batch_size: int = 25, hops: int = 1,
+                 per_domain_roadmaps: bool = False, backend: str = "networkx"):
+        self.out_dir = out_dir
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.batch_size = batch_size
+        self.hops = hops
+        self.per_domain_roadmaps = per_domain_roadmaps
+        self.backend = backend
+        _init_worker(backend, hops)  # 主进程需要图谱来列出页面（并在单进程模式下直接渲染）
+        self.kg = _worker_visualizer.knowledge_graph
+
+    def _load_manifest(self) -> Dict[str, str]:
+        try:
+            with open(os.path.join(self.out_dir, MANIFEST), "r", encoding="utf-8") as f:
+                return json.load(f).get("pages", {})
+        except (OSError, ValueError):
+            return {}
+
+    def _copy_assets(self) -> int:
+        """复制共享的 vis-network 资源，内容相同则跳过；返回复制的文件数"""
+        asset_dir = os.path.join(self.out_dir, ASSET_DIR)
+        os.makedirs(asset_dir, exist_ok=True)
+        copied = 0
+        for source_name, target_name in VIS_ASSETS.items():
+            source, target = os.path.join(_VIS_LIB_DIR, source_name), os.path.join(asset_dir, target_name)
+            if os.path.exists(target):
+                with open(source, "rb") as a, open(target, "rb") as b:
+                    if content_hash(a.read()) == content_hash(b.read()):
+                        continue
+            shutil.copyfile(source, target)
+            copied += 1
+        return copied
+
+    def _remove_stale(self, old_hashes: Dict[str, str], hashes: Dict[str, str]) -> int:
+        """删除上次导出、本次不再存在的页面，返回删除的文件数"""
+        root = os.path.realpath(self.out_dir)
+        removed = 0
+        for relpath in old_hashes:
+            if relpath in hashes:
+                continue
+            path = os.path.realpath(os.path.join(root, relpath))
+            if not path.startswith(root + os.sep):  # 清单被改动过时不删除输出目录以外的文件
+                continue
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                continue
+            with contextlib.suppress(OSError):
+                os.removedirs(os.path.dirname(path))  # 顺带删除空的子目录（不会删除非空目录）
+        return removed
+
+    def _write_index(self, pages: List[Tuple[str, str, Optional[str]]], hashes: Dict[str, str]):
+        links = []
+        for relpath, view, param in pages:
+            if relpath not in hashes:
+                continue
+            if view == "mindmap":
+                title = f"{param} {self.kg.graph.nodes[param]['name']}"
+            else:
+                title = f"复习路线图（{param}）" if param else "复习路线图"
+            links.append(f'<li><a href="{relpath}">{title}</a></li>')
+        html = ('<html><head><meta charset="utf-8"><title>六年级数学知识图谱</title></head><body>'
+                f'<h1>六年级数学知识图谱</h1><ul>{"".join(links)}</ul></body></html>')
+        with open(os.path.join(self.out_dir, "index.html"), "w", encoding="utf-8") as f:
+            f.write(html)
+
+    def run(self) -> Dict:
+        """导出全部页面，返回吞吐量报告"""
+        started = time.perf_counter()
+        os.makedirs(self.out_dir, exist_ok=True)
+        assets_copied = self._copy_assets()
+        old_hashes = self._load_manifest()
+        pages = page_list(self.kg, self.per_domain_roadmaps)
+        todo = [(relpath, view, param, old_hashes.get(relpath)) for relpath, view, param in pages]
+        batches = [todo[i:i + self.batch_size] for i in range(0, len(todo), self.batch_size)]
+
+        if self.workers > 1:
+            with ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                     initargs=(self.backend, self.hops)) as pool:
+                results = [r for batch in pool.map(_export_batch, [self.out_dir] * len(batches), batches) for r in batch]
+        else:
+            results = [r for batch in batches for r in _export_batch(self.out_dir, batch)]
+
+        hashes = {relpath: digest for relpath, digest, _ in results if digest is not None}
+        removed = self._remove_stale(old_hashes, hashes)
+        with open(os.path.join(self.out_dir, MANIFEST), "w", encoding="utf-8") as f:
+            json.dump({"graph_version": self.kg.version, "pages": hashes}, f, ensure_ascii=False, indent=2)
+        self._write_index(pages, hashes)
+
+        elapsed = time.perf_counter() - started
+        written = sum(1 for _, _, was_written in results if was_written)
+        return {
+            "pages": len(pages),
+            "written": written,
+            "unchanged": len(hashes) - written,
+            "failed": len(pages) - len(hashes),
+            "removed": removed,
+            "assets_copied": assets_copied,
+            "seconds": round(elapsed, 3),
+            "pages_per_second": round(len(pages) / elapsed, 1) if elapsed > 0 else None,
+            "workers": self.workers,
+        }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="批量导出知识图谱静态页面")
+    parser.add_argument("-o", "--output", default="static_site", help="输出目录")
+    parser.add_argument("--workers", type=int, default=None, help="工作进程数，默认等于 CPU 核数；1 表示单进程")
+    parser.add_argument("--hops", type=int, default=1, help="思维导图显示的关联层数")
+    parser.add_argument("--per-domain-roadmaps", action="store_true", help="额外为每个领域导出一张路线图")
+    parser.add_argument("--backend", default="networkx", choices=GradeSixReviewGraph.BACKENDS)
+    args = parser.parse_args(argv)
+
+    exporter = StaticExporter(args.output, workers=args.workers, hops=args.hops,
+                              per_domain_roadmaps=args.per_domain_roadmaps, backend=args.backend)
+    report = exporter.run()
+    print(
+        f"共 {report['pages']} 个页面：写入 {report['written']} 个，未变化 {report['unchanged']} 个，"
+        f"失败 {report['failed']} 个，删除过期页面 {report['removed']} 个；耗时 {report['seconds']} 秒，{report['pages_per_second']} 页/秒，"
+        f"{report['workers']} 个进程",
+        file=sys.stderr,
+    )
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knowledge_graph import get_shared_review_graph  # noqa: E402
+from review_path_recommender import GradeSixReviewRecommender  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def kg():
+    return get_shared_review_graph()
+
+
+@pytest.fixture
+def recommender(kg):
+    return GradeSixReviewRecommender(kg)
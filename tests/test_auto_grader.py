@@ -0,0 +1,105 @@
+"""自动批改：答案规范化、选择题与填空题判分、按知识点汇总、题库文件与进程池"""
+import io
+import json
+
+import pytest
+
+from auto_grader import AutoGrader, GradingPipeline, normalize_answer, read_submissions
+from question_bank import QuestionBank
+
+RECORDS = [
+    {"topic": "NA1", "type": "选择题", "difficulty": 2, "content": "1/2 + 1/4 = ?",
+     "options": ["1/4", "3/4", "1", "2/6"], "answer": "3/4"},
+    {"topic": "NA2", "type": "填空题", "difficulty": 3, "content": "0.25 写成百分数", "answer": "25%"},
+    {"topic": "GG1", "type": "计算题", "difficulty": 3, "content": "半径 1 厘米的圆的直径", "answer": "2厘米"},
+    {"topic": "NA1", "type": "应用题", "difficulty": 4, "content": "一半的一半", "answer": "1/4"},
+]
+
+
+@pytest.mark.parametrize("text,expected", [
+    ("０．５", "1/2"), ("50%", "1/2"), ("2分之1", "1/2"), (" 12 厘米", "12"), ("007", "7"), ("不会", "不会"), (None, ""),
+    ("1,000", "1000"), ("1，234，567元", "1234567"), ("1,2", "1,2"),
+])
+def test_normalize_answer(text, expected):
+    assert normalize_answer(text) == expected
+
+
+@pytest.fixture
+def bank(kg):
+    return QuestionBank.from_records(kg.graph, RECORDS)
+
+
+def test_grade_scores_and_topics(bank):
+    submissions = [
+        {"student": "甲", "answers": {"0": "B", "1": "0.25", "2": "2", "3": "0.25"}},
+        {"student": "乙", "questions": [0, 1, 2, 3], "answers": {"0": "3/4", "3": "4分之1"}},
+        {"student": "丙", "answers": {"0": "A", "2": "２ 厘米"}},
+    ]
+    first, second, third = AutoGrader(bank).grade(submissions)
+    assert (first["score"], first["total"], first["wrong"]) == (25, 25, [])
+    assert first["by_topic"] == {"NA1": [2, 2], "NA2": [1, 1], "GG1": [1, 1]}
+    # 未作答的题按错题计
+    assert (second["score"], second["wrong"]) == (15, [1, 2])
+    assert (third["score"], third["total"], third["wrong"]) == (6, 11, [0])
+
+
+def test_malformed_submission_does_not_stop_the_chunk(bank):
+    submissions = [
+        {"student": "甲", "answers": {"99": "1"}},
+        {"student": "乙", "answers": {"第一题": "1"}},
+        {"student": "丙", "answers": {"0": "B"}},
+        {"error": "第 4 行不是合法的 JSON"},
+    ]
+    first, second, third, fourth = AutoGrader(bank).grade(submissions)
+    assert first["student"] == "甲" and "不在题库中" in first["error"]
+    assert second["student"] == "乙" and second["error"].startswith("ValueError")
+    assert (third["score"], third["total"]) == (5, 5)
+    assert fourth == {"student": None, "error": "第 4 行不是合法的 JSON"}
+
+
+def test_answer_events_keep_question_order(bank):
+    grader = AutoGrader(bank)
+    submissions = [{"student": "甲", "questions": [3, 2, 0], "answers": {"0": "B", "2": "3"}},
+                   {"student": "乙", "answers": {"99": "1"}}]
+    events = list(grader.answer_events(submissions, grader.grade(submissions)))
+    assert events == [("甲", "NA1", False), ("甲", "GG1", False), ("甲", "NA1", True)]
+
+
+def test_pipeline_grades_against_bank_file(tmp_path):
+    path = tmp_path / "questions.jsonl"
+    path.write_text("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in RECORDS), encoding="utf-8")
+    submissions = [{"student": f"学生{i}", "answers": {"0": "B", "1": "25%" if i % 2 else "1"}} for i in range(25)]
+
+    pipeline = GradingPipeline(workers=1, chunk_size=10, bank_path=str(path))
+    out = io.StringIO()
+    report = pipeline.run(submissions, out)
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [r["student"] for r in results] == [s["student"] for s in submissions]
+    assert [r["score"] for r in results] == [9 if i % 2 else 5 for i in range(25)]
+    assert report["papers"] == 25 and report["questions"] == 50 and report["failed"] == 0
+
+
+def test_pipeline_writes_error_records(tmp_path):
+    path = tmp_path / "questions.jsonl"
+    path.write_text("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in RECORDS), encoding="utf-8")
+    submissions = tmp_path / "submissions.jsonl"
+    submissions.write_text('{"student": "甲", "answers": {"0": "B"}}\n{不是 JSON\n'
+                           '{"student": "乙", "answers": {"99999": "x"}}\n{"student": "丙", "answers": {"2": "2"}}\n',
+                           encoding="utf-8")
+    out = io.StringIO()
+    report = GradingPipeline(workers=1, bank_path=str(path)).run(read_submissions(str(submissions)), out)
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [r.get("score") for r in results] == [5, None, None, 6]
+    assert results[1]["error"].startswith("第 2 行") and results[2]["student"] == "乙"
+    assert report["papers"] == 4 and report["failed"] == 2
+
+
+def test_pool_does_not_build_bank_in_main_process(tmp_path):
+    path = tmp_path / "questions.jsonl"
+    path.write_text("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in RECORDS), encoding="utf-8")
+    pipeline = GradingPipeline(workers=2, chunk_size=2, max_pending=2, bank_path=str(path))
+    out = io.StringIO()
+    report = pipeline.run(({"student": i, "answers": {"2": "2"}} for i in range(9)), out)
+    assert pipeline._grader is None
+    assert report["papers"] == 9
+    assert [json.loads(line)["student"] for line in out.getvalue().splitlines()] == list(range(9))
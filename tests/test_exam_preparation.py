@@ -0,0 +1,32 @@
+"""考试冲刺计划：阶段划分覆盖全部天数，天数很少时合并阶段"""
+import pytest
+
+
+def phase_days(plan):
+    return [day for phase in plan["schedule"].values() for day in phase["daily_plan"].items()]
+
+
+@pytest.mark.parametrize("days,phases,merged", [
+    (1, 1, ["知识梳理", "综合提升"]),
+    (2, 2, ["知识梳理"]),
+    (3, 3, []),
+    (30, 3, []),
+    (31, 3, []),
+])
+def test_phases_cover_every_day(recommender, days, phases, merged):
+    plan = recommender.generate_review_plan({"days_until_exam": days}, "exam_preparation")
+    assert plan["total_phases"] == len(plan["schedule"]) == phases
+    assert plan["merged_phases"] == merged
+    assert plan["days_per_phase"] >= 1
+    assert [label for label, _ in phase_days(plan)] == [f"第{day}天" for day in range(1, days + 1)]
+    assert plan["mock_exam_schedule"][-1] == days
+    assert all(1 <= day <= days for day in plan["mock_exam_schedule"])
+
+
+def test_merged_phase_keeps_all_focus_topics(recommender):
+    full = recommender.generate_review_plan({"days_until_exam": 30}, "exam_preparation")
+    short = recommender.generate_review_plan({"days_until_exam": 2}, "exam_preparation")
+    topics = {topic for phase in full["schedule"].values() for topic in phase["focus"]}
+    assert {topic for phase in short["schedule"].values() for topic in phase["focus"]} == topics
+    first = next(iter(short["schedule"]))
+    assert first.startswith("第一阶段：综合提升（第1-1天）")
@@ -0,0 +1,39 @@
+"""知识追踪：批量更新与逐条更新一致、弱项判定"""
+import random
+
+import numpy as np
+import pytest
+
+from knowledge_tracing import KnowledgeTracer, parse_correct
+
+
+def test_batch_update_matches_sequential(kg):
+    rng = random.Random(0)
+    topics = list(kg.graph.nodes())
+    events = [(rng.randrange(5), rng.choice(topics), rng.random() < 0.5) for _ in range(400)]
+
+    batch = KnowledgeTracer(kg.graph)
+    batch.update(*zip(*events))
+    sequential = KnowledgeTracer(kg.graph)
+    for student, topic, correct in events:
+        sequential.update([student], [topic], [correct])
+
+    assert batch.students == sequential.students
+    np.testing.assert_allclose(batch.mastery, sequential.mastery, rtol=1e-6)
+    assert (batch.observed == sequential.observed).all()
+
+
+def test_weaknesses_need_evidence(kg):
+    tracer = KnowledgeTracer(kg.graph)
+    tracer.update(["甲"] * 3, ["NA1"] * 3, [False] * 3)
+    weak = tracer.weaknesses("甲")
+    assert weak[0] == "NA1"
+    # 没有作答、也没有被拉低的知识点不算弱项
+    assert "GG1" not in weak
+
+
+def test_parse_correct():
+    assert parse_correct(["1", "0", "True", "false", " 对 ", "错", True]).tolist() == \
+        [True, False, True, False, True, False, True]
+    with pytest.raises(ValueError, match="maybe"):
+        parse_correct(["1", "maybe"])
@@ -0,0 +1,65 @@
+"""紧凑导出格式：写出再读回与当前 JSONL 格式的内容一致"""
+import gzip
+import io
+import json
+
+import pytest
+
+from lazy_plan import write_json
+from plan_export import CompactPlanWriter, compact_bytes, open_plan_writer, read_plans
+
+
+def as_json(value):
+    """按当前 JSONL 格式序列化后再解析，作为比较基准（元组变列表、逐日安排展开）"""
+    out = io.StringIO()
+    write_json(value, out)
+    return json.loads(out.getvalue())
+
+
+@pytest.fixture
+def records(recommender):
+    profiles = [
+        {"name": "甲", "weaknesses": ["NA1", "GG1"], "target_days": 30},
+        {"name": "乙", "weaknesses": ["SP1"], "target_days": 14, "days_until_exam": 45, "mastered": ["N1"]},
+        {"name": "丙", "weaknesses": ["NA1", "GG1"], "target_days": 30},  # 与甲的计划相同
+        {"name": None, "weaknesses": [], "days_until_exam": 5},
+    ]
+    records = [{"name": p["name"], "strategy": strategy, "plan": recommender.generate_review_plan(p, strategy)}
+               for p in profiles for strategy in recommender.STRATEGY_PROFILE_FIELDS]
+    replanned = recommender.replan_weakness_plan(records[0]["plan"], 1, added_weaknesses={"GG2"})
+    records.append({"name": "丁", "strategy": "weakness_focused", "plan": replanned})
+    records.append({"name": "戊", "strategy": "bogus", "error": "不支持的复习策略: bogus"})
+    return records
+
+
+@pytest.mark.parametrize("fmt", ["compact", "compact-csv"])
+@pytest.mark.parametrize("compress", [False, True])
+def test_round_trip(tmp_path, records, fmt, compress):
+    path = str(tmp_path / "plans")
+    writer = open_plan_writer(path, fmt, compress)
+    for record in records:
+        writer.write(record)
+    writer.close()
+    assert [as_json(record) for record in read_plans(path)] == [as_json(record) for record in records]
+
+
+def test_identical_plans_written_once(records):
+    text = compact_bytes(records, compress=False).decode("utf-8")
+    plan_events = [line for line in text.splitlines() if '"value"' in line]
+    distinct = {json.dumps(as_json(record["plan"]), sort_keys=True) for record in records if "plan" in record}
+    assert len(plan_events) == len(distinct)
+
+
+def test_compact_bytes_is_gzip_and_readable(tmp_path, records):
+    data = compact_bytes(records)
+    assert data[:2] == b"\x1f\x8b"
+    path = tmp_path / "plans.compact"
+    path.write_bytes(data)
+    assert [as_json(record) for record in read_plans(str(path))] == [as_json(record) for record in records]
+    assert len(gzip.decompress(data)) < sum(len(json.dumps(as_json(r), ensure_ascii=False)) for r in records)
+
+
+def test_rejects_unknown_values(tmp_path):
+    with CompactPlanWriter(str(tmp_path / "plans")) as writer:
+        with pytest.raises(TypeError):
+            writer.write({"name": "甲", "plan": {"value": object()}})
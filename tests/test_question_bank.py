@@ -0,0 +1,79 @@
+"""组卷：总分与题型、弱项覆盖、做题记录与异常输入"""
+import networkx as nx
+import pytest
+
+from question_bank import PAPER_BLUEPRINTS, PaperAssembler, QuestionBank, generate_question_bank
+
+
+@pytest.fixture(scope="module")
+def assembler(kg):
+    return PaperAssembler(generate_question_bank(kg.graph, size=20_000))
+
+
+@pytest.mark.parametrize("test_type", list(PAPER_BLUEPRINTS))
+def test_assemble_meets_blueprint(assembler, test_type):
+    paper = assembler.assemble(test_type, ["NA2", "GG1"], seed=1)
+    blueprint = PAPER_BLUEPRINTS[test_type]
+    assert paper["total_score"] == blueprint["total"]
+    low, high = blueprint["difficulty"]
+    assert all(low <= q["difficulty"] <= high for q in paper["questions"])
+    assert len({q["id"] for q in paper["questions"]}) == len(paper["questions"])
+
+
+def test_seen_questions_are_skipped(assembler):
+    first = assembler.assemble("单元测试", ["NA1"], seed=0)
+    seen = {q["id"] for q in first["questions"]}
+    second = assembler.assemble("单元测试", ["NA1"], seen=seen, seed=0)
+    assert not seen & {q["id"] for q in second["questions"]}
+
+
+def test_seen_ids_outside_bank_are_ignored(assembler):
+    paper = assembler.assemble("专题测试", ["NA1"], seen=[-1, len(assembler.bank), 10 ** 9], seed=0)
+    assert paper["total_score"] == PAPER_BLUEPRINTS["专题测试"]["total"]
+
+
+def test_no_topics_to_cover():
+    graph = nx.DiGraph()
+    graph.add_node("X", name="非复习知识点", level=1)
+    assembler = PaperAssembler(generate_question_bank(graph, size=100))
+    with pytest.raises(ValueError, match="没有可出题的知识点"):
+        assembler.assemble("单元测试", ["NA4"])
+
+
+def records_bank(graph, score=None, copies=3):
+    records = []
+    for topic in graph.nodes():
+        for qtype in ("选择题", "填空题", "计算题", "应用题"):
+            for difficulty in range(1, 6):
+                for i in range(copies):
+                    record = {"topic": topic, "type": qtype, "difficulty": difficulty,
+                              "content": f"{topic}-{qtype}-{difficulty}-{i}", "answer": "1"}
+                    if qtype == "选择题":
+                        record["options"] = ["1", "2", "3", "4"]
+                    if score is not None:
+                        record["score"] = score
+                    records.append(record)
+    return QuestionBank.from_records(graph, records)
+
+
+@pytest.mark.parametrize("score", [None, 5, 4])
+@pytest.mark.parametrize("test_type", list(PAPER_BLUEPRINTS))
+def test_records_bank_hits_target_total(kg, score, test_type):
+    bank = records_bank(kg.graph, score)
+    paper = PaperAssembler(bank).assemble(test_type, ["NA1"], seed=0)
+    assert paper["total_score"] == PAPER_BLUEPRINTS[test_type]["total"]
+    assert sum(q["score"] for q in paper["questions"]) == paper["total_score"]
+
+
+def test_records_bank_with_unreachable_total(kg):
+    # 每题 3 分凑不出 100 分：报错而不是给出总分不符的试卷
+    with pytest.raises(ValueError, match="凑出总分"):
+        PaperAssembler(records_bank(kg.graph, 3)).assemble("单元测试", ["NA1"])
+
+
+def test_mixed_scores_use_the_common_score(kg):
+    bank = records_bank(kg.graph)
+    bank.score[:40] = 7  # 少量非标准分值的题不会被选中
+    paper = PaperAssembler(bank).assemble("综合模拟", seed=0)
+    assert paper["total_score"] == 100
+    assert all(q["id"] >= 40 for q in paper["questions"])
@@ -0,0 +1,89 @@
+"""弱项计划增量调整：与整体重排一致、保持先修顺序和每日时长、不改动已完成的天"""
+import pytest
+
+
+def plan_days(plan):
+    return [day for week in plan["schedule"].values() for day in week["每日安排"].values()]
+
+
+def plan_minutes(plan):
+    return [minutes for week in plan["schedule"].values() for minutes in week["每日时长"]]
+
+
+def positions(plan):
+    """{知识点: (第几天, 天内次序)}，排不下的知识点排在所有天之后"""
+    pos = {topic: (d, i) for d, day in enumerate(plan_days(plan)) for i, topic in enumerate(day)}
+    pos.update((topic, (len(pos) + 10 ** 6, i)) for i, topic in enumerate(plan["unscheduled"]))
+    return pos
+
+
+def assert_valid(plan, graph):
+    pos = positions(plan)
+    for u, v in graph.edges():
+        if u in pos and v in pos:
+            assert pos[u] < pos[v], f"{u} 应排在 {v} 之前"
+    for day, minutes in zip(plan_days(plan), plan_minutes(plan)):
+        assert minutes <= plan["daily_minutes"] or len(day) == 1
+
+
+def all_topics(plan):
+    return {topic for day in plan_days(plan) for topic in day} | set(plan["unscheduled"])
+
+
+BASE = ["NA1", "GG1", "SP1"]
+CHANGES = [
+    dict(added_weaknesses={"GG2"}),
+    dict(removed_weaknesses={"GG1"}),
+    dict(added_weaknesses={"NA3"}, removed_weaknesses={"SP1"}),
+    dict(added_mastered={"N1", "G2"}),
+    dict(added_mastered={"N5"}, removed_weaknesses={"GG1"}, added_weaknesses={"GG2"}),
+]
+
+
+@pytest.mark.parametrize("days", [30, 4])
+@pytest.mark.parametrize("change", CHANGES)
+def test_patch_matches_full_replan(recommender, kg, change, days):
+    profile = {"weaknesses": BASE, "target_days": days}
+    previous = recommender.generate_review_plan(profile, "weakness_focused")
+    mastered = frozenset(change.get("added_mastered", ()))
+    weak = (set(BASE) - change.get("removed_weaknesses", set())) | change.get("added_weaknesses", set())
+
+    plan = recommender.replan_weakness_plan(previous, 0, mastery=mastered, **change)
+    full = recommender.generate_review_plan(
+        {"weaknesses": sorted(weak), "target_days": days, "mastered": sorted(mastered)}, "weakness_focused")
+
+    assert plan["weaknesses"] == full["weaknesses"]
+    assert all_topics(plan) == all_topics(full)
+    assert_valid(plan, kg.graph)
+    diff = plan["diff"]
+    assert set(diff["removed"]) == all_topics(previous) - all_topics(plan)
+    assert set(diff["added"]) == all_topics(plan) - all_topics(previous)
+
+
+@pytest.mark.parametrize("completed", [1, 2, 3, 5])
+@pytest.mark.parametrize("change", CHANGES + [dict(added_mastered={"N1"}, removed_weaknesses={"GG1"}),
+                                               dict(added_mastered={"N1", "G1"})])
+def test_replan_keeps_completed_days(recommender, kg, change, completed):
+    previous = recommender.generate_review_plan({"weaknesses": BASE, "target_days": 30}, "weakness_focused")
+    mastered = frozenset(change.get("added_mastered", ()))
+    plan = recommender.replan_weakness_plan(previous, completed, mastery=mastered, **change)
+
+    assert plan_days(plan)[:completed] == plan_days(previous)[:completed]
+    assert_valid(plan, kg.graph)
+    # diff 与返回的计划一致：列为删除的知识点确实不在计划中，已完成的天里的知识点不会被列出
+    done = {topic for day in plan_days(previous)[:completed] for topic in day}
+    assert not set(plan["diff"]["removed"]) & done
+    assert set(plan["diff"]["removed"]) == all_topics(previous) - all_topics(plan)
+
+
+def test_replan_sequence_stays_consistent(recommender, kg):
+    """连续多次调整后仍与整体重排的知识点集合一致"""
+    plan = recommender.generate_review_plan({"weaknesses": ["NA1"], "target_days": 30}, "weakness_focused")
+    weak = {"NA1"}
+    for added, removed in [("GG1", None), ("SP1", "NA1"), ("GG2", None), ("NA3", "GG1")]:
+        plan = recommender.replan_weakness_plan(
+            plan, added_weaknesses={added}, removed_weaknesses={removed} if removed else ())
+        weak = (weak - {removed}) | {added}
+        full = recommender.generate_review_plan({"weaknesses": sorted(weak), "target_days": 30}, "weakness_focused")
+        assert all_topics(plan) == all_topics(full)
+        assert_valid(plan, kg.graph)
@@ -0,0 +1,66 @@
+"""复习排程：先修顺序、每日时长预算、排不下与不存在的知识点"""
+import contextlib
+import io
+
+import pytest
+
+from benchmark_suite import generate_synthetic_curriculum
+from curriculum_loader import CurriculumLoader
+from knowledge_graph import GradeSixReviewGraph
+from review_scheduler import ReviewScheduler
+
+
+@pytest.fixture(scope="module")
+def synthetic_graph(tmp_path_factory):
+    root = tmp_path_factory.mktemp("curriculum")
+    generate_synthetic_curriculum(str(root), nodes=300, seed=1)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return GradeSixReviewGraph(loader=CurriculumLoader(str(root))).freeze().graph
+
+
+def assert_topological(schedule, graph):
+    pos = {topic: (d, i) for d, day in enumerate(schedule.days) for i, topic in enumerate(day)}
+    pos.update((topic, (len(schedule.days), i)) for i, topic in enumerate(schedule.overflow))
+    for u, v in graph.edges():
+        if u in pos and v in pos:
+            assert pos[u] < pos[v], f"{u} 应排在 {v} 之前"
+
+
+@pytest.mark.parametrize("days,minutes_per_day", [(365, 90), (20, 90), (30, 45), (5, 200)])
+def test_schedule_order_and_budget(synthetic_graph, days, minutes_per_day):
+    graph = synthetic_graph
+    topics = list(graph.nodes())
+    weak = topics[-20:]
+    scheduler = ReviewScheduler(graph, minutes_per_day)
+    schedule = scheduler.schedule(topics, days, weak)
+
+    assert len(schedule.days) <= days
+    assert_topological(schedule, graph)
+    # 每个知识点恰好出现一次：排入某天或列入 overflow
+    placed = [topic for day in schedule.days for topic in day] + schedule.overflow
+    assert sorted(placed) == sorted(topics)
+    for day, used in zip(schedule.days, schedule.minutes):
+        assert used == sum(scheduler.estimate_minutes(topic, topic in weak) for topic in day)
+        assert used <= minutes_per_day or len(day) == 1
+
+
+def test_schedule_skips_mastered_prerequisites(synthetic_graph):
+    graph = synthetic_graph
+    topic = list(graph.nodes())[-1]
+    schedule = ReviewScheduler(graph).schedule([topic], 10)
+    assert schedule.days == [[topic]]
+
+
+def test_unknown_topics_are_reported_not_scheduled(kg):
+    schedule = ReviewScheduler(kg.graph).schedule(["NA4", "N1", "NA1", "CA2"], 30, ["NA4", "NA1"])
+    assert schedule.unknown == ["NA4", "CA2"]
+    assert schedule.days[0][0] == "N1"
+    assert "NA4" not in schedule.day_of() and "NA4" not in schedule.overflow
+
+
+def test_weakness_plan_lists_unknown_weaknesses(recommender):
+    plan = recommender.generate_review_plan({"weaknesses": ["NA1", "NA4"], "target_days": 60}, "weakness_focused")
+    assert plan["weaknesses"] == ["NA1"]
+    assert plan["unknown_topics"] == ["NA4"]
+    assert all("NA4" not in week["知识点"] for week in plan["schedule"].values())
+    assert plan["assessment_points"] == [7, 14, 21, 28, 35, 42, 49, 56]
@@ -0,0 +1,33 @@
+"""静态导出：增量重写与过期页面清理"""
+import json
+import os
+
+from static_export import MANIFEST, StaticExporter
+
+
+def test_pages_no_longer_exported_are_removed(tmp_path):
+    out = str(tmp_path / "site")
+    first = StaticExporter(out, workers=1, per_domain_roadmaps=True).run()
+    domain_pages = [name for name in os.listdir(out) if name.startswith("roadmap_")]
+    assert domain_pages and first["removed"] == 0
+
+    # 清单中有、磁盘上也有，但这次不再导出的页面
+    stale = os.path.join(out, "mindmap", "OLD1.html")
+    with open(stale, "w", encoding="utf-8") as f:
+        f.write("<html></html>")
+    manifest_path = os.path.join(out, MANIFEST)
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    manifest["pages"]["mindmap/OLD1.html"] = "0"
+    manifest["pages"]["../outside.html"] = "0"
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+    second = StaticExporter(out, workers=1, per_domain_roadmaps=False).run()
+    assert second["removed"] == len(domain_pages) + 1
+    assert second["written"] == 0
+    assert not os.path.exists(stale)
+    assert not any(name.startswith("roadmap_") for name in os.listdir(out))
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        pages = set(json.load(f)["pages"])
+    assert pages == {"roadmap.html"} | {p for p in manifest["pages"] if p.startswith("mindmap/")} - {"mindmap/OLD1.html"}